@@ -0,0 +1,210 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_CATALOG_SOURCE = os.getenv(
+    "ACTIVITY_CATALOG_SOURCE", str(Path(__file__).parent / "data" / "activities.jsonl")
+)
+ACTIVITY_CATALOG_PATH = os.getenv("ACTIVITY_CATALOG_PATH", "activity_catalog.sqlite3")
+
+SORT_ORDERS = {
+    "price": "price ASC, name ASC",
+    "price_desc": "price DESC, name ASC",
+    "name": "name ASC",
+}
+
+
+@dataclass
+class Activity:
+    city: str
+    name: str
+    type: str
+    price: float
+    description: str
+
+
+def normalize_key(value: str) -> str:
+    return " ".join(value.strip().lower().split())
+
+
+def read_activities(source: str) -> Iterator[Tuple]:
+    """Yield catalog rows from a JSONL file of {"city", "name", "type", "price", "description"} objects."""
+    with open(source) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+                yield (
+                    item["city"], normalize_key(item["city"]), item["name"],
+                    item["type"], normalize_key(item["type"]),
+                    float(item.get("price", 0)), item.get("description", "")
+                )
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                logger.error(f"Skipping invalid activity on line {line_number}: {str(e)}")
+
+
+def _source_signature(source: str) -> str:
+    stat = os.stat(source)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def build_catalog(source: str, path: str) -> int:
+    """(Re)build the SQLite catalog at `path` from a JSONL source; returns the row count."""
+    # A unique temp file next to the catalog, so concurrent builds never write to the same one
+    directory, name = os.path.split(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=f"{name}.", suffix=".tmp", delete=False) as tmp:
+        tmp_path = tmp.name
+    try:
+        count = _write_catalog(source, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return count
+
+
+def _write_catalog(source: str, tmp_path: str) -> int:
+    conn = sqlite3.connect(tmp_path)
+    try:
+        with conn:
+            conn.execute(
+                "CREATE TABLE activities (id INTEGER PRIMARY KEY, city TEXT NOT NULL, city_key TEXT NOT NULL, "
+                "name TEXT NOT NULL, type TEXT NOT NULL, type_key TEXT NOT NULL, price REAL NOT NULL, description TEXT)"
+            )
+            conn.execute("CREATE TABLE catalog_meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.executemany(
+                "INSERT INTO activities (city, city_key, name, type, type_key, price, description) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                read_activities(source)
+            )
+            # Indexes are built after the bulk insert; both end in price so
+            # price filters and price ordering are served by the index
+            conn.execute("CREATE INDEX idx_activities_city_price ON activities (city_key, price)")
+            conn.execute("CREATE INDEX idx_activities_city_type_price ON activities (city_key, type_key, price)")
+            conn.execute("INSERT INTO catalog_meta VALUES ('source_signature', ?)", (_source_signature(source),))
+            count = conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0]
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return count
+
+
+def _catalog_signature(path: str) -> Optional[str]:
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'source_signature'").fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+    except sqlite3.Error:
+        return None
+
+
+class ActivityCatalog:
+    """Read-only, indexed activity lookups backed by a SQLite file.
+
+    The file is built from the JSONL source on first use, and rebuilt on
+    the next start whenever the source has changed since the last build.
+    """
+
+    def __init__(self, path: str = ACTIVITY_CATALOG_PATH, source: str = ACTIVITY_CATALOG_SOURCE):
+        self.path = path
+        self.source = source
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    if os.path.exists(self.source) and _catalog_signature(self.path) != _source_signature(self.source):
+                        start = time.perf_counter()
+                        count = build_catalog(self.source, self.path)
+                        logger.info(f"Built activity catalog with {count} activities in {time.perf_counter() - start:.2f}s")
+                    self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        return self._conn
+
+    def search(
+        self,
+        city: str,
+        activity_type: Optional[str] = None,
+        max_price: Optional[float] = None,
+        sort_by: str = "price",
+        limit: int = 5,
+        offset: int = 0,
+    ) -> Tuple[List[Activity], int]:
+        """Return one page of matching activities and the total number of matches."""
+        conn = self._connection()
+        where = ["city_key = ?"]
+        params: List = [normalize_key(city)]
+        if activity_type:
+            type_key = normalize_key(activity_type)
+            with self._lock:
+                exact = conn.execute(
+                    "SELECT 1 FROM activities WHERE city_key = ? AND type_key = ? LIMIT 1", (params[0], type_key)
+                ).fetchone()
+            if exact:
+                where.append("type_key = ?")
+                params.append(type_key)
+            else:
+                # Partial types such as "adventure sports" vs "adventure", scanned within the city only
+                where.append("(instr(type_key, ?) > 0 OR instr(?, type_key) > 0)")
+                params += [type_key, type_key]
+        if max_price is not None:
+            where.append("price <= ?")
+            params.append(float(max_price))
+
+        clause = " AND ".join(where)
+        order = SORT_ORDERS.get(sort_by, SORT_ORDERS["price"])
+        with self._lock:
+            total = conn.execute(f"SELECT COUNT(*) FROM activities WHERE {clause}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT city, name, type, price, description FROM activities WHERE {clause} "
+                f"ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [int(limit), int(offset)]
+            ).fetchall()
+        return [Activity(*row) for row in rows], total
+
+    def cities(self, limit: Optional[int] = None) -> List[str]:
+        conn = self._connection()
+        query = "SELECT DISTINCT city FROM activities ORDER BY city_key"
+        with self._lock:
+            if limit is not None:
+                return [row[0] for row in conn.execute(query + " LIMIT ?", (limit,))]
+            return [row[0] for row in conn.execute(query)]
+
+    def count_cities(self) -> int:
+        conn = self._connection()
+        with self._lock:
+            return conn.execute("SELECT COUNT(DISTINCT city_key) FROM activities").fetchone()[0]
+
+
+# Create a global instance of ActivityCatalog
+activity_catalog = ActivityCatalog()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the SQLite activity catalog from a JSONL file")
+    parser.add_argument("--source", default=ACTIVITY_CATALOG_SOURCE)
+    parser.add_argument("--path", default=ACTIVITY_CATALOG_PATH)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    print(f"Built {args.path} with {build_catalog(args.source, args.path)} activities in {time.perf_counter() - start:.2f}s")
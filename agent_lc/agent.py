@@ -3,35 +3,45 @@ from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from .tools import Tools  
+from .parallel_executor import ParallelToolAgentExecutor
 from dotenv import load_dotenv
 import os
 import time
 from .chat_history import chat_history_manager
+from .history_policy import WindowedChatHistory, history_window_policy
 
 # Load environment variables
 load_dotenv()
 
 class Agent:
-    def __init__(self, prompt_text, agent_type):
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", prompt_text),
+    def __init__(self, prompt_text, agent_type, streaming=False, with_history=False, llm=None):
+        messages = [("system", prompt_text)]
+        if with_history:
+            # Filled by RunnableWithMessageHistory with the windowed session history
+            messages.append(MessagesPlaceholder(variable_name="chat_history"))
+        messages += [
             ("user", "{input}"),
             MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
+        ]
+        self.prompt = ChatPromptTemplate.from_messages(messages)
+        self.agent_type = agent_type
         
-        # Get API key from environment
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
-            
-        self.llm = ChatOpenAI(
-            model_name="gpt-4o",  # Using a more stable model
-            temperature=0.7, 
-            streaming=False,  # Disable streaming to prevent errors
-            api_key=api_key,
-            max_retries=3,  # Add retry logic
-            request_timeout=60  # Increase timeout
-        )
+        if llm is not None:
+            self.llm = llm  # e.g. a scripted model for offline benchmarks
+        else:
+            # Get API key from environment
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY environment variable is not set")
+                
+            self.llm = ChatOpenAI(
+                model_name="gpt-4o",  # Using a more stable model
+                temperature=0.7, 
+                streaming=streaming,  # Token streaming is opt-in; callers attach a callback handler
+                api_key=api_key,
+                max_retries=3,  # Add retry logic
+                request_timeout=60  # Increase timeout
+            )
         
         if agent_type == "web_search":
             self.tools = Tools.setup_tool_web_search()
@@ -47,18 +57,23 @@ class Agent:
         )
 
     def get_agent_executor(self):
-        return AgentExecutor(
+        # The travel planner often asks for hotels, flights and activities in one step
+        executor_class = ParallelToolAgentExecutor if self.agent_type == "travel_planner" else AgentExecutor
+        return executor_class(
             agent=self.agent, 
             tools=self.tools, 
             verbose=True,
             max_iterations=5,  # Limit iterations to prevent loops
-            early_stopping_method="generate"  # Stop early if needed
+            early_stopping_method="generate",  # Stop early if needed
+            return_intermediate_steps=True  # Structured tool results for downstream stages
         )
     
     def get_agent_with_history(self):
         return RunnableWithMessageHistory(
             self.get_agent_executor(),
-            chat_history_manager.get_history_by_session_id,
+            lambda session_id: WindowedChatHistory(
+                chat_history_manager.get_history_by_session_id(session_id), history_window_policy
+            ),
             input_messages_key="input",
             history_messages_key="chat_history",
         )
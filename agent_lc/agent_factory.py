@@ -0,0 +1,60 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from dotenv import load_dotenv
+from groq import Groq, AsyncGroq
+
+from .agent import Agent
+
+# Load environment variables
+load_dotenv()
+
+_cache: Dict[Hashable, Any] = {}
+_cache_lock = threading.RLock()  # Executors build their Agent while holding the lock
+
+
+def _get_or_create(key: Hashable, create: Callable[[], Any]) -> Any:
+    """Build the object for key once per process and reuse it afterwards."""
+    if key in _cache:
+        return _cache[key]
+    with _cache_lock:
+        if key not in _cache:
+            _cache[key] = create()
+        return _cache[key]
+
+
+def get_agent(prompt_text: str, agent_type: str, streaming: bool = False, with_history: bool = False) -> Agent:
+    """Shared Agent (LLM client, prompt and tool binding) for a prompt and agent type."""
+    return _get_or_create(
+        ("agent", prompt_text, agent_type, streaming, with_history),
+        lambda: Agent(prompt_text=prompt_text, agent_type=agent_type, streaming=streaming, with_history=with_history)
+    )
+
+
+def get_agent_executor(prompt_text: str, agent_type: str, with_history: bool = False, streaming: bool = False):
+    """Shared executor for a prompt and agent type.
+
+    Executors keep no per-run state, and history-backed executors look up
+    the session history from the invoke config, so one instance can serve
+    every session.
+    """
+    def create():
+        agent = get_agent(prompt_text, agent_type, streaming, with_history)
+        return agent.get_agent_with_history() if with_history else agent.get_agent_executor()
+
+    return _get_or_create(("executor", prompt_text, agent_type, with_history, streaming), create)
+
+
+def get_groq_client() -> Groq:
+    return _get_or_create("groq", lambda: Groq(api_key=os.environ.get("GROQ_API_KEY")))
+
+
+def get_async_groq_client() -> AsyncGroq:
+    return _get_or_create("async_groq", lambda: AsyncGroq(api_key=os.environ.get("GROQ_API_KEY")))
+
+
+def clear_agent_cache() -> None:
+    """Drop all cached agents and clients, e.g. after rotating API keys."""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,107 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from dotenv import load_dotenv
+
+from .http_client import http_client
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Point at a local stand-in (see benchmarks/mock_amadeus.py) for offline load tests
+AMADEUS_BASE_URL = os.getenv("AMADEUS_BASE_URL", "https://test.api.amadeus.com").rstrip("/")
+AMADEUS_TOKEN_URL = f"{AMADEUS_BASE_URL}/v1/security/oauth2/token"
+
+
+class AmadeusAuthError(Exception):
+    """Raised when an Amadeus access token cannot be obtained."""
+
+
+class AmadeusTokenManager:
+    """Process-wide cache for the Amadeus client-credentials bearer token.
+
+    The token is reused until `refresh_margin` seconds before its `expires_in`
+    deadline. Reads and refreshes happen under a lock so concurrent tool calls
+    wait for a single token request instead of each hitting the token endpoint.
+    """
+
+    def __init__(self, token_url: str = AMADEUS_TOKEN_URL, refresh_margin: float = 60.0):
+        self.token_url = token_url
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._access_token: Optional[str] = None
+        self._expires_at = 0.0
+        self.refresh_count = 0
+
+    def _is_valid(self) -> bool:
+        return self._access_token is not None and time.monotonic() < self._expires_at
+
+    def get_token(self) -> str:
+        """Return a valid access token, fetching a new one only when needed."""
+        # The token is read under the lock so a concurrent invalidate() cannot
+        # clear it between the validity check and the return
+        with self._lock:
+            token = self._access_token if self._is_valid() else None
+            if token is None:
+                token = self._refresh()
+        return token
+
+    def get_auth_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.get_token()}"}
+
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """Drop the cached token, e.g. after the API rejected it with a 401.
+
+        With `token`, only that token is dropped, so a caller holding a
+        rejected token never discards a fresh one another thread just fetched.
+        """
+        with self._lock:
+            if token is None or token == self._access_token:
+                self._access_token = None
+                self._expires_at = 0.0
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """Authorized GET; a 401 (token revoked or rotated server-side) is retried once with a fresh token."""
+        token = self.get_token()
+        response = http_client.get(url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        if response.status_code == 401:
+            logger.info("Amadeus rejected the cached access token, retrying with a new one")
+            self.invalidate(token)
+            response = http_client.get(url, headers=self.get_auth_headers(), **kwargs)
+        return response
+
+    def _refresh(self) -> str:
+        client_id = os.getenv("AMADEUS_CLIENT_ID")
+        client_secret = os.getenv("AMADEUS_CLIENT_SECRET")
+        if not client_id or not client_secret:
+            raise AmadeusAuthError("Amadeus API credentials not configured")
+
+        token_data = {
+            "grant_type": "client_credentials",
+            "client_id": client_id,
+            "client_secret": client_secret
+        }
+
+        response = http_client.post(self.token_url, data=token_data)
+        if response.status_code != 200:
+            raise AmadeusAuthError(response.text)
+
+        payload = response.json()
+        expires_in = float(payload.get("expires_in", 0))
+
+        token = payload["access_token"]
+        self._access_token = token
+        self._expires_at = time.monotonic() + max(expires_in - self.refresh_margin, expires_in / 2)
+        self.refresh_count += 1
+        logger.info(f"Fetched new Amadeus access token (expires in {expires_in:.0f}s)")
+        return token
+
+
+# Create a global instance of AmadeusTokenManager
+amadeus_token_manager = AmadeusTokenManager()
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Set
+
+from .pipeline import TravelPipeline, STAGES
+
+logger = logging.getLogger(__name__)
+
+
+def read_batch_queries(input_path: str) -> Iterator[Dict[str, str]]:
+    """Yield {"id", "query"} items from a JSONL file of travel requests.
+
+    Each line is an object with a "query" (or "user_query") field and an
+    optional "id"; the line number is used when no id is given.
+    """
+    with open(input_path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.error(f"Skipping invalid JSON on line {line_number}: {str(e)}")
+                continue
+            query = item.get("query") or item.get("user_query")
+            if not query:
+                logger.error(f"Skipping line {line_number}: no query field")
+                continue
+            yield {"id": str(item.get("id", line_number)), "query": query}
+
+
+def load_completed_ids(output_path: str) -> Set[str]:
+    """Ids already completed in a previous run, read from the output file itself."""
+    completed = set()
+    if not Path(output_path).exists():
+        return completed
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partial line from an interrupted write
+            if record.get("status") == "completed":
+                completed.add(record["id"])
+    return completed
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(percent / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+@dataclass
+class BatchReport:
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+    stage_latencies: Dict[str, List[float]] = field(default_factory=lambda: {stage: [] for stage in STAGES})
+
+    @property
+    def itineraries_per_minute(self) -> float:
+        return self.completed / self.elapsed * 60 if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        lines = [
+            "Batch Summary:",
+            f"Completed: {self.completed}",
+            f"Failed: {self.failed}",
+            f"Skipped (already completed): {self.skipped}",
+            f"Wall time: {self.elapsed:.1f}s",
+            f"Throughput: {self.itineraries_per_minute:.2f} itineraries/minute",
+        ]
+        for stage, latencies in self.stage_latencies.items():
+            if latencies:
+                lines.append(
+                    f"{stage}: mean {statistics.mean(latencies):.2f}s, "
+                    f"p50 {_percentile(latencies, 50):.2f}s, p95 {_percentile(latencies, 95):.2f}s"
+                )
+        return "\n".join(lines)
+
+
+async def run_batch(pipeline: TravelPipeline, input_path: str, output_path: str, workers: int = 4) -> BatchReport:
+    """Run every query in input_path through the pipeline with a pool of workers.
+
+    Results are appended to output_path as JSON lines as soon as each item
+    finishes, so an interrupted batch can be rerun and resumes from the items
+    that have not completed yet.
+    """
+    report = BatchReport()
+    completed_ids = load_completed_ids(output_path)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    start = time.perf_counter()
+
+    with open(output_path, "a") as output_file:
+        def write_record(record):
+            output_file.write(json.dumps(record) + "\n")
+            output_file.flush()
+            os.fsync(output_file.fileno())
+
+        async def run_item(item):
+            events = await pipeline.run_to_completion(item["query"])
+            record = {"id": item["id"], "query": item["query"], "status": "completed", "stage_latency": {}}
+            for stage, event in events.items():
+                record[stage] = event.output
+                record["stage_latency"][stage] = round(event.elapsed, 3)
+                if event.status == "failed":
+                    record["status"] = "failed"
+                    record["error"] = f"{stage}: {event.error}"
+                else:
+                    report.stage_latencies[stage].append(event.elapsed)
+            return record
+
+        async def worker():
+            # A failing item is recorded and skipped; a dead worker would leave the producer blocked on the queue
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                try:
+                    record = await run_item(item)
+                except Exception as e:
+                    logger.error(f"Batch item {item['id']} failed: {str(e)}")
+                    record = {"id": item["id"], "query": item["query"], "status": "failed", "error": str(e)}
+                try:
+                    write_record(record)
+                except Exception as e:
+                    logger.error(f"Could not write the result of batch item {item['id']}: {str(e)}")
+                    record["status"] = "failed"
+                if record["status"] == "completed":
+                    report.completed += 1
+                else:
+                    report.failed += 1
+
+        worker_tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+        for item in read_batch_queries(input_path):
+            if item["id"] in completed_ids:
+                report.skipped += 1
+                continue
+            await queue.put(item)
+        for _ in worker_tasks:
+            await queue.put(None)
+        await asyncio.gather(*worker_tasks)
+
+    report.elapsed = time.perf_counter() - start
+    return report
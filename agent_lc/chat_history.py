@@ -1,28 +1,216 @@
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.messages import BaseMessage
-from typing import Dict
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
 from pydantic import BaseModel, Field
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
+from collections import OrderedDict
+from dotenv import load_dotenv
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Load environment variables
+load_dotenv()
+
+CHAT_HISTORY_MAX_SESSIONS = int(os.getenv("CHAT_HISTORY_MAX_SESSIONS", "500"))
+CHAT_HISTORY_IDLE_TTL = float(os.getenv("CHAT_HISTORY_IDLE_TTL", "3600"))
+CHAT_HISTORY_MEMORY_BUDGET_MB = float(os.getenv("CHAT_HISTORY_MEMORY_BUDGET_MB", "50"))
+CHAT_HISTORY_DB_PATH = os.getenv("CHAT_HISTORY_DB_PATH", "")
+
+# Rough per-message overhead on top of the content length
+MESSAGE_OVERHEAD_BYTES = 200
+
+def estimate_message_bytes(message: BaseMessage) -> int:
+    """Approximate memory held by one message."""
+    return len(str(message.content)) + MESSAGE_OVERHEAD_BYTES
 
 class InMemoryHistory(BaseChatMessageHistory, BaseModel):
     #\"\"\"In memory implementation of chat message history.\"\"\"
     messages: List[BaseMessage] = Field(default_factory=list)
+    # Rolling summary of the first `summarized_count` messages (see history_policy)
+    summary: str = ""
+    summarized_count: int = 0
+    last_tokens_saved: int = 0
+    # Running estimate of the messages' memory; `on_resize` gets each change (set by ChatHistoryManager)
+    size_bytes: int = 0
+    on_resize: Optional[Callable[[int], None]] = Field(default=None, exclude=True)
 
     def add_message(self, message: BaseMessage) -> None:
         #\"\"\"Add a self-created message to the store\"\"\"
         self.messages.append(message)
+        _resize(self, estimate_message_bytes(message))
 
     def clear(self) -> None:
         self.messages = []
+        self.summary = ""
+        self.summarized_count = 0
+        _resize(self, -self.size_bytes)
+
+def _resize(history: BaseChatMessageHistory, delta: int) -> None:
+    history.size_bytes += delta
+    if history.on_resize is not None and delta:
+        history.on_resize(delta)
+
+class SQLiteHistoryStore:
+    """Append-only SQLite table of chat messages, shared by all sessions."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+                "message TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages (session_id, id)"
+            )
+
+    def load(self, session_id: str) -> List[BaseMessage]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message FROM chat_messages WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in rows])
+
+    def append(self, session_id: str, message: BaseMessage) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO chat_messages (session_id, message, created_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(message_to_dict(message)), time.time())
+            )
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """Chat history kept in memory and written through to a SQLiteHistoryStore.
+
+    Messages are loaded from the store on first access, so a session evicted
+    from memory is reloaded lazily the next time it is used.
+    """
+
+    def __init__(self, session_id: str, store: SQLiteHistoryStore):
+        self.session_id = session_id
+        self.store = store
+        self._messages: Optional[List[BaseMessage]] = None
+        self.summary = ""
+        self.summarized_count = 0
+        self.last_tokens_saved = 0
+        # Memory of the loaded messages only; see InMemoryHistory
+        self.size_bytes = 0
+        self.on_resize: Optional[Callable[[int], None]] = None
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        if self._messages is None:
+            self._messages = self.store.load(self.session_id)
+            _resize(self, sum(estimate_message_bytes(message) for message in self._messages))
+        return self._messages
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.messages.append(message)
+        self.store.append(self.session_id, message)
+        _resize(self, estimate_message_bytes(message))
+
+    def clear(self) -> None:
+        self._messages = []
+        self.summary = ""
+        self.summarized_count = 0
+        self.store.delete(self.session_id)
+        _resize(self, -self.size_bytes)
 
 class ChatHistoryManager:
-    def __init__(self):
-        self.chat_histories: Dict[str, InMemoryHistory] = {}
+    """Per-session chat histories with LRU, idle-TTL and memory-budget eviction.
+
+    Without a store, evicted sessions are dropped. With a SQLiteHistoryStore,
+    every message is persisted on write and evicted sessions reload on demand.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = CHAT_HISTORY_MAX_SESSIONS,
+        idle_ttl: float = CHAT_HISTORY_IDLE_TTL,
+        memory_budget_bytes: int = int(CHAT_HISTORY_MEMORY_BUDGET_MB * 1024 * 1024),
+        store: Optional[SQLiteHistoryStore] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.memory_budget_bytes = memory_budget_bytes
+        self.store = store
+        self.chat_histories: "OrderedDict[str, BaseChatMessageHistory]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        # Running total of the held histories' size_bytes, updated as messages are added and sessions evicted
+        self._memory_bytes = 0
+        # Reentrant: a history may report a resize while the manager holds the lock
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "misses": 0, "evicted_lru": 0, "evicted_idle": 0, "evicted_memory": 0}
+
+    def _new_history(self, session_id: str) -> BaseChatMessageHistory:
+        history = SQLiteChatMessageHistory(session_id, self.store) if self.store is not None else InMemoryHistory()
+        history.on_resize = lambda delta: self._resized(session_id, history, delta)
+        return history
+
+    def _resized(self, session_id: str, history: BaseChatMessageHistory, delta: int) -> None:
+        with self._lock:
+            # An evicted history may still be written to by a running agent; it no longer counts
+            if self.chat_histories.get(session_id) is history:
+                self._memory_bytes += delta
 
     def get_history_by_session_id(self, session_id: str) -> BaseChatMessageHistory:
-        if session_id not in self.chat_histories:
-            self.chat_histories[session_id] = InMemoryHistory()
-        return self.chat_histories[session_id]
+        with self._lock:
+            if session_id in self.chat_histories:
+                self.stats["hits"] += 1
+                self.chat_histories.move_to_end(session_id)
+            else:
+                self.stats["misses"] += 1
+                self.chat_histories[session_id] = self._new_history(session_id)
+            self._last_access[session_id] = time.monotonic()
+            history = self.chat_histories[session_id]
+            self._evict(keep=session_id)
+            return history
+
+    def discard(self, session_id: str) -> None:
+        """Release a session's in-memory history (persisted messages are kept)."""
+        with self._lock:
+            if session_id in self.chat_histories:
+                self._remove(session_id)
+
+    def _remove(self, session_id: str, reason: Optional[str] = None) -> None:
+        history = self.chat_histories.pop(session_id)
+        del self._last_access[session_id]
+        self._memory_bytes -= history.size_bytes
+        if reason is not None:
+            self.stats[reason] += 1
+
+    def _evict(self, keep: str) -> None:
+        now = time.monotonic()
+        for session_id in list(self.chat_histories):
+            if session_id != keep and now - self._last_access[session_id] > self.idle_ttl:
+                self._remove(session_id, "evicted_idle")
+
+        while len(self.chat_histories) > self.max_sessions:
+            self._remove(next(iter(self.chat_histories)), "evicted_lru")
+
+        if self.memory_budget_bytes:
+            while self._memory_bytes > self.memory_budget_bytes and len(self.chat_histories) > 1:
+                self._remove(next(iter(self.chat_histories)), "evicted_memory")
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "sessions": len(self.chat_histories),
+                "memory_bytes": self._memory_bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "persistent": self.store is not None,
+                **self.stats,
+            }
 
 # Create a global instance of ChatHistoryManager
-chat_history_manager = ChatHistoryManager()
\ No newline at end of file
+chat_history_manager = ChatHistoryManager(
+    store=SQLiteHistoryStore(CHAT_HISTORY_DB_PATH) if CHAT_HISTORY_DB_PATH else None
+)
@@ -0,0 +1,146 @@
+import logging
+import os
+import threading
+from typing import List
+
+from dotenv import load_dotenv
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, SystemMessage
+
+from .prompts import HISTORY_SUMMARY_PROMPT_TEMPLATE
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+HISTORY_WINDOW_MESSAGES = int(os.getenv("HISTORY_WINDOW_MESSAGES", "6"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+HISTORY_SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4o-mini")
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:  # Not installed, or the encoding file cannot be downloaded
+            logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when available, otherwise a ~4 chars/token estimate."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def count_message_tokens(messages: List[BaseMessage]) -> int:
+    return sum(count_tokens(str(message.content)) + 4 for message in messages)
+
+
+class HistoryWindowPolicy:
+    """Keep the last messages verbatim and fold older turns into a rolling summary.
+
+    The most recent `max_messages` messages that fit in `token_budget` are
+    sent as-is. Everything older is summarized incrementally: only messages
+    not yet covered by the summary are sent to the summarizer, and the
+    summary is cached on the history object (`summary`, `summarized_count`).
+    """
+
+    def __init__(
+        self,
+        max_messages: int = HISTORY_WINDOW_MESSAGES,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        summarizer=None,
+    ):
+        self.max_messages = max_messages
+        self.token_budget = token_budget
+        self._summarizer = summarizer
+        self._lock = threading.Lock()
+        self.tokens_saved_total = 0
+
+    @property
+    def summarizer(self):
+        if self._summarizer is None:
+            from langchain_openai import ChatOpenAI
+            self._summarizer = ChatOpenAI(model_name=HISTORY_SUMMARY_MODEL, temperature=0, max_retries=3)
+        return self._summarizer
+
+    def _window_start(self, messages: List[BaseMessage]) -> int:
+        """Index of the first message kept verbatim."""
+        start = len(messages)
+        tokens = 0
+        while start > 0 and len(messages) - start < self.max_messages:
+            message_tokens = count_message_tokens([messages[start - 1]])
+            # Always keep the latest message, even if it alone exceeds the budget
+            if start < len(messages) and tokens + message_tokens > self.token_budget:
+                break
+            tokens += message_tokens
+            start -= 1
+        return start
+
+    def _summarize(self, summary: str, new_messages: List[BaseMessage]) -> str:
+        transcript = "\n".join(f"{message.type}: {message.content}" for message in new_messages)
+        prompt = HISTORY_SUMMARY_PROMPT_TEMPLATE.format(summary=summary or "(none yet)", new_messages=transcript)
+        return self.summarizer.invoke(prompt).content.strip()
+
+    def apply(self, history: BaseChatMessageHistory) -> List[BaseMessage]:
+        """Return the messages to send to the model for this turn."""
+        messages = list(history.messages)
+        start = self._window_start(messages)
+        if start == 0:
+            history.last_tokens_saved = 0
+            return messages
+
+        # The summarizer call runs outside the lock so one session's summary never
+        # holds up another's turn; it is stored only if no other turn of the same
+        # session stored one meanwhile
+        with self._lock:
+            summary = getattr(history, "summary", "")
+            summarized_count = getattr(history, "summarized_count", 0)
+        if start > summarized_count:
+            summary = self._summarize(summary, messages[summarized_count:start])
+            with self._lock:
+                if getattr(history, "summarized_count", 0) == summarized_count:
+                    history.summary = summary
+                    history.summarized_count = start
+
+        windowed = [SystemMessage(content=f"Summary of the earlier conversation: {summary}")] + messages[start:]
+        tokens_saved = max(count_message_tokens(messages) - count_message_tokens(windowed), 0)
+        history.last_tokens_saved = tokens_saved
+        with self._lock:
+            self.tokens_saved_total += tokens_saved
+        logger.info(f"History window: {len(messages) - start} recent messages + summary, saved {tokens_saved} tokens this turn")
+        return windowed
+
+
+class WindowedChatHistory(BaseChatMessageHistory):
+    """History view that reads through a HistoryWindowPolicy and writes to the full history."""
+
+    def __init__(self, history: BaseChatMessageHistory, policy: HistoryWindowPolicy):
+        self.history = history
+        self.policy = policy
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return self.policy.apply(self.history)
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.history.add_message(message)
+
+    def clear(self) -> None:
+        self.history.clear()
+        self.history.summary = ""
+        self.history.summarized_count = 0
+
+
+# Create a global instance of HistoryWindowPolicy
+history_window_policy = HistoryWindowPolicy()
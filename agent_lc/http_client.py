@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+from .tracing import add_to_current_span
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# time.monotonic() by which requests in the current context must be done, retries included
+_deadline: ContextVar[Optional[float]] = ContextVar("http_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: float, start: Optional[float] = None) -> Iterator[None]:
+    """Fit every request in the block, with its retries and backoff, within `seconds` of `start` (default: now).
+
+    Timeouts are shortened to the time left, and a retry that could not
+    finish in time is not attempted: the last response (or the error) is
+    returned instead. Used for tool calls, so a call the agent has given up
+    on stops hitting the API soon after.
+    """
+    deadline = (time.monotonic() if start is None else start) + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class DeadlineRetry(Retry):
+    """Retry that gives up when its backoff would run past the context's request deadline."""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        deadline = _deadline.get()
+        if deadline is not None:
+            wait = retry.get_backoff_time()
+            if response is not None and self.respect_retry_after_header:
+                wait = max(wait, self.get_retry_after(response) or 0.0)
+            if time.monotonic() + wait >= deadline:
+                # With raise_on_status=False urllib3 hands back the last response
+                raise MaxRetryError(_pool, url, error or Exception("request deadline reached"))
+        return retry
+
+
+class ConnectionStats:
+    """Thread-safe counters for connection pool checkouts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.connection_checkouts = 0
+        self.requests = 0
+        self.retries = 0
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "connections_opened": self.connections_opened,
+                "connections_reused": self.connection_checkouts - self.connections_opened,
+            }
+
+
+def _counting_pool_class(base, stats: ConnectionStats):
+    """Build a urllib3 pool class that records new vs reused connections."""
+
+    class CountingConnectionPool(base):
+        def _get_conn(self, timeout=None):
+            stats.increment("connection_checkouts")
+            return super()._get_conn(timeout=timeout)
+
+        def _new_conn(self):
+            stats.increment("connections_opened")
+            return super()._new_conn()
+
+    return CountingConnectionPool
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool_class(HTTPConnectionPool, self.stats),
+            "https": _counting_pool_class(HTTPSConnectionPool, self.stats),
+        }
+
+
+class HttpClient:
+    """Shared transport for all outbound tool calls.
+
+    Wraps a pooled `requests.Session` with keep-alive, a per-host connection
+    limit, default connect/read timeouts and exponential backoff on 429/5xx
+    responses (honoring `Retry-After`). Inside `request_deadline` the
+    timeouts and retries are cut to fit the time left.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        max_retries: int = HTTP_MAX_RETRIES,
+        backoff_factor: float = HTTP_BACKOFF_FACTOR,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.stats = ConnectionStats()
+
+        retry = DeadlineRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=None,  # Amadeus token and search calls are safe to retry
+            respect_retry_after_header=True,
+            raise_on_status=False,  # Hand the final response back to the tool
+        )
+        adapter = CountingHTTPAdapter(
+            self.stats,
+            pool_connections=10,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,  # Enforce the per-host connection limit
+            max_retries=retry,
+        )
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        deadline = _deadline.get()
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.Timeout(f"{method} {url} not sent: request deadline already passed")
+            timeout = kwargs["timeout"]
+            timeouts = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+            kwargs["timeout"] = tuple(remaining if value is None else min(value, remaining) for value in timeouts)
+        start = time.perf_counter()
+        response = self.session.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        self.stats.increment("requests")
+        retries = getattr(response.raw, "retries", None)
+        retry_count = len(retries.history) if retries is not None else 0
+        if retry_count:
+            self.stats.increment("retries", retry_count)
+            logger.info(f"{method} {url} was retried {retry_count} times")
+        add_to_current_span(http_requests=1, http_retries=retry_count, http_time=elapsed)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def get_stats(self) -> Dict[str, int]:
+        return self.stats.snapshot()
+
+
+# Create a global instance of HttpClient
+http_client = HttpClient()
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from .prompts import (
+    VERIFICATION_SYSTEM_PROMPT,
+    SECTION_VERIFICATION_PROMPT_TEMPLATE,
+    VERIFICATION_AGGREGATION_PROMPT_TEMPLATE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Sections shorter than this are merged into the next one
+MIN_SECTION_CHARS = 200
+
+HEADING_PATTERN = re.compile(r"^\s*(?:(#{1,6})\s+(.+?)|\*\*(.+?)\*\*:?|((?:day|DAY|Day)\s+\d+\b.*?))\s*$")
+SECTION_KINDS = [
+    ("day", re.compile(r"\bday\s*\d+", re.IGNORECASE)),
+    ("budget", re.compile(r"budget|cost|price", re.IGNORECASE)),
+    ("hotels", re.compile(r"hotel|accommodation|stay", re.IGNORECASE)),
+    ("flights", re.compile(r"flight|airfare", re.IGNORECASE)),
+]
+THINK_PATTERN = re.compile(r"<think>.*?</think>", re.DOTALL)
+
+
+@dataclass
+class ItinerarySection:
+    title: str
+    kind: str
+    text: str
+
+
+def classify_heading(title: str) -> str:
+    for kind, pattern in SECTION_KINDS:
+        if pattern.search(title):
+            return kind
+    return "other"
+
+
+def _parse_heading(line: str) -> Optional[str]:
+    """Return the heading title if the line starts a new itinerary section."""
+    match = HEADING_PATTERN.match(line)
+    if not match:
+        return None
+    hashes, markdown_title, bold_title, day_title = match.groups()
+    title = (markdown_title or bold_title or day_title).strip()
+    # Sub-headings such as "**Morning:**" stay inside the current section
+    if classify_heading(title) == "other" and not (hashes and len(hashes) <= 2):
+        return None
+    return title
+
+
+class ItinerarySectionSplitter:
+    """Split streamed itinerary text into sections at day/budget/hotel/flight headings."""
+
+    def __init__(self, min_section_chars: int = MIN_SECTION_CHARS):
+        self.min_section_chars = min_section_chars
+        self._buffer = ""
+        self._title = "Introduction"
+        self._lines: List[str] = []
+
+    def feed(self, text: str) -> List[ItinerarySection]:
+        """Add streamed text; return sections completed by it."""
+        self._buffer += text
+        completed = []
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            section = self._add_line(line)
+            if section is not None:
+                completed.append(section)
+        return completed
+
+    def flush(self) -> List[ItinerarySection]:
+        """Return the final, still-open section."""
+        completed = []
+        if self._buffer:
+            section = self._add_line(self._buffer)
+            self._buffer = ""
+            if section is not None:
+                completed.append(section)
+        if "".join(self._lines).strip():
+            completed.append(self._close_section())
+        return completed
+
+    def _add_line(self, line: str) -> Optional[ItinerarySection]:
+        title = _parse_heading(line)
+        section = None
+        if title is not None and len("\n".join(self._lines).strip()) >= self.min_section_chars:
+            section = self._close_section()
+            self._title = title
+        elif title is not None and classify_heading(self._title) == "other":
+            # Short preamble: name the section after its first real heading
+            self._title = title
+        self._lines.append(line)
+        return section
+
+    def _close_section(self) -> ItinerarySection:
+        section = ItinerarySection(
+            title=self._title,
+            kind=classify_heading(self._title),
+            text="\n".join(self._lines).strip()
+        )
+        self._lines = []
+        return section
+
+
+def split_sections(text: str, min_section_chars: int = MIN_SECTION_CHARS) -> List[ItinerarySection]:
+    splitter = ItinerarySectionSplitter(min_section_chars)
+    return splitter.feed(text) + splitter.flush()
+
+
+class _SectionStreamHandler(AsyncCallbackHandler):
+    def __init__(self, verifier: "IncrementalVerifier"):
+        self.verifier = verifier
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs: Any) -> None:
+        # Text streamed before a tool call is not part of the final itinerary
+        self.verifier.reset_stream()
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            for section in self.verifier.splitter.feed(token):
+                self.verifier.submit(section)
+
+
+class IncrementalVerifier:
+    """Verify itinerary sections concurrently while the copywriter streams them.
+
+    Attach `callback_handler` to the copywriter run; every section completed
+    in the token stream is checked right away. `finalize` then verifies any
+    sections not seen in the stream and runs a short aggregation pass over
+    the section reports.
+    """
+
+    def __init__(
+        self,
+        complete: Callable[[List[Dict[str, str]]], Awaitable[str]],
+        user_query: str,
+        strategist_output: str,
+        max_concurrency: int = 4,
+    ):
+        self.complete = complete
+        self.user_query = user_query
+        self.strategist_output = strategist_output
+        self.splitter = ItinerarySectionSplitter()
+        self.callback_handler = _SectionStreamHandler(self)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.sections_verified_early = 0
+
+    def reset_stream(self) -> None:
+        self.splitter = ItinerarySectionSplitter()
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks = {}
+
+    def submit(self, section: ItinerarySection) -> asyncio.Task:
+        if section.text not in self._tasks:
+            self._tasks[section.text] = asyncio.create_task(self._verify_section(section))
+        return self._tasks[section.text]
+
+    async def _verify_section(self, section: ItinerarySection) -> str:
+        prompt = SECTION_VERIFICATION_PROMPT_TEMPLATE.format(
+            user_requirements=self.user_query,
+            strategist_analysis=self.strategist_output,
+            section_kind=section.kind,
+            section_title=section.title,
+            section_text=section.text
+        )
+        async with self._semaphore:
+            report = await self.complete([
+                {"role": "system", "content": VERIFICATION_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ])
+        # Reasoning traces would only bloat the aggregation prompt
+        return THINK_PATTERN.sub("", report).strip()
+
+    async def finalize(self, itinerary: str, rule_findings: str = "") -> str:
+        sections = split_sections(itinerary)
+        self.sections_verified_early = sum(1 for section in sections if section.text in self._tasks)
+
+        tasks = [self.submit(section) for section in sections]
+        for task in self._tasks.values():
+            if task not in tasks:
+                task.cancel()  # Streamed text that did not make it into the final itinerary
+
+        reports = await asyncio.gather(*tasks)
+        logger.info(f"Verified {len(sections)} sections, {self.sections_verified_early} while the itinerary was still streaming")
+
+        section_reports = "\n\n".join(
+            f"[{section.kind}] {section.title}:\n{report}" for section, report in zip(sections, reports)
+        )
+        return await self.complete([
+            {"role": "system", "content": VERIFICATION_SYSTEM_PROMPT},
+            {"role": "user", "content": VERIFICATION_AGGREGATION_PROMPT_TEMPLATE.format(
+                user_requirements=self.user_query,
+                section_reports=section_reports,
+                rule_findings=rule_findings or "None"
+            )}
+        ])
@@ -0,0 +1,369 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from .location_resolver import Location, is_iata_code, location_resolver, normalize_location
+from .requirements_extractor import SPECIAL_REQUIREMENTS
+from .rule_verification import (
+    DAY_MONTH_PATTERN,
+    ISO_DATE_PATTERN,
+    MONTHS,
+    PREFERENCES,
+    date_matches,
+    extract_requirements,
+    rule_verifier,
+)
+from .tool_cache import DEFAULT_TOOL_TTLS
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ITINERARY_CACHE_PATH = os.getenv("ITINERARY_CACHE_PATH", ":memory:")
+# Itineraries quote flight and hotel prices, so they expire with the shorter of those TTLs
+ITINERARY_CACHE_TTL = int(os.getenv(
+    "ITINERARY_CACHE_TTL", str(min(DEFAULT_TOOL_TTLS["search_flights"], DEFAULT_TOOL_TTLS["search_hotels"]))
+))
+ITINERARY_CACHE_BUDGET_BUCKET = float(os.getenv("ITINERARY_CACHE_BUDGET_BUCKET", "500"))
+# Minimum similarity (0-1) for reusing an itinerary of a different request; 1 disables fuzzy matches
+ITINERARY_CACHE_MIN_SIMILARITY = float(os.getenv("ITINERARY_CACHE_MIN_SIMILARITY", "0.8"))
+ITINERARY_CACHE_MAX_ENTRIES = int(os.getenv("ITINERARY_CACHE_MAX_ENTRIES", "1000"))
+
+EMBEDDING_DIMENSIONS = 256
+DESTINATION_LINE_PATTERN = re.compile(r"^\W*destination\W+(.+)$", re.IGNORECASE | re.MULTILINE)
+ORIGIN_LINE_PATTERN = re.compile(r"^\W*(?:origin|departing from|from)\W+(.+)$", re.IGNORECASE | re.MULTILINE)
+# "Final approval status: APPROVED", as both the rule report and the LLM verifier end
+VERDICT_PATTERN = re.compile(r"approval status\W*(.+)", re.IGNORECASE)
+APPROVED_PATTERN = re.compile(r"\bapproved\b", re.IGNORECASE)
+REJECTED_PATTERN = re.compile(r"\bnot approved\b|\brejected\b|\bneeds review\b|\bfailed\b", re.IGNORECASE)
+
+
+@dataclass
+class RequirementKey:
+    """Normalized requirement fields; two requests with equal keys get the same itinerary."""
+    destination: Optional[str]  # "Manali, IN": the city itself, not its IATA code, which nearby towns share
+    origin: Optional[str] = None
+    month: Optional[str] = None  # "2025-09"
+    window: Optional[str] = None  # "early", "mid" or "late" in the month
+    nights: Optional[int] = None
+    travelers: Optional[int] = None
+    budget_bucket: Optional[float] = None
+    interests: List[str] = field(default_factory=list)
+    preferences: List[str] = field(default_factory=list)  # e.g. "relaxed", "family"
+    special_requirements: List[str] = field(default_factory=list)  # e.g. "accessibility", "dietary"
+    start: Optional[str] = None  # exact start date, not part of the key; used to adapt reused itineraries
+    budget: Optional[float] = None  # exact budget, not part of the key
+
+    def cache_key(self) -> str:
+        fields = asdict(self)
+        del fields["start"], fields["budget"]
+        return f"{self.destination}:{json.dumps(fields, sort_keys=True)}"
+
+
+@dataclass
+class CachedItinerary:
+    itinerary: str
+    verification: str
+    similarity: float  # 1.0 for an exact key match
+    shifted_days: int  # dates in the itinerary were moved by this many days
+
+
+def _location_id(location: Location) -> str:
+    return f"{location.name}, {location.country}"
+
+
+def _resolve_location(text: str) -> Optional[str]:
+    text = text.split("(")[0].strip()
+    resolved = location_resolver.resolve(text)
+    return _location_id(resolved.location) if resolved else (normalize_location(text) or None)
+
+
+def _first_location(text: str) -> Optional[str]:
+    location = location_resolver.destination_in_text(text)
+    return _location_id(location) if location else None
+
+
+def extract_requirement_key(requirements: str) -> RequirementKey:
+    """Key fields from the user request and strategist analysis."""
+    facts = extract_requirements(requirements)
+    destination = DESTINATION_LINE_PATTERN.search(requirements)
+    origin = ORIGIN_LINE_PATTERN.search(requirements)
+    start = facts.start
+    window = None
+    if start is not None:
+        window = "early" if start.day <= 10 else "mid" if start.day <= 20 else "late"
+    return RequirementKey(
+        destination=_resolve_location(destination[1]) if destination else _first_location(requirements),
+        origin=_resolve_location(origin[1]) if origin else None,
+        month=start.strftime("%Y-%m") if start else None,
+        window=window,
+        nights=facts.nights,
+        travelers=facts.travelers,
+        budget_bucket=math.floor(facts.budget / ITINERARY_CACHE_BUDGET_BUCKET) * ITINERARY_CACHE_BUDGET_BUCKET
+        if facts.budget else None,
+        interests=sorted(facts.interests),
+        preferences=[name for name, pattern in PREFERENCES.items() if pattern.search(requirements)],
+        special_requirements=[name for name, pattern in SPECIAL_REQUIREMENTS.items() if pattern.search(requirements)],
+        start=start.isoformat() if start else None,
+        budget=facts.budget,
+    )
+
+
+def _fuzzy_fields(key: RequirementKey) -> tuple:
+    """Fields a fuzzy match must agree on exactly."""
+    return key.preferences, key.special_requirements, key.budget_bucket, key.month, key.window
+
+
+def embed(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> array:
+    """Local text embedding: L2-normalized counts of hashed character trigrams."""
+    vector = array("f", [0.0] * dimensions)
+    normalized = f" {normalize_location(text)} "
+    for i in range(len(normalized) - 2):
+        digest = hashlib.blake2b(normalized[i:i + 3].encode(), digest_size=4).digest()
+        vector[int.from_bytes(digest, "little") % dimensions] += 1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return array("f", (value / norm for value in vector))
+
+
+def cosine(a: array, b: array) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+def field_similarity(a: RequirementKey, b: RequirementKey) -> float:
+    """0-1 agreement of the structured fields, for fuzzy matches within one destination."""
+    scores = []
+    if a.start and b.start:
+        gap = abs((date.fromisoformat(a.start) - date.fromisoformat(b.start)).days)
+        scores.append(max(0.0, 1 - gap / 30))
+    if a.budget and b.budget:
+        scores.append(min(a.budget, b.budget) / max(a.budget, b.budget))
+    if a.interests or b.interests:
+        union = set(a.interests) | set(b.interests)
+        scores.append(len(set(a.interests) & set(b.interests)) / len(union))
+    scores.append(1.0 if a.origin == b.origin else 0.5)
+    return sum(scores) / len(scores)
+
+
+def _shift_match(match: re.Match, delta: timedelta) -> str:
+    if match.re is ISO_DATE_PATTERN:
+        try:
+            return (date(int(match[1]), int(match[2]), int(match[3])) + delta).isoformat()
+        except ValueError:
+            return match[0]
+
+    month = MONTHS[match["month"][:3].lower()]
+    year = int(match["year"]) if match["year"] else 2000  # a leap year, so Feb 29 parses
+    try:
+        start = date(year, month, int(match["day"])) + delta
+        end = date(year, month, int(match["end"])) + delta if match["end"] else None
+    except ValueError:
+        return match[0]
+    if match.re is DAY_MONTH_PATTERN:
+        if end is None:
+            text = f"{start.day} {start:%B}"
+        elif end.month == start.month:
+            text = f"{start.day}-{end.day} {start:%B}"
+        else:
+            text = f"{start.day} {start:%B} - {end.day} {end:%B}"
+        return f"{text} {start.year}" if match["year"] else text
+    text = f"{start:%B} {start.day}"
+    if end is not None:
+        text += f"-{end.day}" if end.month == start.month else f" - {end:%B} {end.day}"
+    return f"{text}, {start.year}" if match["year"] else text
+
+
+def shift_dates(text: str, days: int) -> str:
+    """Move every recognizable date in the text by `days` days, in its original format."""
+    if not days:
+        return text
+    delta = timedelta(days=days)
+    parts, position = [], 0
+    for match in date_matches(text):
+        parts += [text[position:match.start()], _shift_match(match, delta)]
+        position = match.end()
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def is_approved(verification: str) -> bool:
+    """Whether a verification report (rules or LLM) approved the itinerary without changes.
+
+    Reads the final approval status line when there is one, so words like
+    "failures" elsewhere in the report do not count as a rejection.
+    """
+    verdicts = VERDICT_PATTERN.findall(verification)
+    verdict = verdicts[-1] if verdicts else verification
+    return bool(APPROVED_PATTERN.search(verdict)) and not REJECTED_PATTERN.search(verdict)
+
+
+class ItineraryCache:
+    """Verified itineraries keyed by normalized requirements, in SQLite.
+
+    Exact key matches are reused directly. Otherwise the closest entry for
+    the same destination, traveler count, budget bucket and date window is
+    reused when it is similar enough (trigram embedding of the request plus date, budget and interest
+    agreement). Either way the itinerary's dates are shifted to the new
+    start date and it must pass the rule checks against the new
+    requirements before it is returned.
+    """
+
+    def __init__(
+        self,
+        path: str = ITINERARY_CACHE_PATH,
+        ttl: int = ITINERARY_CACHE_TTL,
+        min_similarity: float = ITINERARY_CACHE_MIN_SIMILARITY,
+        max_entries: int = ITINERARY_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.min_similarity = min_similarity
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "fuzzy_hits": 0, "misses": 0, "rejected": 0, "stores": 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS itineraries ("
+                "key TEXT PRIMARY KEY, destination TEXT, travelers INTEGER, requirement_key TEXT NOT NULL, "
+                "embedding BLOB NOT NULL, itinerary TEXT NOT NULL, verification TEXT NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_itineraries_destination ON itineraries (destination, travelers)"
+            )
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def lookup(self, user_query: str, strategist_output: str) -> Optional[CachedItinerary]:
+        requirements = f"{user_query}\n{strategist_output}"
+        key = extract_requirement_key(requirements)
+        if key.destination is None:
+            self._count("misses")
+            return None
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, requirement_key, embedding, itinerary, verification FROM itineraries "
+                "WHERE destination = ? AND travelers IS ? AND expires_at > ?",
+                (key.destination, key.travelers, time.time())
+            ).fetchall()
+        if not rows:
+            self._count("misses")
+            return None
+
+        query_embedding = embed(user_query)
+        best, best_similarity = None, 0.0
+        for row_key, requirement_json, embedding_blob, itinerary, verification in rows:
+            if row_key == key.cache_key():
+                best, best_similarity = (requirement_json, itinerary, verification), 1.0
+                break
+            cached_key = RequirementKey(**json.loads(requirement_json))
+            # Pace, party type, needs such as wheelchair access, the budget bucket and the
+            # date window are never traded for similarity; a request without a budget or
+            # dates only matches entries that lacked them too
+            if _fuzzy_fields(cached_key) != _fuzzy_fields(key):
+                continue
+            cached_embedding = array("f")
+            cached_embedding.frombytes(embedding_blob)
+            similarity = 0.5 * cosine(query_embedding, cached_embedding) + 0.5 * field_similarity(key, cached_key)
+            if similarity > best_similarity:
+                best, best_similarity = (requirement_json, itinerary, verification), similarity
+        if best is None or best_similarity < self.min_similarity:
+            self._count("misses")
+            return None
+
+        cached_key = RequirementKey(**json.loads(best[0]))
+        shifted_days = 0
+        if key.start and cached_key.start:
+            shifted_days = (date.fromisoformat(key.start) - date.fromisoformat(cached_key.start)).days
+        itinerary = shift_dates(best[1], shifted_days)
+        report = rule_verifier.verify(requirements, itinerary)
+        if report.failed:
+            logger.info(f"Cached itinerary for {key.destination} fails the new requirements: {report.failed[0].detail}")
+            self._count("rejected")
+            return None
+
+        self._count("hits" if best_similarity == 1.0 else "fuzzy_hits")
+        # The cached report describes the original dates; after a shift the fresh rule report is the accurate one
+        verification = best[2] if not shifted_days else report.render()
+        return CachedItinerary(itinerary, verification, best_similarity, shifted_days)
+
+    def store(self, user_query: str, strategist_output: str, itinerary: str, verification: str) -> bool:
+        """Cache an itinerary if its verification approved it; returns whether it was stored."""
+        key = extract_requirement_key(f"{user_query}\n{strategist_output}")
+        if key.destination is None or not is_approved(verification):
+            return False
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO itineraries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key.cache_key(), key.destination, key.travelers, json.dumps(asdict(key)),
+                 embed(user_query).tobytes(), itinerary, verification, now, now + self.ttl)
+            )
+            self._conn.execute("DELETE FROM itineraries WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM itineraries WHERE key NOT IN "
+                "(SELECT key FROM itineraries ORDER BY created_at DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            self._stats["stores"] += 1
+        return True
+
+    def invalidate(self, destination: Optional[str] = None) -> int:
+        """Drop cached itineraries for one city, or all; returns the count.
+
+        A city code drops every city sharing it, e.g. KUU covers Kullu and Manali.
+        """
+        destinations = None
+        if destination is not None:
+            code = destination.strip().upper()
+            sharing_code = [
+                _location_id(location) for location in location_resolver.locations if location.city_code == code
+            ]
+            destinations = sharing_code if is_iata_code(code) and sharing_code else [_resolve_location(destination)]
+        with self._lock, self._conn:
+            if destinations is None:
+                return self._conn.execute("DELETE FROM itineraries").rowcount
+            return self._conn.execute(
+                f"DELETE FROM itineraries WHERE destination IN ({', '.join('?' * len(destinations))})", destinations
+            ).rowcount
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._conn.execute(
+                "SELECT COUNT(*) FROM itineraries WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+        return stats
+
+
+# Create a global instance of ItineraryCache
+itinerary_cache = ItineraryCache()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the itinerary cache")
+    parser.add_argument("--path", default=ITINERARY_CACHE_PATH)
+    parser.add_argument("--invalidate", metavar="DESTINATION",
+                        help="City name, or a city code for every city sharing it; 'all' clears everything")
+    args = parser.parse_args()
+    cache = ItineraryCache(args.path)
+    if args.invalidate:
+        removed = cache.invalidate(None if args.invalidate == "all" else args.invalidate)
+        print(f"Removed {removed} cached itineraries")
+    print(json.dumps(cache.get_stats(), indent=2))
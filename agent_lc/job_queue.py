@@ -0,0 +1,360 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from .pipeline import StageEvent, TravelPipeline
+from .tracing import Trace
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Shared by the UI processes and the worker processes, so it must be a file
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Strategist and copywriter calls to an LLM at once, per worker process
+JOB_LLM_CONCURRENCY = int(os.getenv("JOB_LLM_CONCURRENCY", "4"))
+# Verification calls to an LLM at once (including section checks), per worker process
+JOB_VERIFICATION_CONCURRENCY = int(os.getenv("JOB_VERIFICATION_CONCURRENCY", "4"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# A running job whose worker has not checked in for this long is requeued
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 24 * 60 * 60)))
+# Streamlit: submit requests to the queue instead of running them in the UI process
+BACKGROUND_JOBS = os.getenv("BACKGROUND_JOBS", "false").lower() == "true"
+# Streamlit: workers started inside the Streamlit server; 0 leaves jobs to `python -m agent_lc.job_queue`
+JOB_EMBEDDED_WORKERS = int(os.getenv("JOB_EMBEDDED_WORKERS", "1"))
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+@dataclass
+class Job:
+    job_id: str
+    query: str
+    status: str  # "queued", "running", "completed", "failed" or "cancelled"
+    stage: Optional[str] = None  # stage running now, or the last one that ran
+    outputs: Dict[str, str] = field(default_factory=dict)  # stage -> output, filled as stages complete
+    cached: Dict[str, bool] = field(default_factory=dict)  # stage -> output reused from the itinerary cache
+    stage_latency: Dict[str, float] = field(default_factory=dict)
+    error: str = ""
+    timing: str = ""  # trace waterfall of the finished run
+    attempts: int = 0
+    worker: Optional[str] = None  # worker running the job
+    claim: Optional[str] = None  # token of the current claim; a requeued job gets a new one
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+
+class JobQueue:
+    """Travel requests waiting for, running on or finished by the worker pool, in SQLite.
+
+    UI processes submit jobs and poll them; worker processes claim them one
+    at a time and record each stage as it completes, so progress survives
+    page reloads and a job outlives the browser tab that submitted it.
+    Jobs of a worker that stops checking in are requeued.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, stale_after: float = JOB_STALE_AFTER,
+                 max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # Several processes share the file: wait for their writes instead of failing
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, query TEXT NOT NULL, status TEXT NOT NULL, stage TEXT, "
+                "outputs TEXT NOT NULL DEFAULT '{}', cached TEXT NOT NULL DEFAULT '{}', "
+                "stage_latency TEXT NOT NULL DEFAULT '{}', error TEXT NOT NULL DEFAULT '', "
+                "timing TEXT NOT NULL DEFAULT '', attempts INTEGER NOT NULL DEFAULT 0, "
+                "worker TEXT, claim TEXT, heartbeat REAL, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS workers (worker TEXT PRIMARY KEY, seen REAL NOT NULL)")
+
+    def submit(self, query: str) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, query, status, created_at) VALUES (?, ?, 'queued', ?)",
+                (job_id, query, time.time())
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, query, status, stage, outputs, cached, stage_latency, error, timing, attempts, "
+                "worker, claim, created_at, started_at, finished_at FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Job(
+            job_id=row[0], query=row[1], status=row[2], stage=row[3],
+            outputs=json.loads(row[4]), cached=json.loads(row[5]), stage_latency=json.loads(row[6]),
+            error=row[7], timing=row[8], attempts=row[9], worker=row[10], claim=row[11],
+            created_at=row[12], started_at=row[13], finished_at=row[14],
+        )
+
+    def position(self, job_id: str) -> int:
+        """Queued jobs ahead of this one (0 when it is next or already running)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < "
+                "(SELECT created_at FROM jobs WHERE job_id = ? AND status = 'queued')", (job_id,)
+            ).fetchone()[0]
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Mark the oldest queued job as running on this worker and return it, or None when idle."""
+        self.requeue_stale()
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO workers VALUES (?, ?)", (worker, now))
+            # One statement, so two workers can never claim the same job
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, claim = ?, heartbeat = ?, started_at = ?, "
+                "attempts = attempts + 1 WHERE job_id = "
+                "(SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1)",
+                (worker, token, now, now)
+            )
+            row = self._conn.execute("SELECT job_id FROM jobs WHERE claim = ?", (token,)).fetchone()
+        return self.get(row[0]) if row else None
+
+    def live_workers(self) -> int:
+        """Workers that polled the queue or checked in for a job within `stale_after` seconds."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE seen > ?", (time.time() - self.stale_after,)
+            ).fetchone()[0]
+
+    def heartbeat(self, job: Job) -> bool:
+        """Check in for a claimed job; False when the claim was lost (the job was requeued)."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO workers VALUES (?, ?)", (job.worker, now))
+            return self._conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE job_id = ? AND worker = ? AND claim = ? AND status = 'running'",
+                (now, job.job_id, job.worker, job.claim)
+            ).rowcount > 0
+
+    def record_event(self, job: Job, event: StageEvent) -> bool:
+        """Store a stage event of a claimed job: the running stage, or a completed stage's output.
+
+        Returns False, storing nothing, when the claim was lost.
+        """
+        if event.status == "started":
+            updates = {"stage": event.stage}
+        elif event.status == "completed":
+            # Only the claiming worker writes outputs, so its copy of the job is current
+            job.outputs[event.stage] = event.output
+            job.cached[event.stage] = event.cached
+            job.stage_latency[event.stage] = round(event.elapsed, 3)
+            updates = {"outputs": json.dumps(job.outputs), "cached": json.dumps(job.cached),
+                       "stage_latency": json.dumps(job.stage_latency)}
+        else:
+            updates = {"status": "failed", "error": f"{event.stage}: {event.error}", "finished_at": time.time()}
+        updates["heartbeat"] = time.time()
+        columns = ", ".join(f"{column} = ?" for column in updates)
+        with self._lock, self._conn:
+            return self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE job_id = ? AND worker = ? AND claim = ? AND status = 'running'",
+                (*updates.values(), job.job_id, job.worker, job.claim)
+            ).rowcount > 0
+
+    def finish(self, job: Job, timing: str = "", error: str = "") -> bool:
+        """Mark a claimed job completed, or failed with `error`; a job already failed by a stage stays failed.
+
+        Returns False, storing nothing, when the claim was lost.
+        """
+        with self._lock, self._conn:
+            owner = (job.job_id, job.worker, job.claim)
+            finished = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = CASE WHEN ? != '' THEN ? ELSE error END, "
+                "timing = ?, finished_at = ? WHERE job_id = ? AND worker = ? AND claim = ? AND status = 'running'",
+                ("failed" if error else "completed", error, error, timing, time.time(), *owner)
+            ).rowcount
+            finished += self._conn.execute(
+                "UPDATE jobs SET timing = ? WHERE job_id = ? AND worker = ? AND claim = ? "
+                "AND status = 'failed' AND timing = ''",
+                (timing, *owner)
+            ).rowcount
+        return finished > 0
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that no worker has picked up yet; returns whether it was cancelled."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            ).rowcount > 0
+
+    def requeue_stale(self) -> int:
+        """Requeue running jobs whose worker stopped checking in, failing those out of attempts."""
+        cutoff = time.time() - self.stale_after
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'worker stopped responding', finished_at = ? "
+                "WHERE status = 'running' AND heartbeat < ? AND attempts >= ?",
+                (time.time(), cutoff, self.max_attempts)
+            )
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = NULL, outputs = '{}', cached = '{}', "
+                "stage_latency = '{}', worker = NULL, claim = NULL WHERE status = 'running' AND heartbeat < ?",
+                (cutoff,)
+            ).rowcount
+        if requeued:
+            logger.warning(f"Requeued {requeued} jobs from unresponsive workers")
+        return requeued
+
+    def purge(self, older_than: float = JOB_RETENTION) -> int:
+        """Delete finished jobs older than `older_than` seconds; returns the count."""
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        with self._lock, self._conn:
+            return self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({placeholders}) AND finished_at < ?",
+                (*FINISHED_STATUSES, time.time() - older_than)
+            ).rowcount
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        stats = {status: 0 for status in ("queued", "running") + FINISHED_STATUSES}
+        stats.update(dict(rows))
+        return stats
+
+
+class JobWorkerPool:
+    """Runs queued jobs through the pipeline, `workers` at a time.
+
+    Each worker claims a job, streams its stage events into the queue and
+    checks in every few seconds while the job runs. A worker whose job was
+    requeued meanwhile stops running it. The pipeline's `llm_concurrency`
+    and `verification_concurrency` cap how many of those jobs call an LLM
+    at once. Queue calls block on
+    SQLite, so they run in threads to keep the event loop free.
+    """
+
+    def __init__(self, queue: JobQueue, pipeline: TravelPipeline, workers: int = JOB_WORKERS,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.pipeline = pipeline
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def _heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(min(self.queue.stale_after / 4, 15))
+            if not await asyncio.to_thread(self.queue.heartbeat, job):
+                return
+
+    async def run_job(self, job: Job) -> None:
+        logger.info(f"Running job {job.job_id} (attempt {job.attempts})")
+        trace = Trace(f"job_{job.job_id[:8]}")
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            async with aclosing(self.pipeline.run(job.query, trace)) as events:
+                async for event in events:
+                    if not await asyncio.to_thread(self.queue.record_event, job, event):
+                        logger.warning(f"Job {job.job_id} was requeued while running here; dropping this run")
+                        return
+            await asyncio.to_thread(self.queue.finish, job, timing=trace.render_waterfall(width=30))
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {str(e)}")
+            await asyncio.to_thread(self.queue.finish, job, error=str(e))
+        finally:
+            heartbeat.cancel()
+
+    async def _worker(self, index: int, stop: asyncio.Event) -> None:
+        worker = f"{self.name}/{index}"
+        while not stop.is_set():
+            job = await asyncio.to_thread(self.queue.claim, worker)
+            if job is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_job(job)
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Work until `stop` is set (forever without one)."""
+        stop = stop or asyncio.Event()
+        logger.info(f"Starting {self.workers} job workers on {self.name}")
+        await asyncio.gather(*(self._worker(index, stop) for index in range(self.workers)))
+
+
+def start_worker_thread(pool: JobWorkerPool) -> threading.Thread:
+    """Run the pool on its own event loop in a daemon thread, e.g. inside the Streamlit server."""
+    thread = threading.Thread(target=asyncio.run, args=(pool.run(),), name="job-workers", daemon=True)
+    thread.start()
+    return thread
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """The process-wide queue at JOB_QUEUE_PATH, opened (and the file created) on first use."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run travel planning jobs submitted by the Streamlit app")
+    parser.add_argument("--path", default=JOB_QUEUE_PATH)
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS, help="Jobs run at once")
+    parser.add_argument("--llm-concurrency", type=int, default=JOB_LLM_CONCURRENCY,
+                        help="Strategist and copywriter calls to an LLM at once")
+    parser.add_argument("--verification-concurrency", type=int, default=JOB_VERIFICATION_CONCURRENCY,
+                        help="Verification calls to an LLM at once")
+    parser.add_argument("--pipelined-verification", action="store_true")
+    parser.add_argument("--stats", action="store_true", help="Print job counts by status and exit")
+    parser.add_argument("--purge", action="store_true", help="Delete finished jobs past JOB_RETENTION and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    queue = JobQueue(args.path)
+    if args.stats or args.purge:
+        if args.purge:
+            print(f"Deleted {queue.purge()} finished jobs")
+        print(json.dumps(queue.get_stats(), indent=2))
+    else:
+        pipeline = TravelPipeline.from_env(
+            pipelined_verification=args.pipelined_verification,
+            llm_concurrency=args.llm_concurrency,
+            verification_concurrency=args.verification_concurrency,
+        )
+        try:
+            asyncio.run(JobWorkerPool(queue, pipeline, args.workers).run())
+        except KeyboardInterrupt:
+            print("Stopped; running jobs will be requeued once they go stale")
@@ -0,0 +1,282 @@
+import bisect
+import difflib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LOCATION_INDEX_PATH = os.getenv(
+    "LOCATION_INDEX_PATH", str(Path(__file__).parent / "data" / "locations.jsonl")
+)
+# Minimum similarity (0-1) for a fuzzy match to be accepted
+LOCATION_FUZZY_CUTOFF = float(os.getenv("LOCATION_FUZZY_CUTOFF", "0.8"))
+# Resolved queries remembered per resolver
+LOCATION_CACHE_SIZE = int(os.getenv("LOCATION_CACHE_SIZE", "4096"))
+
+IATA_CODE_PATTERN = re.compile(r"^[A-Z]{3}$")
+# A capitalized word or word pair after "to", "in" or "visit" names the destination
+DESTINATION_HINT_PATTERN = re.compile(r"\b(?:to|in|visit|visiting)\s+([A-Z][A-Za-z'-]+(?:\s+[A-Z][A-Za-z'-]+)?)")
+WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z'-]+")
+
+
+@dataclass
+class Location:
+    name: str
+    country: str
+    city_code: str
+    airports: List[str] = field(default_factory=list)
+    aliases: List[str] = field(default_factory=list)
+    lat: float = 0.0
+    lon: float = 0.0
+
+
+@dataclass
+class ResolvedLocation:
+    location: Location
+    match: str  # "exact", "code", "prefix" or "fuzzy"
+    airport: Optional[str] = None  # set when the query was an airport code
+
+
+def normalize_location(value: str) -> str:
+    """Lowercase, strip accents and punctuation: "São Paulo, Brazil" -> "sao paulo brazil"."""
+    value = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^a-z0-9 ]", " ", value.lower()).split())
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _distance_km(a: Location, b: Location) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (a.lat, a.lon, b.lat, b.lon))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * math.asin(math.sqrt(h))
+
+
+class LocationResolver:
+    """In-memory index mapping city names, aliases and IATA codes to locations.
+
+    Lookups try, in order: exact name/alias, IATA city or airport code,
+    unique name prefix, then trigram-filtered fuzzy matching for typos.
+    Cities without an airport are mapped to the nearest city that has one.
+    """
+
+    def __init__(self, locations: List[Location], fuzzy_cutoff: float = LOCATION_FUZZY_CUTOFF,
+                 cache_size: int = LOCATION_CACHE_SIZE):
+        self.locations = locations
+        self.fuzzy_cutoff = fuzzy_cutoff
+        # Per instance, so a rebuilt resolver never serves another index's results and is freed with it
+        self.cache_size = cache_size
+        self._resolved: "OrderedDict[str, Optional[ResolvedLocation]]" = OrderedDict()
+        self._resolved_lock = threading.Lock()
+        self._names: Dict[str, Location] = {}
+        self._codes: Dict[str, Location] = {}
+        self._airports: Dict[str, Location] = {}
+        self._trigram_index: Dict[str, Set[str]] = {}
+
+        for location in locations:
+            for name in [location.name] + location.aliases:
+                key = normalize_location(name)
+                self._names.setdefault(key, location)
+                for trigram in _trigrams(key):
+                    self._trigram_index.setdefault(trigram, set()).add(key)
+            for airport in location.airports:
+                self._airports.setdefault(airport, location)
+            # Several cities may share a code (e.g. towns served by one airport); prefer the airport city
+            current = self._codes.get(location.city_code)
+            if current is None or (location.airports and not current.airports):
+                self._codes[location.city_code] = location
+        self._sorted_names = sorted(self._names)
+        self._nearest: Dict[str, Location] = {}
+
+    @classmethod
+    def from_file(cls, path: str = LOCATION_INDEX_PATH) -> "LocationResolver":
+        locations = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    locations.append(Location(**json.loads(line)))
+        return cls(locations)
+
+    def resolve(self, query: str) -> Optional[ResolvedLocation]:
+        with self._resolved_lock:
+            if query in self._resolved:
+                self._resolved.move_to_end(query)
+                return self._resolved[query]
+        resolved = self._resolve(query)
+        with self._resolved_lock:
+            self._resolved[query] = resolved
+            if len(self._resolved) > self.cache_size:
+                self._resolved.popitem(last=False)
+        return resolved
+
+    def _resolve(self, query: str) -> Optional[ResolvedLocation]:
+        if not query or not query.strip():
+            return None
+        code = query.strip().upper()
+        if IATA_CODE_PATTERN.match(code):
+            if code in self._airports:
+                return ResolvedLocation(self._airports[code], "code", airport=code)
+            if code in self._codes:
+                return ResolvedLocation(self._codes[code], "code")
+
+        key = normalize_location(query)
+        # "Paris, France" -> "Paris"
+        candidates = [key]
+        if "," in query:
+            candidates.append(normalize_location(query.split(",")[0]))
+        for candidate in candidates:
+            if candidate in self._names:
+                return ResolvedLocation(self._names[candidate], "exact")
+
+        for candidate in candidates:
+            prefixed = self._prefix_matches(candidate)
+            if len(candidate) >= 3 and len({id(self._names[name]) for name in prefixed}) == 1:
+                return ResolvedLocation(self._names[prefixed[0]], "prefix")
+
+        for candidate in candidates:
+            best = self._fuzzy_match(candidate)
+            if best is not None:
+                return ResolvedLocation(self._names[best], "fuzzy")
+        return None
+
+    def _prefix_matches(self, key: str, limit: int = 10) -> List[str]:
+        start = bisect.bisect_left(self._sorted_names, key)
+        matches = []
+        for name in self._sorted_names[start:start + limit]:
+            if not name.startswith(key):
+                break
+            matches.append(name)
+        return matches
+
+    def _fuzzy_candidates(self, key: str) -> List[str]:
+        counts: Dict[str, int] = {}
+        for trigram in _trigrams(key):
+            for name in self._trigram_index.get(trigram, ()):
+                counts[name] = counts.get(name, 0) + 1
+        return sorted(counts, key=counts.get, reverse=True)[:20]
+
+    def _fuzzy_match(self, key: str) -> Optional[str]:
+        scored = [
+            (difflib.SequenceMatcher(None, key, name).ratio(), name)
+            for name in self._fuzzy_candidates(key)
+        ]
+        if not scored:
+            return None
+        score, name = max(scored)
+        return name if score >= self.fuzzy_cutoff else None
+
+    def suggest(self, query: str, limit: int = 5) -> List[str]:
+        """Closest known city names, for error messages."""
+        key = normalize_location(query)
+        names = self._prefix_matches(key, limit) or sorted(
+            self._fuzzy_candidates(key),
+            key=lambda name: difflib.SequenceMatcher(None, key, name).ratio(),
+            reverse=True
+        )
+        suggestions = []
+        for name in names:
+            location = self._names[name]
+            if location.name not in suggestions:
+                suggestions.append(location.name)
+        return suggestions[:limit]
+
+    def nearest_airport_city(self, location: Location) -> Location:
+        """The location itself if it has an airport, otherwise the closest one that does."""
+        if location.airports:
+            return location
+        if location.name not in self._nearest:
+            self._nearest[location.name] = min(
+                (other for other in self.locations if other.airports),
+                key=lambda other: _distance_km(location, other)
+            )
+        return self._nearest[location.name]
+
+    def city_code(self, query: str) -> Optional[str]:
+        """IATA city code for hotel searches."""
+        resolved = self.resolve(query)
+        return resolved.location.city_code if resolved else None
+
+    def flight_code(self, query: str) -> Optional[str]:
+        """Airport or city code for flight searches.
+
+        An explicit airport code is kept; a city resolves to its city code
+        (covering all its airports) or, without an airport, to the nearest
+        airport city.
+        """
+        resolved = self.resolve(query)
+        if resolved is None:
+            return None
+        if resolved.airport:
+            return resolved.airport
+        airport_city = self.nearest_airport_city(resolved.location)
+        if len(airport_city.airports) == 1:
+            return airport_city.airports[0]
+        return airport_city.city_code
+
+    def city_name(self, query: str) -> Optional[str]:
+        resolved = self.resolve(query)
+        return resolved.location.name if resolved else None
+
+    def _exact_city(self, words: List[str], i: int) -> Tuple[Optional[Location], int]:
+        # Word pairs first, so "New York" is not read as "York"
+        for size in (2, 1):
+            candidate = " ".join(words[i:i + size])
+            if len(candidate) <= 3 or not candidate[0].isupper():
+                continue
+            resolved = self.resolve(candidate)
+            if resolved is not None and resolved.match == "exact":
+                return resolved.location, size
+        return None, 1
+
+    def cities_in_text(self, text: str) -> List[Location]:
+        """Known cities named in free text, in order of appearance, without repeats.
+
+        Only capitalized exact names and aliases count, so ordinary words
+        are not fuzzy-matched to cities.
+        """
+        words = WORD_PATTERN.findall(text)
+        found: List[Location] = []
+        i = 0
+        while i < len(words):
+            location, size = self._exact_city(words, i)
+            if location is not None and location not in found:
+                found.append(location)
+            i += size
+        return found
+
+    def destination_in_text(self, text: str) -> Optional[Location]:
+        """Destination of a free-text request, e.g. "Manali, 2 people" -> Manali.
+
+        Cities after "to", "in" or "visit" win over others, so "New York to
+        Paris" resolves to Paris.
+        """
+        for match in DESTINATION_HINT_PATTERN.finditer(text):
+            cities = self.cities_in_text(match[1])
+            if cities:
+                return cities[0]
+        cities = self.cities_in_text(text)
+        return cities[0] if cities else None
+
+
+def is_iata_code(value: Optional[str]) -> bool:
+    return bool(value) and bool(IATA_CODE_PATTERN.match(value))
+
+
+# Create a global instance of LocationResolver
+location_resolver = LocationResolver.from_file()
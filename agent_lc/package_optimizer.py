@@ -0,0 +1,132 @@
+import bisect
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .tool_results import ActivityOption, FlightOffer, HotelOffer, TripPackage, compute_budget
+
+logger = logging.getLogger(__name__)
+
+# Package score = hotel stars * HOTEL_STAR_WEIGHT + (MAX_STOPS - stops) * NONSTOP_WEIGHT
+# + one point per activity (two when it matches an interest)
+HOTEL_STAR_WEIGHT = 2
+UNRATED_HOTEL_STARS = 3
+NONSTOP_WEIGHT = 2
+MAX_STOPS = 2
+INTEREST_MATCH_VALUE = 2
+ACTIVITIES_PER_DAY = 2
+
+
+def hotel_stars(hotel: HotelOffer) -> int:
+    try:
+        return int(float(hotel.rating))
+    except ValueError:
+        return UNRATED_HOTEL_STARS
+
+
+def flight_score(flight: FlightOffer) -> int:
+    return max(MAX_STOPS - flight.stops, 0) * NONSTOP_WEIGHT
+
+
+def activity_value(activity: ActivityOption, interests: Sequence[str]) -> int:
+    text = f"{activity.name} {activity.type}".lower()
+    return INTEREST_MATCH_VALUE if any(interest in text for interest in interests) else 1
+
+
+def pareto_front(options: Sequence, cost, value) -> List:
+    """Options not dominated by another that costs no more and is worth at least as much, cheapest first."""
+    front = []
+    best_value = None
+    for option in sorted(options, key=lambda option: (cost(option), -value(option))):
+        if best_value is None or value(option) > best_value:
+            front.append(option)
+            best_value = value(option)
+    return front
+
+
+def activity_frontier(
+    activities: Sequence[ActivityOption], travelers: int, max_count: int, interests: Sequence[str]
+) -> List[Tuple[float, int, Tuple[int, ...]]]:
+    """Cheapest activity set for every reachable total value, as (cost, value, indexes).
+
+    A 0/1 knapsack indexed by (count, value) instead of by budget: values
+    are small integers, so the table stays tiny and exact costs are kept.
+    The result is a Pareto frontier, so the best set for any remaining
+    budget is a single bisect away.
+    """
+    # (count, value) -> (cost, indexes)
+    states: Dict[Tuple[int, int], Tuple[float, Tuple[int, ...]]] = {(0, 0): (0.0, ())}
+    for index, activity in enumerate(activities):
+        cost = activity.price * travelers
+        value = activity_value(activity, interests)
+        for (count, total), (state_cost, chosen) in list(states.items()):
+            if count >= max_count:
+                continue
+            key = (count + 1, total + value)
+            candidate = (state_cost + cost, chosen + (index,))
+            if key not in states or candidate[0] < states[key][0]:
+                states[key] = candidate
+    sets = [(cost, value, chosen) for (_, value), (cost, chosen) in states.items()]
+    return pareto_front(sets, cost=lambda item: item[0], value=lambda item: item[1])
+
+
+def optimize_packages(
+    flights: Sequence[FlightOffer],
+    hotels: Sequence[HotelOffer],
+    activities: Sequence[ActivityOption],
+    budget: float,
+    days: int,
+    travelers: int = 1,
+    food_cost_per_day: float = 0,
+    interests: Sequence[str] = (),
+    limit: int = 3,
+) -> Tuple[List[TripPackage], int]:
+    """Best-value packages within budget, ranked by score; also returns the Pareto-optimal package count.
+
+    Dominated flights and hotels (pricier and no better) are dropped first,
+    combinations whose flight, hotel and food already exceed the budget are
+    skipped, and each remaining combination gets the most valuable activity
+    set from the precomputed frontier that still fits.
+    """
+    interests = [interest.strip().lower() for interest in interests if interest.strip()]
+    flights = pareto_front(flights, cost=lambda flight: flight.price, value=flight_score)
+    hotels = pareto_front(hotels, cost=lambda hotel: hotel.price, value=hotel_stars)
+    frontier = activity_frontier(activities, travelers, max(days, 1) * ACTIVITIES_PER_DAY, interests)
+    frontier_costs = [cost for cost, _, _ in frontier]
+    food_cost = food_cost_per_day * days
+
+    candidates = []
+    for flight in flights:
+        for hotel in hotels:
+            remaining = budget - flight.price - hotel.price - food_cost
+            if remaining < 0:
+                # Hotels are sorted by price, so the rest only cost more
+                break
+            # The frontier is sorted by cost and value together, so the last
+            # affordable set is the most valuable one that fits
+            cost, value, chosen = frontier[bisect.bisect_right(frontier_costs, remaining) - 1]
+            score = hotel_stars(hotel) * HOTEL_STAR_WEIGHT + flight_score(flight) + value
+            candidates.append((flight, hotel, cost, score, chosen))
+
+    front = pareto_front(candidates, cost=lambda item: item[0].price + item[1].price + item[2], value=lambda item: item[3])
+    packages = []
+    for flight, hotel, cost, score, chosen in sorted(front, key=lambda item: -item[3])[:limit]:
+        breakdown = compute_budget(budget, hotel.price, flight.price, cost, food_cost_per_day, days)
+        packages.append(TripPackage(
+            flight=flight,
+            hotel=hotel,
+            activities=[activities[index] for index in chosen],
+            activities_cost=round(cost, 2),
+            food_cost=round(breakdown.food_cost, 2),
+            total_cost=round(breakdown.total_cost, 2),
+            budget_left=round(breakdown.remaining, 2),
+            score=score,
+        ))
+    logger.info(f"Package search: {len(candidates)} candidates, {len(front)} on the Pareto front")
+    return packages, len(front)
+
+
+def cheapest_base_cost(flights: Sequence[FlightOffer], hotels: Sequence[HotelOffer]) -> Optional[float]:
+    """Cheapest flight plus cheapest hotel, for explaining why nothing fits."""
+    if not flights or not hotels:
+        return None
+    return min(flight.price for flight in flights) + min(hotel.price for hotel in hotels)
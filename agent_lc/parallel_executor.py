@@ -0,0 +1,322 @@
+import asyncio
+import contextvars
+import logging
+import os
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from dotenv import load_dotenv
+from langchain.agents import AgentExecutor
+from langchain.agents.tools import InvalidTool
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.callbacks import (
+    AsyncCallbackHandler,
+    AsyncCallbackManagerForChainRun,
+    BaseCallbackHandler,
+    CallbackManager,
+    CallbackManagerForChainRun,
+)
+from langchain_core.tools import BaseTool
+
+from .http_client import request_deadline
+from .tracing import add_to_current_span
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Maximum tool calls of one agent step running at once
+TOOL_CALL_CONCURRENCY = int(os.getenv("TOOL_CALL_CONCURRENCY", "4"))
+# Seconds before a tool call is abandoned and reported to the agent as an error.
+# The call is not cancelled: its thread runs to completion and its result is dropped,
+# but its HTTP requests stop retrying at the same deadline
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "60"))
+
+# plan_trip_packages runs a flight, hotel and activity search of its own
+DEFAULT_TOOL_TIMEOUTS = {"plan_trip_packages": 2 * TOOL_CALL_TIMEOUT}
+
+# How often pending calls are checked for timeouts and their callback events are delivered
+_POLL_INTERVAL = 0.05
+
+
+class _CallingThreadHandler(BaseCallbackHandler):
+    """Stands in for a callback handler on a tool thread; its tool events are replayed on the calling thread.
+
+    UI handlers such as the Streamlit tool-activity display may only run on
+    the thread that started the agent.
+    """
+
+    def __init__(self, handler: BaseCallbackHandler, events: "queue.SimpleQueue[Tuple[Callable, tuple, dict]]"):
+        self.handler = handler
+        self.events = events
+        self.raise_error = handler.raise_error
+        self.run_inline = handler.run_inline
+
+    @property
+    def ignore_agent(self) -> bool:
+        return self.handler.ignore_agent
+
+    @property
+    def ignore_chain(self) -> bool:
+        return self.handler.ignore_chain
+
+    @property
+    def ignore_llm(self) -> bool:
+        return self.handler.ignore_llm
+
+    @property
+    def ignore_retriever(self) -> bool:
+        return self.handler.ignore_retriever
+
+    @property
+    def ignore_chat_model(self) -> bool:
+        return self.handler.ignore_chat_model
+
+    def on_tool_start(self, *args: Any, **kwargs: Any) -> None:
+        self.events.put((self.handler.on_tool_start, args, kwargs))
+
+    def on_tool_end(self, *args: Any, **kwargs: Any) -> None:
+        self.events.put((self.handler.on_tool_end, args, kwargs))
+
+    def on_tool_error(self, *args: Any, **kwargs: Any) -> None:
+        self.events.put((self.handler.on_tool_error, args, kwargs))
+
+
+def _deliver(events: "queue.SimpleQueue[Tuple[Callable, tuple, dict]]") -> None:
+    while True:
+        try:
+            callback, args, kwargs = events.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            callback(*args, **kwargs)
+        except Exception as e:
+            logger.warning(f"Error in tool callback {callback.__qualname__}: {str(e)}")
+
+
+class ParallelToolAgentExecutor(AgentExecutor):
+    """AgentExecutor that runs the tool calls of one step concurrently.
+
+    When the model asks for several tools at once (hotels, flights and
+    activities), they run on a pool of at most `max_tool_concurrency`
+    threads, or tasks for `ainvoke`, so a step takes as long as its
+    slowest call instead of the sum. Observations keep the order of the
+    calls. A call running longer than its timeout is abandoned and the
+    agent gets an error observation for it, so one slow Amadeus request
+    cannot stall the rest of the step. Abandoned calls are not cancelled:
+    their threads keep running until they return, but HTTP requests made
+    under the call's `request_deadline` time out and stop retrying once
+    it has passed.
+
+    Tool start/end callbacks of the threaded calls are delivered on the
+    thread that runs the agent, while it waits for the step, so handlers
+    bound to that thread keep working. Those of abandoned calls are dropped.
+    """
+
+    max_tool_concurrency: int = TOOL_CALL_CONCURRENCY
+    tool_timeout: float = TOOL_CALL_TIMEOUT
+    tool_timeouts: Dict[str, float] = DEFAULT_TOOL_TIMEOUTS  # per-tool overrides of tool_timeout
+
+    def timeout_for(self, tool_name: str) -> float:
+        return self.tool_timeouts.get(tool_name, self.tool_timeout)
+
+    def _timeout_step(self, agent_action: AgentAction) -> AgentStep:
+        timeout = self.timeout_for(agent_action.tool)
+        logger.warning(f"Tool {agent_action.tool} timed out after {timeout:g}s")
+        add_to_current_span(tool_timeouts=1)
+        return AgentStep(
+            action=agent_action,
+            observation=f"Error: {agent_action.tool} did not respond within {timeout:g} seconds. "
+                        f"Continue with the other results or try again later.",
+        )
+
+    def _tool_call(self, agent_action: AgentAction, name_to_tool_map: Dict[str, BaseTool],
+                   color_mapping: Dict[str, str]) -> Tuple[BaseTool, Dict, Dict]:
+        """Tool, input and run kwargs for an action, as the base executor would call it."""
+        tool_run_kwargs = self.agent.tool_run_logging_kwargs()
+        if agent_action.tool not in name_to_tool_map:
+            tool_input = {
+                "requested_tool_name": agent_action.tool,
+                "available_tool_names": list(name_to_tool_map.keys()),
+            }
+            return InvalidTool(), tool_input, dict(tool_run_kwargs, verbose=self.verbose, color=None)
+        tool = name_to_tool_map[agent_action.tool]
+        if tool.return_direct:
+            tool_run_kwargs["llm_prefix"] = ""
+        return tool, agent_action.tool_input, dict(
+            tool_run_kwargs, verbose=self.verbose, color=color_mapping[agent_action.tool]
+        )
+
+    def _perform_action(
+        self,
+        agent_action: AgentAction,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        callbacks: Optional[CallbackManager] = None,
+    ) -> AgentStep:
+        tool, tool_input, kwargs = self._tool_call(agent_action, name_to_tool_map, color_mapping)
+        observation = tool.run(tool_input, callbacks=callbacks, **kwargs)
+        return AgentStep(action=agent_action, observation=observation)
+
+    @staticmethod
+    def _tool_callbacks(
+        run_manager: Optional[CallbackManagerForChainRun],
+        events: "queue.SimpleQueue[Tuple[Callable, tuple, dict]]",
+    ) -> Optional[CallbackManager]:
+        """Child callback manager for a threaded tool call, with sync handlers replaced by calling-thread stand-ins."""
+        if run_manager is None:
+            return None
+        callbacks = run_manager.get_child()
+        stand_ins: Dict[int, BaseCallbackHandler] = {}
+
+        def stand_in(handler: BaseCallbackHandler) -> BaseCallbackHandler:
+            if isinstance(handler, AsyncCallbackHandler):
+                return handler
+            return stand_ins.setdefault(id(handler), _CallingThreadHandler(handler, events))
+
+        callbacks.handlers = [stand_in(handler) for handler in callbacks.handlers]
+        callbacks.inheritable_handlers = [stand_in(handler) for handler in callbacks.inheritable_handlers]
+        return callbacks
+
+    def _run_actions(
+        self,
+        actions: List[AgentAction],
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> List[AgentStep]:
+        for agent_action in actions:
+            if run_manager:
+                run_manager.on_agent_action(agent_action, color="green")
+
+        started: Dict[int, float] = {}
+        events: "queue.SimpleQueue[Tuple[Callable, tuple, dict]]" = queue.SimpleQueue()
+
+        def run(index: int) -> AgentStep:
+            started[index] = time.monotonic()
+            callbacks = self._tool_callbacks(run_manager, events)
+            # HTTP retries stop at the same deadline the step waits for
+            with request_deadline(self.timeout_for(actions[index].tool), started[index]):
+                return self._perform_action(actions[index], name_to_tool_map, color_mapping, callbacks)
+
+        steps: List[Optional[AgentStep]] = [None] * len(actions)
+        pool = ThreadPoolExecutor(max_workers=min(len(actions), self.max_tool_concurrency),
+                                  thread_name_prefix="agent-tool")
+        try:
+            # Each call runs in its own copy of this context so its spans nest under the current stage
+            futures = {
+                pool.submit(contextvars.copy_context().run, run, index): index for index in range(len(actions))
+            }
+            pending = set(futures)
+            while pending:
+                now = time.monotonic()
+                deadlines = []
+                for future in list(pending):
+                    index = futures[future]
+                    if index not in started:
+                        continue
+                    deadline = started[index] + self.timeout_for(actions[index].tool)
+                    if now >= deadline:
+                        pending.discard(future)
+                        steps[index] = self._timeout_step(actions[index])
+                    else:
+                        deadlines.append(deadline - now)
+                if not pending:
+                    break
+                # Wake up regularly to deliver callback events and to start the clock of calls that were queued
+                done, pending = wait(pending, timeout=min(deadlines + [_POLL_INTERVAL]), return_when=FIRST_COMPLETED)
+                _deliver(events)
+                for future in done:
+                    steps[futures[future]] = future.result()
+            _deliver(events)
+        finally:
+            # Abandoned calls finish in the background; their results are dropped
+            pool.shutdown(wait=False, cancel_futures=True)
+        return steps
+
+    def _iter_next_step(
+        self,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        inputs: Dict[str, str],
+        intermediate_steps: List[Tuple[AgentAction, str]],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Iterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        if self.handle_parsing_errors:
+            # Recovering from unparsable model output is left to the base executor
+            yield from super()._iter_next_step(
+                name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+            )
+            return
+
+        output = self.agent.plan(
+            self._prepare_intermediate_steps(intermediate_steps),
+            callbacks=run_manager.get_child() if run_manager else None,
+            **inputs,
+        )
+        if isinstance(output, AgentFinish):
+            yield output
+            return
+        actions = [output] if isinstance(output, AgentAction) else output
+        yield from actions
+        yield from self._run_actions(actions, name_to_tool_map, color_mapping, run_manager)
+
+    async def _aperform_action(
+        self,
+        agent_action: AgentAction,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        run_manager: Optional[AsyncCallbackManagerForChainRun] = None,
+    ) -> AgentStep:
+        tool, tool_input, kwargs = self._tool_call(agent_action, name_to_tool_map, color_mapping)
+        observation = await tool.arun(tool_input, callbacks=run_manager.get_child() if run_manager else None, **kwargs)
+        return AgentStep(action=agent_action, observation=observation)
+
+    async def _aiter_next_step(
+        self,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        inputs: Dict[str, str],
+        intermediate_steps: List[Tuple[AgentAction, str]],
+        run_manager: Optional[AsyncCallbackManagerForChainRun] = None,
+    ) -> AsyncIterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        if self.handle_parsing_errors:
+            async for step in super()._aiter_next_step(
+                name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+            ):
+                yield step
+            return
+
+        output = await self.agent.aplan(
+            self._prepare_intermediate_steps(intermediate_steps),
+            callbacks=run_manager.get_child() if run_manager else None,
+            **inputs,
+        )
+        if isinstance(output, AgentFinish):
+            yield output
+            return
+        actions = [output] if isinstance(output, AgentAction) else output
+        for agent_action in actions:
+            yield agent_action
+
+        semaphore = asyncio.Semaphore(self.max_tool_concurrency)
+
+        async def perform(agent_action: AgentAction) -> AgentStep:
+            async with semaphore:
+                if run_manager:
+                    await run_manager.on_agent_action(agent_action, verbose=self.verbose, color="green")
+                timeout = self.timeout_for(agent_action.tool)
+                try:
+                    with request_deadline(timeout):
+                        return await asyncio.wait_for(
+                            self._aperform_action(agent_action, name_to_tool_map, color_mapping, run_manager),
+                            timeout=timeout,
+                        )
+                except asyncio.TimeoutError:
+                    return self._timeout_step(agent_action)
+
+        for step in await asyncio.gather(*(perform(agent_action) for agent_action in actions)):
+            yield step
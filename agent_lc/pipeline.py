@@ -0,0 +1,317 @@
+import asyncio
+import contextlib
+import logging
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .agent_factory import get_agent_executor, get_async_groq_client
+from .incremental_verification import IncrementalVerifier
+from .itinerary_cache import ItineraryCache, itinerary_cache
+from .prefetch import PREFETCH_SEARCHES, Prefetcher, prefetcher
+from .requirements_extractor import STRATEGIST_MODE, RequirementsExtractor, requirements_extractor
+from .rule_verification import VERIFICATION_MODE, rule_verifier
+from .tool_results import SearchResult, collect_search_results
+from .tracing import Trace, add_to_current_span, finish_trace, record_llm_usage, traced_call
+from .prompts import (
+    WEB_SEARCH_PROMPT,
+    TRAVEL_PLANNER_PROMPT,
+    COPYWRITER_TASK_PROMPT_TEMPLATE,
+    VERIFICATION_SYSTEM_PROMPT,
+    VERIFICATION_PROMPT_TEMPLATE,
+)
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("strategist", "copywriter", "verification")
+VERIFICATION_MODEL = "deepseek-r1-distill-llama-70b"
+
+
+@dataclass
+class StageEvent:
+    """Progress event emitted by TravelPipeline.run for each stage."""
+    stage: str
+    status: str  # "started", "completed" or "failed"
+    output: str = ""
+    error: str = ""
+    elapsed: float = 0.0
+    tool_results: List[SearchResult] = field(default_factory=list)  # Structured search results used by the stage
+    cached: bool = False  # output reused from the itinerary cache
+
+
+class TravelPipeline:
+    """Async strategist -> copywriter -> verification pipeline.
+
+    One instance can drive many concurrent runs: the executors and the Groq
+    client are stateless between calls.
+
+    With `pipelined_verification`, itinerary sections are verified while the
+    copywriter is still streaming the rest (this needs a streaming copywriter
+    executor), followed by a short aggregation pass.
+    """
+
+    def __init__(
+        self,
+        strategist_executor,
+        copywriter_executor,
+        groq_client,
+        max_retries: int = 3,
+        retry_delay: float = 2,
+        pipelined_verification: bool = False,
+        section_concurrency: int = 4,
+        verification_mode: str = VERIFICATION_MODE,
+        itinerary_cache: Optional[ItineraryCache] = None,
+        strategist_mode: str = STRATEGIST_MODE,
+        requirements_extractor: RequirementsExtractor = requirements_extractor,
+        prefetcher: Optional[Prefetcher] = None,
+        llm_concurrency: Optional[int] = None,
+        verification_concurrency: Optional[int] = None,
+    ):
+        self.strategist_executor = strategist_executor
+        self.copywriter_executor = copywriter_executor
+        self.groq_client = groq_client
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.pipelined_verification = pipelined_verification
+        self.section_concurrency = section_concurrency
+        self.verification_mode = verification_mode
+        self.itinerary_cache = itinerary_cache
+        self.strategist_mode = strategist_mode
+        self.requirements_extractor = requirements_extractor
+        self.prefetcher = prefetcher
+        # Cap LLM calls in flight across every run sharing this pipeline and its event loop:
+        # strategist and copywriter calls share one budget, verification calls have their own
+        self.llm_concurrency = llm_concurrency
+        self.verification_concurrency = verification_concurrency or llm_concurrency
+        # Semaphores bind to the loop they are first awaited on, so each running loop gets its own
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._slots_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, pipelined_verification: bool = False, **kwargs) -> "TravelPipeline":
+        return cls(
+            get_agent_executor(WEB_SEARCH_PROMPT, "web_search"),
+            get_agent_executor(TRAVEL_PLANNER_PROMPT, "travel_planner", streaming=pipelined_verification),
+            get_async_groq_client(),
+            pipelined_verification=pipelined_verification,
+            itinerary_cache=kwargs.pop("itinerary_cache", itinerary_cache),
+            prefetcher=kwargs.pop("prefetcher", prefetcher if PREFETCH_SEARCHES else None),
+            **kwargs
+        )
+
+    def _llm_slots(self, stage: str):
+        """Semaphore limiting the stage's LLM calls on the running loop, or a null context when uncapped."""
+        budget = "verification" if stage == "verification" else "agents"
+        limit = self.verification_concurrency if budget == "verification" else self.llm_concurrency
+        if not limit:
+            return contextlib.nullcontext()
+        loop = asyncio.get_running_loop()
+        with self._slots_lock:
+            slots = self._slots.setdefault(loop, {})
+            if budget not in slots:
+                slots[budget] = asyncio.Semaphore(limit)
+            return slots[budget]
+
+    async def _with_retries(self, stage: str, make_call):
+        for attempt in range(self.max_retries):
+            try:
+                async with self._llm_slots(stage):
+                    return await make_call()
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                logger.warning(f"{stage} attempt {attempt + 1} failed, retrying... Error: {str(e)}")
+                add_to_current_span(stage_retries=1)
+                await asyncio.sleep(self.retry_delay)
+
+    async def run_strategist(self, user_query: str, callbacks=None) -> str:
+        """Requirements analysis, extracted locally when possible and by the LLM strategist otherwise."""
+        if self.strategist_mode == "local":
+            analysis = self.requirements_extractor.analyze(user_query)
+            if analysis is not None:
+                add_to_current_span(llm_strategist_skipped=1)
+                return analysis
+        response = await self._with_retries("strategist", lambda: self.strategist_executor.ainvoke(
+            {"input": f"Collect travel requirements from this user request: {user_query}"},
+            config={"callbacks": callbacks} if callbacks else None
+        ))
+        return response["output"]
+
+    async def run_copywriter(self, user_query: str, strategist_output: str, callbacks=None) -> str:
+        output, _ = await self.run_copywriter_with_results(user_query, strategist_output, callbacks)
+        return output
+
+    async def run_copywriter_with_results(
+        self, user_query: str, strategist_output: str, callbacks=None
+    ) -> Tuple[str, List[SearchResult]]:
+        """Itinerary text plus the structured search results the copywriter's tools returned."""
+        copywriter_prompt = COPYWRITER_TASK_PROMPT_TEMPLATE.format(
+            user_requirements=user_query,
+            strategist_analysis=strategist_output
+        )
+        response = await self._with_retries("copywriter", lambda: self.copywriter_executor.ainvoke(
+            {"input": copywriter_prompt},
+            config={"callbacks": callbacks} if callbacks else None
+        ))
+        return response["output"], collect_search_results(response.get("intermediate_steps", []))
+
+    async def complete_verification(self, messages) -> str:
+        with traced_call(f"llm:{VERIFICATION_MODEL}", "llm"):
+            completion = await self._with_retries("verification", lambda: self.groq_client.chat.completions.create(
+                messages=messages,
+                model=VERIFICATION_MODEL,
+                temperature=0.0
+            ))
+            if completion.usage is not None:
+                record_llm_usage(VERIFICATION_MODEL, completion.usage.prompt_tokens, completion.usage.completion_tokens)
+        return completion.choices[0].message.content
+
+    def check_rules(self, user_query: str, strategist_output: str, copywriter_output: str, tool_results=None):
+        report = rule_verifier.verify(f"{user_query}\n{strategist_output}", copywriter_output, tool_results)
+        add_to_current_span(rule_check_failures=len(report.failed))
+        return report
+
+    def settled_by_rules(self, report) -> bool:
+        """True when VERIFICATION_MODE lets the rule report stand in for the LLM verification."""
+        if self.verification_mode == "rules" and not report.needs_llm:
+            add_to_current_span(llm_verifications_skipped=1)
+            return True
+        return False
+
+    async def run_verification(
+        self, user_query: str, strategist_output: str, copywriter_output: str, tool_results=None
+    ) -> str:
+        """Check the itinerary with the rule-based verifier, calling the LLM only when it cannot settle it."""
+        report = self.check_rules(user_query, strategist_output, copywriter_output, tool_results)
+        if self.settled_by_rules(report):
+            return report.render()
+
+        verification_prompt = VERIFICATION_PROMPT_TEMPLATE.format(
+            user_requirements=user_query,
+            strategist_analysis=strategist_output,
+            copywriter_itinerary=copywriter_output,
+            rule_findings=report.findings()
+        )
+        return await self.complete_verification([
+            {"role": "system", "content": VERIFICATION_SYSTEM_PROMPT},
+            {"role": "user", "content": verification_prompt}
+        ])
+
+    async def run(self, user_query: str, trace: Optional[Trace] = None) -> AsyncIterator[StageEvent]:
+        """Run all stages, yielding an event as each one starts and finishes.
+
+        Stops after the first failed stage. Timings, tokens, retries, cache
+        hits and HTTP time are recorded in `trace` (a new one if not given),
+        which is finished and reported when the run ends.
+        """
+        trace = trace or Trace("pipeline")
+        trace_handler = trace.callback_handler()
+        outputs: Dict[str, str] = {}
+        tool_results: Dict[str, List[SearchResult]] = {}
+        verifier = None
+        if self.pipelined_verification:
+            verifier = IncrementalVerifier(self.complete_verification, user_query, "", self.section_concurrency)
+
+        cached = None
+        prefetch = None
+
+        async def run_strategist():
+            nonlocal prefetch
+            if self.prefetcher is not None:
+                # Searches for the destination and dates in the request warm the tool cache for the copywriter
+                prefetch = self.prefetcher.start(user_query)
+            return await self.run_strategist(user_query, callbacks=[trace_handler])
+
+        async def run_copywriter():
+            nonlocal cached
+            try:
+                if self.itinerary_cache is not None:
+                    cached = self.itinerary_cache.lookup(user_query, outputs["strategist"])
+                    if cached is not None:
+                        add_to_current_span(itinerary_cache_hits=1)
+                        return cached.itinerary
+                callbacks = [trace_handler]
+                if verifier is not None:
+                    verifier.strategist_output = outputs["strategist"]
+                    callbacks.insert(0, verifier.callback_handler)
+                output, tool_results["copywriter"] = await self.run_copywriter_with_results(
+                    user_query, outputs["strategist"], callbacks=callbacks
+                )
+                return output
+            finally:
+                if prefetch is not None and prefetch.calls:
+                    used, wasted = self.prefetcher.finish(prefetch)
+                    add_to_current_span(prefetch_hits=used, prefetch_wasted=wasted)
+
+        async def run_verification():
+            if cached is not None:
+                return cached.verification
+            if verifier is None:
+                output = await self.run_verification(
+                    user_query, outputs["strategist"], outputs["copywriter"], tool_results.get("copywriter")
+                )
+            else:
+                report = self.check_rules(
+                    user_query, outputs["strategist"], outputs["copywriter"], tool_results.get("copywriter")
+                )
+                if self.settled_by_rules(report):
+                    verifier.reset_stream()  # Section checks still in flight are not needed
+                    output = report.render()
+                else:
+                    output = await verifier.finalize(outputs["copywriter"], report.findings())
+            if self.itinerary_cache is not None:
+                self.itinerary_cache.store(user_query, outputs["strategist"], outputs["copywriter"], output)
+            return output
+
+        stage_calls = {
+            "strategist": run_strategist,
+            "copywriter": run_copywriter,
+            "verification": run_verification,
+        }
+
+        async def run_stage(stage):
+            # The span is opened here rather than in the generator body, so it
+            # never stays current across a yield to the consumer
+            with trace.span(stage, "stage"):
+                return await stage_calls[stage]()
+
+        for stage in STAGES:
+            yield StageEvent(stage=stage, status="started")
+            start = time.perf_counter()
+            try:
+                outputs[stage] = await run_stage(stage)
+            except Exception as e:
+                logger.error(f"Error in {stage} stage: {str(e)}")
+                if verifier is not None:
+                    verifier.reset_stream()  # Cancel section checks still in flight
+                finish_trace(trace)
+                yield StageEvent(stage=stage, status="failed", error=str(e), elapsed=time.perf_counter() - start)
+                return
+            if stage == STAGES[-1]:
+                finish_trace(trace)
+            yield StageEvent(
+                stage=stage,
+                status="completed",
+                output=outputs[stage],
+                elapsed=time.perf_counter() - start,
+                tool_results=tool_results.get(stage, []),
+                cached=cached is not None and stage != "strategist"
+            )
+
+    async def run_to_completion(self, user_query: str, trace: Optional[Trace] = None) -> Dict[str, StageEvent]:
+        """Run the pipeline and return the final event of each stage that ran."""
+        results: Dict[str, StageEvent] = {}
+        async for event in self.run(user_query, trace):
+            if event.status != "started":
+                results[event.stage] = event
+        return results
+
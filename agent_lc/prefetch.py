@@ -0,0 +1,102 @@
+import contextvars
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Set, Tuple
+
+from dotenv import load_dotenv
+
+from .requirements_extractor import RequirementsExtractor, requirements_extractor
+from .tool_cache import ToolCache, tool_cache
+from .tools import Tools
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Start flight, hotel and activity searches as soon as the request names a destination and dates
+PREFETCH_SEARCHES = os.getenv("PREFETCH_SEARCHES", "true").lower() == "true"
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "6"))
+
+
+@dataclass
+class PrefetchRun:
+    """Searches started speculatively for one request."""
+    calls: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    futures: List[Future] = field(default_factory=list)
+    keys: Set[str] = field(default_factory=set)  # cache keys the searches fetched, filled as they start
+
+
+class Prefetcher:
+    """Warms the tool cache with the searches the copywriter is likely to make.
+
+    The destination, origin, dates and party size are read from the raw
+    request with the local requirements extractor, and the matching
+    searches run on a background pool while the strategist and the
+    copywriter's first LLM call are still in progress. Arguments are the
+    ones the copywriter gets from the strategist analysis (city codes,
+    ISO dates), so its calls hit the warmed entries. `finish` reports how
+    many prefetched searches it actually used.
+    """
+
+    def __init__(
+        self,
+        cache: ToolCache = tool_cache,
+        extractor: RequirementsExtractor = requirements_extractor,
+        max_workers: int = PREFETCH_CONCURRENCY,
+    ):
+        self.cache = cache
+        self.extractor = extractor
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+
+    def plan(self, user_query: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """(tool name, arguments) of the searches to prefetch; empty when destination or dates are unknown."""
+        requirements = self.extractor.extract(user_query)
+        destination = requirements.destination
+        if destination is None or requirements.start is None or not requirements.nights:
+            return []
+        dates = (requirements.start.isoformat(), requirements.end.isoformat())
+        adults = requirements.travelers or 1
+        calls = [
+            ("search_hotels", {"city": destination.city_code, "check_in": dates[0], "check_out": dates[1], "adults": adults}),
+            ("search_activities", {"city": destination.name}),
+        ]
+        if requirements.origin is not None:
+            calls.insert(0, ("search_flights", {
+                "origin": requirements.origin.name, "destination": destination.name,
+                "departure_date": dates[0], "return_date": dates[1], "adults": adults,
+            }))
+        return calls
+
+    def _fetch(self, keys: Set[str], tool_name: str, arguments: Dict[str, Any]) -> Any:
+        with self.cache.prefetching(keys):
+            try:
+                return getattr(Tools, tool_name).invoke(arguments)
+            except Exception as e:
+                logger.warning(f"Prefetch of {tool_name} failed: {str(e)}")
+
+    def start(self, user_query: str) -> PrefetchRun:
+        run = PrefetchRun(calls=self.plan(user_query))
+        for tool_name, arguments in run.calls:
+            # A copy of this context per search, so HTTP time lands in the caller's trace span
+            context = contextvars.copy_context()
+            run.futures.append(self._pool.submit(context.run, self._fetch, run.keys, tool_name, arguments))
+        if run.calls:
+            logger.info(f"Prefetching {', '.join(tool_name for tool_name, _ in run.calls)}")
+        return run
+
+    def finish(self, run: PrefetchRun) -> Tuple[int, int]:
+        """(used, wasted) prefetched searches, once the copywriter is done with the tools.
+
+        Searches still running are claimed, as wasted, when they complete.
+        """
+        for future in run.futures:
+            if not future.done():
+                future.add_done_callback(lambda _: self.cache.claim_prefetched(run.keys))
+        return self.cache.claim_prefetched(run.keys)
+
+
+# Create a global instance of Prefetcher
+prefetcher = Prefetcher()
@@ -52,9 +52,10 @@ Available Tools:
 - search_hotels: Search for hotels in a specific city with availability and pricing
 - search_flights: Search for flights between airports with pricing and availability  
 - search_activities: Search for activities and attractions in a specific city
+- plan_trip_packages: Combine flights, hotels and activities into the best-value packages within the budget
 
 Process:
-1. Use the search tools to find relevant hotels, flights, and activities matching user requirements
+1. Use the search tools to find relevant hotels, flights, and activities matching user requirements; when the user has a budget, call plan_trip_packages to pick a combination that fits it
 2. Create day-by-day schedule with activities, accommodations, and transportation
 3. Include budget breakdown and cost estimates
 4. Personalize content based on user interests and preferences
@@ -69,6 +70,105 @@ Guidelines:
 Output: Complete, personalized travel itinerary with all details and recommendations.
 """
 
+# Rolling summary of older strategist conversation turns
+HISTORY_SUMMARY_PROMPT_TEMPLATE = """
+Update the running summary of a travel planning conversation with the new messages below. Keep every concrete requirement (destination, dates, travelers, budget, interests, special requirements) and any decisions already made. Drop pleasantries. Keep it under 150 words.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW MESSAGES:
+{new_messages}
+
+Updated summary:
+"""
+
+# Copywriter task prompt built from the strategist's analysis
+COPYWRITER_TASK_PROMPT_TEMPLATE = """
+Based on the user requirements collected by the Strategist Agent, create a detailed travel itinerary.
+
+User Requirements: {user_requirements}
+Strategist Analysis: {strategist_analysis}
+
+Please create a comprehensive day-by-day itinerary including:
+- Hotel recommendations with pricing
+- Flight options with pricing
+- Daily activities and attractions
+- Restaurant recommendations
+- Budget breakdown
+"""
+
+VERIFICATION_SYSTEM_PROMPT = "You are a travel planning quality assurance specialist. Your job is to verify that generated itineraries meet all user requirements and maintain consistency."
+
+# DeepSeek itinerary verification prompt
+VERIFICATION_PROMPT_TEMPLATE = """
+You are a travel planning quality assurance specialist. Compare the user requirements with the generated itinerary to ensure consistency and completeness.
+
+USER REQUIREMENTS:
+{user_requirements}
+
+STRATEGIST AGENT ANALYSIS:
+{strategist_analysis}
+
+COPYWRITER AGENT ITINERARY:
+{copywriter_itinerary}
+
+AUTOMATED CHECKS (computed in code from the itinerary and search results; trust their numbers):
+{rule_findings}
+
+Please verify:
+1. Does the itinerary match all user requirements? (destination, dates, budget, interests)
+2. Are all requested activities included?
+3. Does the budget stay within the specified range?
+4. Is the itinerary logical and well-structured?
+5. Are there any missing critical information?
+6. For each FAIL above, is it a real problem and how should it be fixed?
+
+Provide a verification report with:
+- Overall consistency score (1-10)
+- List of any discrepancies found
+- Recommendations for improvements
+- Final approval status
+"""
+
+# Per-section verification used while the copywriter is still writing
+SECTION_VERIFICATION_PROMPT_TEMPLATE = """
+You are verifying one section of a travel itinerary while the rest is still being written. Check only this section against the user requirements.
+
+USER REQUIREMENTS:
+{user_requirements}
+
+STRATEGIST AGENT ANALYSIS:
+{strategist_analysis}
+
+ITINERARY SECTION ({section_kind}): {section_title}
+{section_text}
+
+Report briefly:
+- Discrepancies with the requirements (destination, dates, travelers, budget, interests), if any
+- Missing or unrealistic details in this section
+- Section score (1-10)
+"""
+
+# Final pass combining the per-section reports
+VERIFICATION_AGGREGATION_PROMPT_TEMPLATE = """
+Combine these per-section verification reports for one travel itinerary into a single verification report. Also flag problems that span sections, such as day numbering or dates that do not line up, or a budget total that does not match the costs listed elsewhere.
+
+USER REQUIREMENTS:
+{user_requirements}
+
+SECTION REPORTS:
+{section_reports}
+
+AUTOMATED CHECKS (computed in code from the itinerary and search results; trust their numbers):
+{rule_findings}
+
+Provide a verification report with:
+- Overall consistency score (1-10)
+- List of any discrepancies found
+- Recommendations for improvements
+- Final approval status
+"""
 
 # DeepSeek Cross-Check Prompt Template
 DEEPSEEK_CROSS_CHECK_PROMPT_TEMPLATE = """Compare these analyses and identify genuine gaps:
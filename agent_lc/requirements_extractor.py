@@ -0,0 +1,278 @@
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .location_resolver import Location, location_resolver
+from .rule_verification import NUMBER_WORDS, extract_requirements
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "local": answer the strategist stage from the local extractor when it is
+# confident enough, falling back to the LLM strategist otherwise;
+# "llm": always call the LLM strategist
+STRATEGIST_MODE = os.getenv("STRATEGIST_MODE", "local")
+# Minimum extraction confidence (0-1) for skipping the LLM strategist
+REQUIREMENTS_MIN_CONFIDENCE = float(os.getenv("REQUIREMENTS_MIN_CONFIDENCE", "0.8"))
+
+# Confidence contributed by each core field
+FIELD_WEIGHTS = {"destination": 0.35, "dates": 0.3, "travelers": 0.15, "budget": 0.2}
+# Requests naming several destinations are multi-city trips, better left to the LLM
+MULTI_CITY_PENALTY = 0.3
+
+CURRENCY_CODES = {
+    "$": "USD", "usd": "USD", "dollars": "USD",
+    "€": "EUR", "eur": "EUR", "euros": "EUR",
+    "£": "GBP", "gbp": "GBP", "pounds": "GBP",
+    "₹": "INR", "inr": "INR", "rs": "INR", "rs.": "INR", "rupees": "INR",
+}
+_AMOUNT = r"\d[\d,]*(?:\.\d+)?"
+# "$3,000", "€2.5k", "Rs 40000", "3000 USD", "2k euros"
+AMOUNT_PATTERN = re.compile(
+    rf"(?P<prefix>[$€£₹]|\b(?:USD|EUR|GBP|INR|Rs\.?)\s?)\s?(?P<amount>{_AMOUNT})(?P<thousands>k\b)?"
+    rf"|\b(?P<suffixed>{_AMOUNT})(?P<suffixed_thousands>k)?\s?(?P<suffix>USD|EUR|GBP|INR|dollars|euros|pounds|rupees)\b",
+    re.IGNORECASE
+)
+BUDGET_WORD_PATTERN = re.compile(r"budget|spend|under|up to|no more than|max(?:imum)?|total", re.IGNORECASE)
+PER_PERSON_PATTERN = re.compile(r"per (?:person|head|travell?er|adult)|\bpp\b|\beach\b", re.IGNORECASE)
+CLAUSE_SPLIT_PATTERN = re.compile(r"[;\n]|,\s|\.\s")
+ORIGIN_HINT_PATTERN = re.compile(r"\b(?:from|departing|leaving)\s+([A-Z][A-Za-z'-]+(?:\s+[A-Z][A-Za-z'-]+)?)")
+DAYS_PATTERN = re.compile(rf"\b(\d+|{'|'.join(NUMBER_WORDS)})[- ]days?\b", re.IGNORECASE)
+WEEKS_PATTERN = re.compile(r"\b(a|one|two|\d+)[- ]weeks?\b", re.IGNORECASE)
+
+SPECIAL_REQUIREMENTS = {
+    "accessibility": re.compile(r"wheelchair|accessib\w*|mobility|disabilit\w*", re.IGNORECASE),
+    "dietary": re.compile(r"vegetarian|vegan|halal|kosher|gluten[- ]free|allerg\w*", re.IGNORECASE),
+    "children": re.compile(r"\binfants?\b|\btoddlers?\b|\bbaby\b|\bkids?\b|children", re.IGNORECASE),
+    "pets": re.compile(r"\bpets?\b|\bdogs?\b|\bcats?\b", re.IGNORECASE),
+}
+
+
+@dataclass
+class Budget:
+    amount: float  # for the whole party
+    currency: str = "USD"
+    per_person: Optional[float] = None  # set when the request stated a per-person amount
+
+    def format(self, amount: float) -> str:
+        # Dollar amounts keep the "$" the rule verifier reads
+        return f"${amount:,.0f}" if self.currency == "USD" else f"{amount:,.0f} {self.currency}"
+
+    def __str__(self) -> str:
+        if self.per_person is not None:
+            return f"{self.format(self.amount)} total ({self.format(self.per_person)} per person)"
+        return f"{self.format(self.amount)} total"
+
+
+@dataclass
+class ExtractedRequirements:
+    """Requirements read from a request in code, with a 0-1 confidence score."""
+    destination: Optional[Location] = None
+    origin: Optional[Location] = None
+    other_cities: List[Location] = field(default_factory=list)  # further cities named besides origin and destination
+    start: Optional[date] = None
+    end: Optional[date] = None
+    nights: Optional[int] = None
+    travelers: Optional[int] = None
+    budget: Optional[Budget] = None
+    interests: List[str] = field(default_factory=list)
+    preferences: List[str] = field(default_factory=list)
+    special_requirements: List[str] = field(default_factory=list)
+    confidence: float = 0.0
+
+    @property
+    def missing(self) -> List[str]:
+        present = {
+            "destination": self.destination is not None,
+            "dates": self.start is not None and self.end is not None and self.end > self.start,
+            "travelers": self.travelers is not None,
+            "budget": self.budget is not None,
+        }
+        return [name for name, found in present.items() if not found]
+
+    def render(self) -> str:
+        """Analysis in the strategist's "TRAVEL REQUIREMENTS ANALYSIS" format."""
+        lines = [
+            "TRAVEL REQUIREMENTS ANALYSIS",
+            "",
+            "Extracted Information:",
+            f"- Destination: {_describe(self.destination) if self.destination else 'Not specified'}",
+        ]
+        if self.origin is not None:
+            lines.append(f"- Origin: {_describe(self.origin)}")
+        lines += [
+            f"- Dates: {self._dates()}",
+            f"- Travelers: {_travelers(self.travelers) if self.travelers else 'Not specified'}",
+            f"- Budget: {self.budget if self.budget else 'Not specified'}",
+            f"- Preferences: {', '.join(self.preferences + self.interests) or 'Not specified'}",
+            f"- Special Requirements: {', '.join(self.special_requirements) or 'None stated'}",
+            "",
+            "Destination Context:",
+            self._context(),
+            "",
+            "Analysis Summary:",
+            self._summary(),
+            "",
+            "Ready for itinerary creation.",
+        ]
+        return "\n".join(lines)
+
+    def _dates(self) -> str:
+        if self.start is None:
+            return "Not specified"
+        if self.end is None or self.end == self.start:
+            return f"{self.start.isoformat()} (return date not specified)"
+        return f"{self.start.isoformat()} to {self.end.isoformat()} ({self.nights} nights)"
+
+    def _context(self) -> str:
+        if self.destination is None:
+            return "Destination not identified."
+        airport_city = location_resolver.nearest_airport_city(self.destination)
+        if airport_city is self.destination:
+            access = f"Served by airports {', '.join(self.destination.airports)}."
+        else:
+            access = f"No airport; the nearest airport city is {airport_city.name} ({', '.join(airport_city.airports)})."
+        context = f"{self.destination.name} ({self.destination.country}, city code {self.destination.city_code}). {access}"
+        if self.start is not None:
+            context += f" Travel starts on a {self.start:%A} in {self.start:%B}."
+        return context
+
+    def _summary(self) -> str:
+        parts = []
+        if self.destination is not None and self.nights:
+            party = f" for {_travelers(self.travelers)}" if self.travelers else ""
+            parts.append(f"A {self.nights}-night trip to {self.destination.name}{party}.")
+        if self.budget is not None and self.nights and self.travelers:
+            daily = self.budget.amount / self.nights / self.travelers
+            parts.append(f"The budget allows about {self.budget.format(daily)} per person per night for everything.")
+        if self.interests:
+            parts.append(f"Plan days around {', '.join(self.interests)}.")
+        if self.other_cities:
+            parts.append(f"Also mentioned: {', '.join(city.name for city in self.other_cities)}.")
+        missing = self.missing
+        parts.append(f"Missing information: {', '.join(missing)}." if missing else "All core requirements were stated.")
+        return " ".join(parts)
+
+
+def _describe(location: Location) -> str:
+    return f"{location.name}, {location.country} (city code {location.city_code})"
+
+
+def _travelers(count: int) -> str:
+    return f"{count} traveler" if count == 1 else f"{count} travelers"
+
+
+def _count(value: str) -> int:
+    value = value.lower()
+    return NUMBER_WORDS.get(value) or (1 if value == "a" else int(value))
+
+
+def parse_amount(match: re.Match) -> Tuple[float, str]:
+    """(amount, currency code) of an AMOUNT_PATTERN match."""
+    if match["amount"] is not None:
+        amount, thousands, currency = match["amount"], match["thousands"], match["prefix"].strip()
+    else:
+        amount, thousands, currency = match["suffixed"], match["suffixed_thousands"], match["suffix"]
+    value = float(amount.replace(",", "")) * (1000 if thousands else 1)
+    return value, CURRENCY_CODES.get(currency.lower(), "USD")
+
+
+def extract_budget(text: str, travelers: Optional[int]) -> Optional[Budget]:
+    """The budget ceiling: an amount in a clause about budget or spending, or the only amount in the text."""
+    clauses = [clause for clause in CLAUSE_SPLIT_PATTERN.split(text) if AMOUNT_PATTERN.search(clause)]
+    if not clauses:
+        return None
+    budget_clauses = [clause for clause in clauses if BUDGET_WORD_PATTERN.search(clause)]
+    if budget_clauses:
+        clause = budget_clauses[0]
+    elif len(clauses) == 1 and len(AMOUNT_PATTERN.findall(clauses[0])) == 1:
+        clause = clauses[0]
+    else:
+        return None
+    amount, currency = max(parse_amount(match) for match in AMOUNT_PATTERN.finditer(clause))
+    if PER_PERSON_PATTERN.search(clause):
+        return Budget(amount * (travelers or 1), currency, per_person=amount)
+    return Budget(amount, currency)
+
+
+def _trip_nights(text: str) -> Optional[int]:
+    """Trip length from "5 days" or "two weeks" when no nights are stated."""
+    days = DAYS_PATTERN.search(text)
+    if days and _count(days[1]) > 1:
+        return _count(days[1]) - 1
+    weeks = WEEKS_PATTERN.search(text)
+    return 7 * _count(weeks[1]) if weeks else None
+
+
+class RequirementsExtractor:
+    """Reads destination, dates, travelers, budget and interests from a request without an LLM call.
+
+    Dates and travelers come from the rule-verification parsers, cities
+    from the location index and preferences from keyword taxonomies. The
+    confidence score is the weight of the core fields that were found,
+    so callers can hand vague or multi-city requests to the LLM strategist.
+    """
+
+    def __init__(self, min_confidence: float = REQUIREMENTS_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+
+    def extract(self, text: str) -> ExtractedRequirements:
+        facts = extract_requirements(text)
+        result = ExtractedRequirements(
+            start=facts.start,
+            end=facts.end,
+            nights=facts.nights,
+            travelers=facts.travelers,
+            interests=facts.interests,
+            preferences=facts.preferences,
+        )
+        if result.start is not None and result.end == result.start:
+            nights = result.nights or _trip_nights(text)
+            if nights:
+                result.nights = nights
+                result.end = result.start + timedelta(days=nights)
+
+        result.destination = location_resolver.destination_in_text(text)
+        origin = ORIGIN_HINT_PATTERN.search(text)
+        if origin:
+            cities = location_resolver.cities_in_text(origin[1])
+            result.origin = cities[0] if cities and cities[0] is not result.destination else None
+        result.other_cities = [
+            city for city in location_resolver.cities_in_text(text) if city not in (result.destination, result.origin)
+        ]
+
+        result.budget = extract_budget(text, result.travelers)
+        result.special_requirements = [
+            f"{name} ({', '.join(sorted({match.lower() for match in pattern.findall(text)}))})"
+            for name, pattern in SPECIAL_REQUIREMENTS.items() if pattern.search(text)
+        ]
+
+        missing = result.missing
+        confidence = sum(weight for name, weight in FIELD_WEIGHTS.items() if name not in missing)
+        if result.other_cities:
+            confidence -= MULTI_CITY_PENALTY
+        result.confidence = round(max(confidence, 0.0), 2)
+        return result
+
+    def analyze(self, text: str) -> Optional[str]:
+        """The strategist analysis for text, or None when the LLM strategist should handle it.
+
+        Every core field must be found: a missing one (say, "with my wife"
+        leaves the traveler count open) goes to the LLM whatever the score.
+        """
+        extracted = self.extract(text)
+        if extracted.missing or extracted.confidence < self.min_confidence:
+            logger.info(f"Local requirements extraction not confident ({extracted.confidence}), missing {extracted.missing}")
+            return None
+        return extracted.render()
+
+
+# Create a global instance of RequirementsExtractor
+requirements_extractor = RequirementsExtractor()
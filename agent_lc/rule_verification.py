@@ -0,0 +1,402 @@
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv
+
+from .incremental_verification import split_sections
+from .tool_results import SearchResult, cheapest, compute_budget
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "rules": report from the rule checks alone when they all pass, and call the
+# LLM verifier only when a rule fails or a core fact could not be checked;
+# "llm": always call the LLM verifier (the rule findings are still included)
+VERIFICATION_MODE = os.getenv("VERIFICATION_MODE", "rules")
+# Fraction by which the itinerary total may exceed the budget
+VERIFICATION_BUDGET_TOLERANCE = float(os.getenv("VERIFICATION_BUDGET_TOLERANCE", "0"))
+
+# Checks that must have run, not been skipped, for a rules-only verdict
+REQUIRED_CHECKS = ("dates", "budget")
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+_MONTH = (
+    r"(?P<month>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t|tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+)
+ISO_DATE_PATTERN = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_RANGE = r"(?P<day>\d{1,2})(?:st|nd|rd|th)?(?:\s*(?:-|–|to)\s*(?P<end>\d{1,2})(?:st|nd|rd|th)?)?"
+_YEAR = r"(?:,?\s+(?P<year>\d{4}))?"
+# "June 15", "June 15-22, 2025", "15 June", "15-22 June"
+MONTH_DAY_PATTERN = re.compile(rf"\b{_MONTH}\s+{_RANGE}\b{_YEAR}", re.IGNORECASE)
+DAY_MONTH_PATTERN = re.compile(rf"\b{_RANGE}\s+{_MONTH}\b{_YEAR}", re.IGNORECASE)
+MONEY_PATTERN = re.compile(r"(?:\$|USD\s?)\s?(\d[\d,]*(?:\.\d+)?)|\b(\d[\d,]*(?:\.\d+)?)\s?(?:USD|dollars)\b", re.IGNORECASE)
+TRAVELERS_PATTERN = re.compile(
+    rf"\b(\d+|{'|'.join(NUMBER_WORDS)})\s+(?:adults?|travell?ers|people|persons|guests|passengers)\b", re.IGNORECASE
+)
+NIGHTS_PATTERN = re.compile(r"\b(\d+)\s+nights?\b", re.IGNORECASE)
+DAY_NUMBER_PATTERN = re.compile(r"\bday\s*(\d+)", re.IGNORECASE)
+BUDGET_LIMIT_PATTERN = re.compile(r"budget|under|up to|no more than|max(?:imum)?", re.IGNORECASE)
+
+COST_CATEGORIES = [
+    ("total", re.compile(r"\btotal\b", re.IGNORECASE)),
+    ("flights", re.compile(r"flight|airfare", re.IGNORECASE)),
+    ("hotel", re.compile(r"hotel|accommodation|lodging", re.IGNORECASE)),
+]
+# Interest -> words showing it in requirements or in an itinerary
+INTERESTS = {
+    "museums": re.compile(r"museum|musee|gallery|galleries", re.IGNORECASE),
+    "food": re.compile(r"\bfood|cuisine|culinary|restaurant|bistro|tasting|market", re.IGNORECASE),
+    "walking": re.compile(r"\bwalk", re.IGNORECASE),
+    "beaches": re.compile(r"\bbeach", re.IGNORECASE),
+    "hiking": re.compile(r"\bhik(?:e|ing)|trek", re.IGNORECASE),
+    "nightlife": re.compile(r"nightlife|\bbars?\b|\bclubs?\b", re.IGNORECASE),
+    "shopping": re.compile(r"shopping|boutique", re.IGNORECASE),
+    "history": re.compile(r"histor|heritage|castle|palace", re.IGNORECASE),
+}
+# Travel style -> words showing it; shared with the requirements extractor
+PREFERENCES = {
+    "luxury": re.compile(r"luxur|upscale|5[- ]star|five[- ]star", re.IGNORECASE),
+    "budget": re.compile(r"budget[- ]friendly|on a budget|cheap|affordable|backpack", re.IGNORECASE),
+    "adventure": re.compile(r"adventur|thrill|paraglid|raft|trek", re.IGNORECASE),
+    "cultural": re.compile(r"cultur|tradition|temple|heritage", re.IGNORECASE),
+    "nature": re.compile(r"\bnature|mountain|scenic|\bviews?\b|valley|\blakes?\b|national park", re.IGNORECASE),
+    "relaxed": re.compile(r"relax|laid[- ]back|slow pace|unwind", re.IGNORECASE),
+    "family": re.compile(r"\bfamily|\bkids?\b|children", re.IGNORECASE),
+    "romantic": re.compile(r"romantic|honeymoon|anniversary", re.IGNORECASE),
+}
+# Styles an itinerary shows through what it schedules, so they are checked like interests;
+# the others (comfort, pace, party) are judged by the LLM verifier
+ACTIVITY_PREFERENCES = ("adventure", "cultural", "nature")
+# Requests talking about interests none of the words above cover are also left to the LLM
+INTEREST_HINT_PATTERN = re.compile(
+    r"\binterest|\blove\b|\benjoy|\bkeen on\b|\bactivities\b|\bexperiences?\b|\bsightseeing\b|\bexplor",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class TripFacts:
+    """Facts extracted from free text; None when the text does not state them."""
+    start: Optional[date] = None
+    end: Optional[date] = None
+    dates: List[date] = field(default_factory=list)
+    nights: Optional[int] = None
+    days: Optional[int] = None  # highest "Day N" heading
+    travelers: Optional[int] = None
+    budget: Optional[float] = None
+    costs: Dict[str, float] = field(default_factory=dict)  # category -> amount, "total" when stated
+    interests: List[str] = field(default_factory=list)  # INTERESTS and ACTIVITY_PREFERENCES shown in the text
+    preferences: List[str] = field(default_factory=list)  # the other PREFERENCES
+    mentions_interests: bool = False  # the text talks about interests, recognized or not
+
+
+@dataclass
+class RuleCheck:
+    name: str
+    status: str  # "pass", "fail", "skip" or "review" (only the LLM verifier can settle it)
+    detail: str = ""
+
+
+@dataclass
+class RuleVerificationReport:
+    checks: List[RuleCheck]
+
+    @property
+    def failed(self) -> List[RuleCheck]:
+        return [check for check in self.checks if check.status == "fail"]
+
+    @property
+    def to_review(self) -> List[RuleCheck]:
+        return [check for check in self.checks if check.status == "review"]
+
+    @property
+    def needs_llm(self) -> bool:
+        """True when the LLM verifier still has to look at the itinerary."""
+        skipped = {check.name for check in self.checks if check.status == "skip"}
+        return bool(self.failed or self.to_review) or any(name in skipped for name in REQUIRED_CHECKS)
+
+    def findings(self) -> str:
+        """One line per check, for the LLM verification prompt."""
+        return "\n".join(f"- {check.status.upper()} {check.name}: {check.detail}" for check in self.checks)
+
+    def render(self) -> str:
+        """Verification report in the same shape as the LLM verifier's."""
+        ran = [check for check in self.checks if check.status in ("pass", "fail")]
+        score = round(10 * (len(ran) - len(self.failed)) / len(ran)) if ran else 0
+        discrepancies = "\n".join(f"- {check.detail}" for check in self.failed) or "None found."
+        status = "NEEDS REVIEW" if self.failed or self.to_review else "APPROVED"
+        return (
+            f"Overall consistency score: {score}/10 (automated checks)\n\n"
+            f"Checks:\n{self.findings()}\n\n"
+            f"Discrepancies:\n{discrepancies}\n\n"
+            f"Final approval status: {status}"
+        )
+
+
+def _to_number(value: str) -> float:
+    return float(value.replace(",", ""))
+
+
+def extract_amounts(text: str) -> List[float]:
+    return [_to_number(dollars or suffixed) for dollars, suffixed in MONEY_PATTERN.findall(text)]
+
+
+def date_matches(text: str) -> List[re.Match]:
+    """Non-overlapping date matches in text order; on overlaps ISO beats "June 15", which beats "15 June".
+
+    So "Day 5 June 20" reads as June 20, not June 5.
+    """
+    matches: List[re.Match] = []
+    for pattern in (ISO_DATE_PATTERN, MONTH_DAY_PATTERN, DAY_MONTH_PATTERN):
+        for match in pattern.finditer(text):
+            if not any(match.start() < other.end() and other.start() < match.end() for other in matches):
+                matches.append(match)
+    return sorted(matches, key=lambda match: match.start())
+
+
+def extract_dates(text: str, default_year: Optional[int] = None) -> List[date]:
+    """ISO dates plus "June 15" / "15-22 June" style dates, in order of appearance.
+
+    Dates without a year take `default_year`, else the year of the first
+    explicit date in the text, else the current year.
+    """
+    matches = date_matches(text)
+    explicit_years = [int(match[1] if match.re is ISO_DATE_PATTERN else match["year"])
+                      for match in matches if match.re is ISO_DATE_PATTERN or match["year"]]
+    year = default_year or (explicit_years[0] if explicit_years else None)
+    found = []
+    previous = None
+    for match in matches:
+        if match.re is ISO_DATE_PATTERN:
+            try:
+                previous = date(int(match[1]), int(match[2]), int(match[3]))
+                found.append(previous)
+            except ValueError:
+                pass
+            continue
+        month = MONTHS[match["month"][:3].lower()]
+        for day in filter(None, (match["day"], match["end"])):
+            try:
+                value = date(int(match["year"] or year or date.today().year), month, int(day))
+                if not match["year"]:
+                    # Trips are planned ahead, and "Dec 30 - Jan 2" crosses into the next year
+                    if (year is None and value < date.today()) or (previous and (previous - value).days > 180):
+                        value = value.replace(year=value.year + 1)
+            except ValueError:
+                continue
+            found.append(value)
+            previous = value
+    return found
+
+
+def extract_travelers(text: str) -> Optional[int]:
+    match = TRAVELERS_PATTERN.search(text)
+    if match:
+        value = match[1].lower()
+        return NUMBER_WORDS.get(value) or int(value)
+    if re.search(r"\bcouple\b|\bhoneymoon", text, re.IGNORECASE):
+        return 2
+    if re.search(r"\bsolo\b", text, re.IGNORECASE):
+        return 1
+    return None
+
+
+def _interests(text: str) -> List[str]:
+    themes = {**INTERESTS, **{name: PREFERENCES[name] for name in ACTIVITY_PREFERENCES}}
+    return [name for name, pattern in themes.items() if pattern.search(text)]
+
+
+def extract_requirements(text: str) -> TripFacts:
+    """Dates, length, travelers, budget ceiling and interests from the request and strategist analysis."""
+    facts = TripFacts()
+    facts.dates = extract_dates(text)
+    nights = NIGHTS_PATTERN.search(text)
+    facts.nights = int(nights[1]) if nights else None
+    if facts.dates:
+        facts.start, facts.end = min(facts.dates), max(facts.dates)
+        if facts.start == facts.end and facts.nights:
+            facts.end = date.fromordinal(facts.start.toordinal() + facts.nights)
+        elif facts.nights is None and facts.end > facts.start:
+            facts.nights = (facts.end - facts.start).days
+    facts.travelers = extract_travelers(text)
+    limits = [amount for line in text.splitlines() if BUDGET_LIMIT_PATTERN.search(line) for amount in extract_amounts(line)]
+    facts.budget = max(limits) if limits else None
+    facts.interests = _interests(text)
+    facts.preferences = [
+        name for name, pattern in PREFERENCES.items() if name not in ACTIVITY_PREFERENCES and pattern.search(text)
+    ]
+    facts.mentions_interests = bool(INTEREST_HINT_PATTERN.search(text))
+    return facts
+
+
+def _cost_category(label: str) -> str:
+    for category, pattern in COST_CATEGORIES:
+        if pattern.search(label):
+            return category
+    return "other"
+
+
+def extract_itinerary(text: str, default_year: Optional[int] = None) -> TripFacts:
+    """Dates, day count, travelers and budget line items from the copywriter's itinerary."""
+    facts = TripFacts()
+    facts.dates = extract_dates(text, default_year)
+    facts.travelers = extract_travelers(text)
+    sections = split_sections(text, min_section_chars=1)
+    day_numbers = [int(number) for section in sections if section.kind == "day"
+                   for number in DAY_NUMBER_PATTERN.findall(section.title)]
+    facts.days = max(day_numbers) if day_numbers else None
+
+    # "- Flights: $1240" lines of the budget section; the first amount on a line is its cost
+    budget_lines = [line for section in sections if section.kind == "budget" for line in section.text.splitlines()[1:]]
+    if not budget_lines:
+        budget_lines = [line for line in text.splitlines() if re.match(r"\W*(?:grand\s+)?total\b", line, re.IGNORECASE)]
+    for line in budget_lines:
+        amounts = extract_amounts(line)
+        if not amounts:
+            continue
+        category = _cost_category(line.split(":")[0] if ":" in line else line)
+        if category == "total" and "total" in facts.costs:
+            continue  # keep the first total, later ones are usually per-person or alternatives
+        facts.costs[category] = facts.costs.get(category, 0) + amounts[0]
+    facts.interests = _interests(text)
+    return facts
+
+
+class RuleVerifier:
+    """Checks an itinerary against the requirements in code, without an LLM call.
+
+    Covers the mechanical parts of verification (dates, trip length,
+    travelers, budget and its arithmetic, quoted prices against the search
+    results, requested interests); anything it cannot read is reported as
+    skipped so the caller can escalate to the LLM verifier.
+    """
+
+    def __init__(self, budget_tolerance: float = VERIFICATION_BUDGET_TOLERANCE, price_tolerance: float = 0.05):
+        self.budget_tolerance = budget_tolerance
+        self.price_tolerance = price_tolerance
+
+    def verify(
+        self,
+        requirements: str,
+        itinerary: str,
+        tool_results: Optional[Sequence[SearchResult]] = None,
+    ) -> RuleVerificationReport:
+        wanted = extract_requirements(requirements)
+        planned = extract_itinerary(itinerary, wanted.start.year if wanted.start else None)
+        checks = [
+            self._check_dates(wanted, planned),
+            self._check_trip_length(wanted, planned),
+            self._check_travelers(wanted, planned),
+            *self._check_budget(wanted, planned),
+            self._check_search_prices(wanted, planned, tool_results or []),
+            self._check_interests(wanted, planned),
+            *self._check_preferences(wanted),
+        ]
+        return RuleVerificationReport(checks)
+
+    def _check_dates(self, wanted: TripFacts, planned: TripFacts) -> RuleCheck:
+        if wanted.start is None or not planned.dates:
+            return RuleCheck("dates", "skip", "no travel dates found")
+        outside = sorted({day for day in planned.dates if not wanted.start <= day <= wanted.end})
+        if outside:
+            return RuleCheck("dates", "fail", (
+                f"itinerary dates {', '.join(map(str, outside))} fall outside {wanted.start} to {wanted.end}"
+            ))
+        return RuleCheck("dates", "pass", f"all itinerary dates within {wanted.start} to {wanted.end}")
+
+    def _check_trip_length(self, wanted: TripFacts, planned: TripFacts) -> RuleCheck:
+        if wanted.nights is None or planned.days is None:
+            return RuleCheck("trip_length", "skip", "trip length or day plan not found")
+        # A 7-night trip is planned as 7 or 8 days, depending on whether departure day gets its own entry
+        if planned.days not in (wanted.nights, wanted.nights + 1):
+            return RuleCheck("trip_length", "fail", f"{planned.days} days planned for a {wanted.nights}-night trip")
+        return RuleCheck("trip_length", "pass", f"{planned.days} days for {wanted.nights} nights")
+
+    def _check_travelers(self, wanted: TripFacts, planned: TripFacts) -> RuleCheck:
+        if wanted.travelers is None or planned.travelers is None:
+            return RuleCheck("travelers", "skip", "traveler count not stated in both")
+        if wanted.travelers != planned.travelers:
+            return RuleCheck("travelers", "fail", f"itinerary is for {planned.travelers} travelers, requested {wanted.travelers}")
+        return RuleCheck("travelers", "pass", f"{planned.travelers} travelers")
+
+    def _check_budget(self, wanted: TripFacts, planned: TripFacts) -> List[RuleCheck]:
+        items = {category: amount for category, amount in planned.costs.items() if category != "total"}
+        stated = planned.costs.get("total")
+        if wanted.budget is None or not (items or stated):
+            return [RuleCheck("budget", "skip", "budget or itinerary costs not found")]
+
+        breakdown = compute_budget(
+            wanted.budget, items.get("hotel", 0), items.get("flights", 0), items.get("other", 0), days=planned.days or 1
+        )
+        checks = []
+        if stated is not None and items:
+            if abs(breakdown.total_cost - stated) > max(5, 0.02 * stated):
+                checks.append(RuleCheck("budget_arithmetic", "fail", (
+                    f"line items add up to ${breakdown.total_cost:g} but the stated total is ${stated:g}"
+                )))
+            else:
+                checks.append(RuleCheck("budget_arithmetic", "pass", f"line items add up to ${breakdown.total_cost:g}"))
+
+        total = stated if stated is not None else breakdown.total_cost
+        limit = wanted.budget * (1 + self.budget_tolerance)
+        if total > limit:
+            checks.insert(0, RuleCheck("budget", "fail", (
+                f"estimated total ${total:g} exceeds the ${wanted.budget:g} budget by ${total - wanted.budget:g}"
+            )))
+        else:
+            checks.insert(0, RuleCheck("budget", "pass", f"estimated total ${total:g} within the ${wanted.budget:g} budget"))
+        return checks
+
+    def _check_search_prices(self, wanted: TripFacts, planned: TripFacts, tool_results: Sequence[SearchResult]) -> RuleCheck:
+        problems = []
+        fares = {}
+        for kind, category in (("flights", "flights"), ("hotels", "hotel")):
+            offer = cheapest(tool_results, kind)
+            if offer is None:
+                continue
+            fares[kind] = offer.price
+            quoted = planned.costs.get(category)
+            if quoted is not None and quoted < offer.price * (1 - self.price_tolerance):
+                problems.append(f"quoted {kind} cost ${quoted:g} is below the cheapest offer found (${offer.price:g})")
+        if not fares:
+            return RuleCheck("search_prices", "skip", "no flight or hotel search results")
+        if wanted.budget is not None and len(fares) == 2 and sum(fares.values()) > wanted.budget:
+            problems.append(
+                f"cheapest flight and hotel together (${sum(fares.values()):g}) already exceed the ${wanted.budget:g} budget"
+            )
+        if problems:
+            return RuleCheck("search_prices", "fail", "; ".join(problems))
+        return RuleCheck("search_prices", "pass", "quoted costs consistent with search results")
+
+    def _check_interests(self, wanted: TripFacts, planned: TripFacts) -> RuleCheck:
+        if not wanted.interests and wanted.mentions_interests:
+            return RuleCheck("interests", "review", "interests stated that the rule checks do not recognize")
+        if not wanted.interests:
+            return RuleCheck("interests", "skip", "no interests stated")
+        missing = [name for name in wanted.interests if name not in planned.interests]
+        if missing:
+            return RuleCheck("interests", "fail", f"requested interests not covered: {', '.join(missing)}")
+        return RuleCheck("interests", "pass", f"covers {', '.join(wanted.interests)}")
+
+    def _check_preferences(self, wanted: TripFacts) -> List[RuleCheck]:
+        if not wanted.preferences:
+            return []
+        return [RuleCheck("preferences", "review", f"travel style needs review: {', '.join(wanted.preferences)}")]
+
+
+# Create a global instance of RuleVerifier
+rule_verifier = RuleVerifier()
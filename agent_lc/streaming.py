@@ -0,0 +1,66 @@
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class TokenStreamHandler(BaseCallbackHandler):
+    """Forward LLM tokens and tool start/finish events as they arrive.
+
+    `on_token` receives (token, text_so_far) for the current generation; the
+    text is reset whenever a new LLM call starts, so after a tool round trip
+    it only holds the answer being written now.
+    """
+
+    def __init__(
+        self,
+        on_token: Optional[Callable[[str, str], None]] = None,
+        on_tool_start: Optional[Callable[[str, str], None]] = None,
+        on_tool_end: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.on_token = on_token
+        self.on_tool_start_callback = on_tool_start
+        self.on_tool_end_callback = on_tool_end
+        self.text = ""
+        self.start_time = time.perf_counter()
+        self.first_token_time: Optional[float] = None
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_time is None:
+            return None
+        return self.first_token_time - self.start_time
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        self.text = ""
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs: Any) -> None:
+        self.text = ""
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if not token:
+            return  # Tool-call chunks carry no content
+        if self.first_token_time is None:
+            self.first_token_time = time.perf_counter()
+        self.text += token
+        if self.on_token:
+            self.on_token(token, self.text)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        if self.on_tool_start_callback:
+            self.on_tool_start_callback(serialized.get("name", "tool"), input_str)
+
+    def on_tool_end(self, output: str, **kwargs: Any) -> None:
+        if self.on_tool_end_callback:
+            self.on_tool_end_callback(kwargs.get("name", "tool"), output)
+
+
+def stream_groq_completion(groq_client, on_token: Callable[[str, str], None], **kwargs) -> str:
+    """Run a Groq chat completion with stream=True, reporting tokens as they arrive."""
+    text = ""
+    for chunk in groq_client.chat.completions.create(stream=True, **kwargs):
+        token = chunk.choices[0].delta.content if chunk.choices else None
+        if token:
+            text += token
+            on_token(token, text)
+    return text
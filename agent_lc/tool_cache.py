@@ -0,0 +1,354 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from .single_flight import SingleFlight
+from .tracing import add_to_current_span
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TOOL_CACHE_BACKEND = os.getenv("TOOL_CACHE_BACKEND", "memory")
+TOOL_CACHE_PATH = os.getenv("TOOL_CACHE_PATH", "tool_cache.sqlite3")
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1000"))
+
+# Seconds a cached result stays valid, per tool
+DEFAULT_TOOL_TTLS = {
+    "search_flights": int(os.getenv("TOOL_CACHE_TTL_FLIGHTS", str(15 * 60))),
+    "search_hotels": int(os.getenv("TOOL_CACHE_TTL_HOTELS", str(30 * 60))),
+    "search_activities": int(os.getenv("TOOL_CACHE_TTL_ACTIVITIES", str(24 * 60 * 60))),
+}
+DEFAULT_TTL = 10 * 60
+
+# Keys looked up by the speculative prefetch running in this context, None outside a prefetch
+_prefetch_keys: ContextVar[Optional[Set[str]]] = ContextVar("tool_cache_prefetch_keys", default=None)
+
+DATE_FORMATS = ["%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%d/%m/%Y", "%m/%d/%Y", "%d %B %Y", "%d %b %Y", "%B %d, %Y", "%b %d, %Y"]
+
+
+def normalize_code(value: Optional[str]) -> Optional[str]:
+    """Normalize an airport/city code or name used as a cache key component."""
+    if value is None:
+        return None
+    return value.strip().upper()
+
+
+def normalize_date(value: Optional[str]) -> Optional[str]:
+    """Return the date as YYYY-MM-DD if it can be parsed, otherwise stripped as-is."""
+    if value is None:
+        return None
+    value = value.strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return value
+
+
+class CacheBackend:
+    """Storage interface for ToolCache entries."""
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, expires_at) for the key, or None if absent."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, expires_at: float) -> int:
+        """Store the value and return the number of entries evicted to make room."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self, prefix: str = "") -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """LRU-bounded in-process cache."""
+
+    def __init__(self, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, expires_at):
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self, prefix=""):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """LRU-bounded on-disk cache that survives process restarts."""
+
+    def __init__(self, path: str = TOOL_CACHE_PATH, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tool_cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tool_cache_last_access ON tool_cache (last_access)"
+            )
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM tool_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE tool_cache SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, key, value, expires_at):
+        blob = pickle.dumps(value)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, blob, expires_at, time.time())
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM tool_cache").fetchone()[0]
+            evicted = max(count - self.max_entries, 0)
+            if evicted:
+                self._conn.execute(
+                    "DELETE FROM tool_cache WHERE key IN "
+                    "(SELECT key FROM tool_cache ORDER BY last_access ASC LIMIT ?)",
+                    (evicted,)
+                )
+        return evicted
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+
+    def clear(self, prefix=""):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tool_cache WHERE key LIKE ?", (prefix + "%",))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tool_cache").fetchone()[0]
+
+
+class ToolCache:
+    """TTL cache in front of the search tools, keyed on normalized arguments.
+
+    Misses go through a SingleFlight so concurrent identical calls share one
+    upstream request.
+    """
+
+    def __init__(self, backend: CacheBackend, ttls: Optional[Dict[str, int]] = None):
+        self.backend = backend
+        self.ttls = dict(DEFAULT_TOOL_TTLS if ttls is None else ttls)
+        self.single_flight = SingleFlight()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+        # Prefetched key -> whether a regular lookup has used it since
+        self._prefetched: Dict[str, bool] = {}
+
+    def _record(self, tool_name: str, counter: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            stats = self._stats.setdefault(tool_name, {
+                "hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0,
+                "prefetches": 0, "prefetch_hits": 0, "prefetch_wasted": 0,
+            })
+            stats[counter] += amount
+        if counter in ("hits", "misses", "coalesced"):
+            add_to_current_span(**{f"cache_{counter}": amount})
+
+    @contextmanager
+    def prefetching(self, keys: Optional[Set[str]] = None) -> Iterator[Set[str]]:
+        """Mark lookups in the block as speculative; yields the set the fetched keys are added to.
+
+        Prefetches fill the cache like any miss but are counted apart from
+        the agents' own hits and misses. Pass the keys to `claim_prefetched`
+        once the agent is done to learn which ones it actually used.
+        """
+        keys = set() if keys is None else keys
+        token = _prefetch_keys.set(keys)
+        try:
+            yield keys
+        finally:
+            _prefetch_keys.reset(token)
+
+    def claim_prefetched(self, keys: Set[str]) -> Tuple[int, int]:
+        """Forget the prefetched keys and return how many were (used, wasted).
+
+        `keys` may be the set a `prefetching` block is still filling: keys are
+        added and read under the same lock.
+        """
+        used = wasted = 0
+        with self._stats_lock:
+            claimed = [(key, self._prefetched.pop(key)) for key in list(keys) if key in self._prefetched]
+        for key, was_used in claimed:
+            tool_name = key.split(":", 1)[0]
+            if was_used:
+                used += 1
+                self._record(tool_name, "prefetch_hits")
+            else:
+                wasted += 1
+                self._record(tool_name, "prefetch_wasted")
+        return used, wasted
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+        return f"{tool_name}:{json.dumps(arguments, sort_keys=True, default=str)}"
+
+    def get_or_compute(self, tool_name: str, arguments: Dict[str, Any], compute: Callable[[], Any]) -> Any:
+        key = self.make_key(tool_name, arguments)
+        prefetch_keys = _prefetch_keys.get()
+        if prefetch_keys is None and key in self._prefetched:
+            with self._stats_lock:
+                if key in self._prefetched:
+                    self._prefetched[key] = True
+
+        entry = self.backend.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if time.time() < expires_at:
+                # A prefetch of an entry that is already cached is a no-op and is not counted
+                if prefetch_keys is None:
+                    self._record(tool_name, "hits")
+                return value
+            self.backend.delete(key)
+            self._record(tool_name, "expirations")
+
+        if prefetch_keys is not None:
+            # Registered before the upstream call, so an agent call joining it counts as a hit
+            with self._stats_lock:
+                self._prefetched.setdefault(key, False)
+                if len(self._prefetched) > TOOL_CACHE_MAX_ENTRIES:
+                    # Never claimed, e.g. the run failed before its copywriter finished
+                    del self._prefetched[next(iter(self._prefetched))]
+                prefetch_keys.add(key)
+
+        def load():
+            value = compute()
+            # Errors are usually transient, so only successful results are cached
+            if not (isinstance(value, str) and value.startswith("Error")):
+                ttl = self.ttls.get(tool_name, DEFAULT_TTL)
+                evicted = self.backend.set(key, value, time.time() + ttl)
+                if evicted:
+                    self._record(tool_name, "evictions", evicted)
+            return value
+
+        # Concurrent misses for the same key share a single upstream request
+        value, shared = self.single_flight.do(key, load)
+        if prefetch_keys is not None:
+            self._record(tool_name, "prefetches")
+        else:
+            self._record(tool_name, "coalesced" if shared else "misses")
+        return value
+
+    def cached(self, tool_name: str, normalize: Callable[..., Dict[str, Any]],
+               post_filters: Optional[Dict[str, Callable[[Any, Any], Any]]] = None):
+        """Decorator caching a tool function on its normalized arguments.
+
+        `normalize` receives the bound call arguments and returns the kwargs
+        the wrapped function is actually called with, so the cache key always
+        describes the request that was sent upstream.
+
+        Arguments named in `post_filters` are left out of the upstream call
+        and the key; `post_filters[name](result, value)` applies them to the
+        cached result instead, so e.g. every `max_price` shares one entry.
+        """
+        post_filters = post_filters or {}
+
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = normalize(**bound.arguments)
+                filter_values = {name: arguments.pop(name, None) for name in post_filters}
+                result = self.get_or_compute(tool_name, arguments, lambda: func(**arguments))
+                for name, apply in post_filters.items():
+                    result = apply(result, filter_values[name])
+                return result
+
+            return wrapper
+        return decorator
+
+    def invalidate(self, tool_name: Optional[str] = None) -> None:
+        self.backend.clear(f"{tool_name}:" if tool_name else "")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            per_tool = {name: dict(stats) for name, stats in self._stats.items()}
+        for stats in per_tool.values():
+            lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+            stats["hit_rate"] = (stats["hits"] + stats["coalesced"]) / lookups if lookups else 0.0
+            claimed = stats["prefetch_hits"] + stats["prefetch_wasted"]
+            stats["prefetch_hit_rate"] = stats["prefetch_hits"] / claimed if claimed else 0.0
+        return {
+            "backend": type(self.backend).__name__,
+            "size": len(self.backend),
+            "ttls": dict(self.ttls),
+            "tools": per_tool,
+            "single_flight": self.single_flight.get_stats(),
+        }
+
+
+def create_backend(name: str = TOOL_CACHE_BACKEND) -> CacheBackend:
+    if name == "sqlite":
+        return SQLiteCacheBackend()
+    if name != "memory":
+        logger.warning(f"Unknown TOOL_CACHE_BACKEND '{name}', falling back to memory")
+    return InMemoryCacheBackend()
+
+
+# Create a global instance of ToolCache
+tool_cache = ToolCache(create_backend())
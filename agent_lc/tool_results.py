@@ -0,0 +1,181 @@
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+
+@dataclass(slots=True)
+class FlightOffer:
+    carrier: str
+    number: str
+    departure: str  # ISO local time of the first segment
+    arrival: str  # ISO local time of the last outbound segment
+    origin: str
+    destination: str
+    stops: int
+    price: float  # total for all travelers
+    currency: str
+
+
+@dataclass(slots=True)
+class HotelOffer:
+    hotel_id: str
+    name: str
+    rating: str
+    price: float  # total for the stay
+    currency: str
+
+
+@dataclass(slots=True)
+class ActivityOption:
+    name: str
+    type: str
+    price: float  # per person
+    description: str
+
+
+@dataclass(slots=True)
+class TripPackage:
+    flight: FlightOffer
+    hotel: HotelOffer
+    activities: List[ActivityOption]
+    activities_cost: float  # for all travelers
+    food_cost: float  # for the whole trip
+    total_cost: float
+    budget_left: float
+    score: float  # higher is better, see package_optimizer
+
+
+Offer = Union[FlightOffer, HotelOffer, ActivityOption, TripPackage]
+
+# Columns rendered for the LLM, per item type
+_COLUMNS: Dict[type, Tuple[str, ...]] = {
+    FlightOffer: ("flight", "depart", "arrive", "stops", "price"),
+    HotelOffer: ("hotel", "rating", "price"),
+    ActivityOption: ("activity", "type", "price", "about"),
+    TripPackage: ("flight", "hotel", "activities", "food", "total", "left", "score"),
+}
+
+
+def _short_time(value: str) -> str:
+    # "2025-06-15T08:05:00" -> "06-15 08:05"
+    return value[5:16].replace("T", " ") if len(value) >= 16 else value
+
+
+def _row(item: Offer) -> Tuple[str, ...]:
+    if isinstance(item, FlightOffer):
+        return (f"{item.carrier}{item.number}", _short_time(item.departure), _short_time(item.arrival),
+                str(item.stops), f"{item.price:g}")
+    if isinstance(item, HotelOffer):
+        return (item.name, item.rating, f"{item.price:g}")
+    if isinstance(item, TripPackage):
+        activities = "; ".join(activity.name for activity in item.activities)
+        return (
+            f"{item.flight.carrier}{item.flight.number} {item.flight.price:g}",
+            f"{item.hotel.name} {item.hotel.price:g}",
+            f"{len(item.activities)} for {item.activities_cost:g}: {activities}" if item.activities else "none",
+            f"{item.food_cost:g}", f"{item.total_cost:g}", f"{item.budget_left:g}", f"{item.score:g}"
+        )
+    return (item.name, item.type, f"{item.price:g}", item.description)
+
+
+@dataclass(slots=True)
+class SearchResult:
+    """Typed result of a search tool.
+
+    Tools return this instead of prose: `str()` gives the compact table the
+    agent sees as the tool observation, while `items` keeps the offers for
+    code that runs after the agent (budget checks, package optimization).
+    """
+
+    kind: str  # "flights", "hotels" or "activities"
+    title: str  # e.g. "JFK->CDG 2025-06-15, 2 adults"
+    items: List[Offer] = field(default_factory=list)
+    total: int = 0  # matches before paging / top-N truncation
+    currency: str = "USD"
+    offset: int = 0
+    note: str = ""
+
+    def __str__(self) -> str:
+        return render_for_llm(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "title": self.title,
+            "total": self.total,
+            "currency": self.currency,
+            "items": [asdict(item) for item in self.items],
+        }
+
+
+def render_for_llm(result: SearchResult) -> str:
+    """Token-lean rendering: one header line, one column line, one pipe-separated row per item."""
+    if not result.items:
+        return f"{result.kind} {result.title}: no results. {result.note}".rstrip()
+    shown = f"{result.offset + 1}-{result.offset + len(result.items)} of {result.total}"
+    lines = [
+        f"{result.kind} {result.title} ({shown}, prices {result.currency})",
+        "#|" + "|".join(_COLUMNS[type(result.items[0])]),
+    ]
+    for index, item in enumerate(result.items, result.offset + 1):
+        lines.append(f"{index}|" + "|".join(_row(item)))
+    if result.note:
+        lines.append(result.note)
+    return "\n".join(lines)
+
+
+@dataclass(slots=True)
+class BudgetBreakdown:
+    total_budget: float
+    hotel_cost: float
+    flight_cost: float
+    activities_cost: float
+    food_cost: float  # for the whole trip
+    days: int
+
+    @property
+    def total_cost(self) -> float:
+        return self.hotel_cost + self.flight_cost + self.activities_cost + self.food_cost
+
+    @property
+    def remaining(self) -> float:
+        return self.total_budget - self.total_cost
+
+    @property
+    def exceeded(self) -> bool:
+        return self.remaining < 0
+
+    def __str__(self) -> str:
+        lines = [
+            "Budget Breakdown:",
+            f"Total Budget: ${self.total_budget}",
+            f"Hotel: ${self.hotel_cost}",
+            f"Flights: ${self.flight_cost}",
+            f"Activities: ${self.activities_cost}",
+            f"Food ({self.days} days): ${self.food_cost}",
+            f"Total Cost: ${self.total_cost}",
+            f"Remaining Budget: ${self.remaining}",
+            f"⚠️ Budget exceeded by ${abs(self.remaining)}" if self.exceeded else "✅ Budget is sufficient",
+        ]
+        return "\n".join(lines)
+
+
+def compute_budget(total_budget, hotel_cost, flight_cost, activities_cost=0, food_cost_per_day=0, days=1) -> BudgetBreakdown:
+    """Budget breakdown shared by the calculate_budget tool and the rule-based verifier."""
+    return BudgetBreakdown(
+        total_budget=total_budget,
+        hotel_cost=hotel_cost,
+        flight_cost=flight_cost,
+        activities_cost=activities_cost,
+        food_cost=food_cost_per_day * days,
+        days=days
+    )
+
+
+def collect_search_results(intermediate_steps: Sequence[Tuple[Any, Any]]) -> List[SearchResult]:
+    """SearchResults returned by tools during an agent run (requires return_intermediate_steps)."""
+    return [observation for _, observation in intermediate_steps if isinstance(observation, SearchResult)]
+
+
+def cheapest(results: Sequence[SearchResult], kind: str) -> Optional[Offer]:
+    offers = [item for result in results if result.kind == kind for item in result.items]
+    return min(offers, key=lambda item: item.price) if offers else None
@@ -1,4 +1,5 @@
 from langchain.tools import tool
+from dataclasses import replace
 from typing import Annotated, Dict, List
 import json
 from pathlib import Path
@@ -13,12 +14,124 @@ from dotenv import load_dotenv
 import requests
 from datetime import datetime, timedelta
 import math
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from .amadeus_auth import amadeus_token_manager, AmadeusAuthError, AMADEUS_BASE_URL
+from .tool_cache import tool_cache, normalize_code, normalize_date
+from .tracing import traced
+from .activity_catalog import activity_catalog, SORT_ORDERS
+from .location_resolver import location_resolver, is_iata_code
+from .tool_results import SearchResult, FlightOffer, HotelOffer, ActivityOption, compute_budget
+from .package_optimizer import optimize_packages, cheapest_base_cost
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of concurrent hotel-offer lookups per search_hotels call
+HOTEL_OFFER_CONCURRENCY = int(os.getenv("HOTEL_OFFER_CONCURRENCY", "5"))
+
+def _fetch_hotel_offer(offers_url, hotel_id, check_in, check_out, adults):
+    """Fetch the cheapest HotelOffer for a single hotel, or None if it has no availability."""
+    offer_params = {
+        "hotelIds": hotel_id,
+        "checkInDate": check_in,
+        "checkOutDate": check_out,
+        "adults": adults,
+        "currency": "USD"
+    }
+    
+    try:
+        offer_response = amadeus_token_manager.get(offers_url, params=offer_params)
+    except (requests.RequestException, AmadeusAuthError) as e:
+        logger.warning(f"Skipping hotel {hotel_id}: {str(e)}")
+        return None
+    if offer_response.status_code != 200:
+        return None
+    
+    offer_data = offer_response.json()
+    if not offer_data.get("data"):
+        return None
+    
+    hotel_info = offer_data["data"][0]
+    if not hotel_info.get("offers"):
+        return None
+    
+    # Get the cheapest offer
+    cheapest_offer = min(hotel_info["offers"], key=lambda x: float(x["price"]["total"]))
+    return HotelOffer(
+        hotel_id=hotel_id,
+        name=hotel_info["hotel"]["name"],
+        rating=str(hotel_info["hotel"].get("rating", "N/A")),
+        price=float(cheapest_offer["price"]["total"]),
+        currency=cheapest_offer["price"]["currency"]
+    )
+
+def _flight_offer(flight):
+    """Compact FlightOffer from an Amadeus flight-offer object (outbound itinerary)."""
+    segments = flight["itineraries"][0]["segments"]
+    return FlightOffer(
+        carrier=segments[0]["carrierCode"],
+        number=segments[0]["number"],
+        departure=segments[0]["departure"]["at"],
+        arrival=segments[-1]["arrival"]["at"],
+        origin=segments[0]["departure"].get("iataCode", ""),
+        destination=segments[-1]["arrival"].get("iataCode", ""),
+        stops=len(segments) - 1,
+        price=float(flight["price"]["total"]),
+        currency=flight["price"]["currency"]
+    )
+
+def _unresolved_location(kind, value):
+    """Error returned before any network call when a location cannot be resolved."""
+    suggestions = location_resolver.suggest(value)
+    hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else " Use a 3-letter IATA city or airport code."
+    return f"Error: could not resolve {kind} '{value}' to an IATA code.{hint}"
+
+def _optional_price(value):
+    return float(value) if value is not None else None
+
+def _cheapest_within(result, max_price, top=5):
+    """The `top` cheapest offers of a cached, unfiltered search priced at most `max_price`."""
+    if not isinstance(result, SearchResult):
+        return result
+    items = [item for item in result.items if max_price is None or item.price <= max_price]
+    if not items:
+        return f"No {result.kind} found within the specified price range."
+    return replace(result, items=items[:top], total=len(items))
+
+# Location arguments are resolved to IATA codes (or canonical city names) in
+# the normalizers, so both the cache key and the upstream request use them
+def _normalize_hotel_args(city, check_in, check_out, adults=1, max_price=None):
+    return {
+        "city": location_resolver.city_code(city) or normalize_code(city),
+        "check_in": normalize_date(check_in),
+        "check_out": normalize_date(check_out),
+        "adults": int(adults),
+        "max_price": _optional_price(max_price)
+    }
+
+def _normalize_flight_args(origin, destination, departure_date, return_date=None, adults=1, max_price=None):
+    return {
+        "origin": location_resolver.flight_code(origin) or normalize_code(origin),
+        "destination": location_resolver.flight_code(destination) or normalize_code(destination),
+        "departure_date": normalize_date(departure_date),
+        "return_date": normalize_date(return_date),
+        "adults": int(adults),
+        "max_price": _optional_price(max_price)
+    }
+
+def _normalize_activity_args(city, activity_type=None, max_price=None, sort_by="price", page=1, page_size=5):
+    return {
+        "city": location_resolver.city_name(city) or city.strip().title(),
+        "activity_type": activity_type.strip().lower() if activity_type else None,
+        "max_price": _optional_price(max_price),
+        "sort_by": sort_by if sort_by in SORT_ORDERS else "price",
+        "page": max(int(page), 1),
+        "page_size": min(max(int(page_size), 1), 20)
+    }
+
 class Tools:
     @staticmethod
     def setup_tool_web_search():
@@ -26,7 +139,7 @@ class Tools:
 
     @staticmethod
     def setup_tool_travel_planner():
-        return [Tools.search_hotels, Tools.search_flights, Tools.search_activities]
+        return [Tools.search_hotels, Tools.search_flights, Tools.search_activities, Tools.plan_trip_packages]
 
     @staticmethod
     def setup_tool_cross_check():
@@ -82,163 +195,95 @@ class Tools:
     ) -> str:
         """Calculate budget breakdown for travel planning."""
         try:
-            total_food_cost = food_cost * days
-            total_cost = hotel_cost + flight_cost + activities_cost + total_food_cost
-            remaining_budget = total_budget - total_cost
-            
-            breakdown = f"Budget Breakdown:\n"
-            breakdown += f"Total Budget: ${total_budget}\n"
-            breakdown += f"Hotel: ${hotel_cost}\n"
-            breakdown += f"Flights: ${flight_cost}\n"
-            breakdown += f"Activities: ${activities_cost}\n"
-            breakdown += f"Food ({days} days): ${total_food_cost}\n"
-            breakdown += f"Total Cost: ${total_cost}\n"
-            breakdown += f"Remaining Budget: ${remaining_budget}\n"
-            
-            if remaining_budget < 0:
-                breakdown += f"⚠️ Budget exceeded by ${abs(remaining_budget)}"
-            else:
-                breakdown += f"✅ Budget is sufficient"
-                
-            return breakdown
+            return str(compute_budget(total_budget, hotel_cost, flight_cost, activities_cost, food_cost, days))
         except Exception as e:
             return f"Error calculating budget: {str(e)}"
 
     @tool
+    @traced("search_hotels")
+    @tool_cache.cached("search_hotels", _normalize_hotel_args, post_filters={"max_price": _cheapest_within})
     def search_hotels(
-        city: Annotated[str, "City name to search for hotels"],
+        city: Annotated[str, "City name or IATA city code to search for hotels"],
         check_in: Annotated[str, "Check-in date in YYYY-MM-DD format"],
         check_out: Annotated[str, "Check-out date in YYYY-MM-DD format"],
         adults: Annotated[int, "Number of adult guests"] = 1,
         max_price: Annotated[float, "Maximum price per night"] = None
-    ) -> str:
+    ) -> "SearchResult | str":
         """Search for hotels in a specific city with availability and pricing information."""
+        if not is_iata_code(city):
+            return _unresolved_location("city", city)
         try:
-            # Amadeus API credentials
-            amadeus_client_id = os.getenv("AMADEUS_CLIENT_ID")
-            amadeus_client_secret = os.getenv("AMADEUS_CLIENT_SECRET")
-            
-            if not amadeus_client_id or not amadeus_client_secret:
-                return "Error: Amadeus API credentials not configured"
-            
-            # Get access token
-            token_url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-            token_data = {
-                "grant_type": "client_credentials",
-                "client_id": amadeus_client_id,
-                "client_secret": amadeus_client_secret
-            }
-            
-            token_response = requests.post(token_url, data=token_data)
-            if token_response.status_code != 200:
-                return f"Error getting access token: {token_response.text}"
-            
-            access_token = token_response.json()["access_token"]
-            
             # Search for hotels
-            hotels_url = "https://test.api.amadeus.com/v2/reference-data/locations/hotels/by-city"
-            headers = {"Authorization": f"Bearer {access_token}"}
+            hotels_url = f"{AMADEUS_BASE_URL}/v1/reference-data/locations/hotels/by-city"
             params = {
                 "cityCode": city.upper(),
                 "radius": 5,
                 "radiusUnit": "KM"
             }
             
-            hotels_response = requests.get(hotels_url, headers=headers, params=params)
+            # The access token is cached and shared across all Amadeus tools
+            try:
+                hotels_response = amadeus_token_manager.get(hotels_url, params=params)
+            except AmadeusAuthError as e:
+                return f"Error getting access token: {str(e)}"
             if hotels_response.status_code != 200:
                 return f"Error searching hotels: {hotels_response.text}"
             
             hotels_data = hotels_response.json()
             
             # Get hotel offers for availability and pricing
-            offers_url = "https://test.api.amadeus.com/v3/shopping/hotel-offers"
-            available_hotels = []
-            
-            for hotel in hotels_data.get("data", [])[:10]:  # Limit to first 10 hotels
-                hotel_id = hotel["hotelId"]
-                offer_params = {
-                    "hotelIds": hotel_id,
-                    "checkInDate": check_in,
-                    "checkOutDate": check_out,
-                    "adults": adults,
-                    "currency": "USD"
-                }
-                
-                offer_response = requests.get(offers_url, headers=headers, params=offer_params)
-                if offer_response.status_code == 200:
-                    offer_data = offer_response.json()
-                    if offer_data.get("data"):
-                        hotel_info = offer_data["data"][0]
-                        hotel_name = hotel_info["hotel"]["name"]
-                        hotel_rating = hotel_info["hotel"].get("rating", "N/A")
-                        
-                        # Get the cheapest offer
-                        if hotel_info.get("offers"):
-                            cheapest_offer = min(hotel_info["offers"], 
-                                               key=lambda x: float(x["price"]["total"]))
-                            price = cheapest_offer["price"]["total"]
-                            
-                            if max_price is None or float(price) <= max_price:
-                                available_hotels.append({
-                                    "name": hotel_name,
-                                    "rating": hotel_rating,
-                                    "price": price,
-                                    "currency": cheapest_offer["price"]["currency"]
-                                })
+            offers_url = f"{AMADEUS_BASE_URL}/v3/shopping/hotel-offers"
+            
+            # Fetch offers for the first 10 hotels concurrently; map() keeps the
+            # original hotel order so ties sort exactly as before. Each lookup
+            # runs in a copy of this context so its HTTP time lands in the tool's trace span
+            hotel_ids = [hotel["hotelId"] for hotel in hotels_data.get("data", [])[:10]]
+            contexts = [contextvars.copy_context() for _ in hotel_ids]
+            with ThreadPoolExecutor(max_workers=HOTEL_OFFER_CONCURRENCY) as executor:
+                offers = list(executor.map(
+                    lambda context, hotel_id: context.run(
+                        _fetch_hotel_offer, offers_url, hotel_id, check_in, check_out, adults
+                    ),
+                    contexts, hotel_ids
+                ))
+            
+            available_hotels = [hotel_offer for hotel_offer in offers if hotel_offer is not None]
             
             if not available_hotels:
                 return f"No available hotels found in {city} for the specified dates and criteria."
             
-            # Sort by price and format results
-            available_hotels.sort(key=lambda x: float(x["price"]))
-            result = f"Found {len(available_hotels)} hotels in {city}:\n\n"
-            
-            for i, hotel in enumerate(available_hotels[:5], 1):  # Show top 5
-                result += f"{i}. {hotel['name']}\n"
-                result += f"   Rating: {hotel['rating']}\n"
-                result += f"   Price: {hotel['price']} {hotel['currency']}\n\n"
-            
-            return result
+            # All offers, cheapest first: the cache applies max_price and keeps the top 5
+            available_hotels.sort(key=lambda x: x.price)
+            return SearchResult(
+                kind="hotels",
+                title=f"{city} {check_in}..{check_out}, {adults} adults",
+                items=available_hotels,
+                total=len(available_hotels),
+                currency=available_hotels[0].currency
+            )
             
         except Exception as e:
             logger.error(f"Error searching hotels: {str(e)}")
             return f"Error searching hotels: {str(e)}"
 
     @tool
+    @traced("search_flights")
+    @tool_cache.cached("search_flights", _normalize_flight_args, post_filters={"max_price": _cheapest_within})
     def search_flights(
-        origin: Annotated[str, "Origin airport code (e.g., JFK, LAX)"],
-        destination: Annotated[str, "Destination airport code (e.g., CDG, LHR)"],
+        origin: Annotated[str, "Origin airport code or city (e.g., JFK, LAX, New York)"],
+        destination: Annotated[str, "Destination airport code or city (e.g., CDG, LHR, Paris)"],
         departure_date: Annotated[str, "Departure date in YYYY-MM-DD format"],
         return_date: Annotated[str, "Return date in YYYY-MM-DD format (optional)"] = None,
         adults: Annotated[int, "Number of adult passengers"] = 1,
         max_price: Annotated[float, "Maximum price for the flight"] = None
-    ) -> str:
+    ) -> "SearchResult | str":
         """Search for flights between two airports with pricing and availability."""
+        for kind, value in (("origin", origin), ("destination", destination)):
+            if not is_iata_code(value):
+                return _unresolved_location(kind, value)
         try:
-            # Amadeus API credentials
-            amadeus_client_id = os.getenv("AMADEUS_CLIENT_ID")
-            amadeus_client_secret = os.getenv("AMADEUS_CLIENT_SECRET")
-            
-            if not amadeus_client_id or not amadeus_client_secret:
-                return "Error: Amadeus API credentials not configured"
-            
-            # Get access token
-            token_url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-            token_data = {
-                "grant_type": "client_credentials",
-                "client_id": amadeus_client_id,
-                "client_secret": amadeus_client_secret
-            }
-            
-            token_response = requests.post(token_url, data=token_data)
-            if token_response.status_code != 200:
-                return f"Error getting access token: {token_response.text}"
-            
-            access_token = token_response.json()["access_token"]
-            
             # Search for flights
-            flights_url = "https://test.api.amadeus.com/v2/shopping/flight-offers"
-            headers = {"Authorization": f"Bearer {access_token}"}
+            flights_url = f"{AMADEUS_BASE_URL}/v2/shopping/flight-offers"
             params = {
                 "originLocationCode": origin.upper(),
                 "destinationLocationCode": destination.upper(),
@@ -251,7 +296,11 @@ class Tools:
             if return_date:
                 params["returnDate"] = return_date
             
-            flights_response = requests.get(flights_url, headers=headers, params=params)
+            # The access token is cached and shared across all Amadeus tools
+            try:
+                flights_response = amadeus_token_manager.get(flights_url, params=params)
+            except AmadeusAuthError as e:
+                return f"Error getting access token: {str(e)}"
             if flights_response.status_code != 200:
                 return f"Error searching flights: {flights_response.text}"
             
@@ -260,89 +309,121 @@ class Tools:
             if not flights_data.get("data"):
                 return f"No flights found from {origin} to {destination} on {departure_date}"
             
-            # Filter by price if specified
-            available_flights = flights_data["data"]
-            if max_price:
-                available_flights = [f for f in available_flights 
-                                   if float(f["price"]["total"]) <= max_price]
-            
-            if not available_flights:
-                return f"No flights found within the specified price range."
-            
-            # Sort by price and format results
-            available_flights.sort(key=lambda x: float(x["price"]["total"]))
-            result = f"Found {len(available_flights)} flights from {origin} to {destination}:\n\n"
-            
-            for i, flight in enumerate(available_flights[:5], 1):  # Show top 5
-                result += f"{i}. {flight['itineraries'][0]['segments'][0]['carrierCode']} "
-                result += f"{flight['itineraries'][0]['segments'][0]['number']}\n"
-                result += f"   Departure: {flight['itineraries'][0]['segments'][0]['departure']['at']}\n"
-                result += f"   Arrival: {flight['itineraries'][0]['segments'][0]['arrival']['at']}\n"
-                result += f"   Price: {flight['price']['total']} {flight['price']['currency']}\n\n"
-            
-            return result
+            # All offers, cheapest first: the cache applies max_price and keeps the top 5
+            available_flights = sorted(flights_data["data"], key=lambda x: float(x["price"]["total"]))
+            offers = [_flight_offer(flight) for flight in available_flights]
+            dates = f"{departure_date}..{return_date}" if return_date else departure_date
+            return SearchResult(
+                kind="flights",
+                title=f"{origin}->{destination} {dates}, {adults} adults",
+                items=offers,
+                total=len(available_flights),
+                currency=offers[0].currency
+            )
             
         except Exception as e:
             logger.error(f"Error searching flights: {str(e)}")
             return f"Error searching flights: {str(e)}"
 
     @tool
+    @traced("search_activities")
+    @tool_cache.cached("search_activities", _normalize_activity_args)
     def search_activities(
         city: Annotated[str, "City name to search for activities"],
         activity_type: Annotated[str, "Type of activity (e.g., 'museum', 'tour', 'restaurant')"] = None,
-        max_price: Annotated[float, "Maximum price for activities"] = None
-    ) -> str:
+        max_price: Annotated[float, "Maximum price for activities"] = None,
+        sort_by: Annotated[str, "Sort order: 'price' (cheapest first), 'price_desc' or 'name'"] = "price",
+        page: Annotated[int, "Page of results to return, starting at 1"] = 1,
+        page_size: Annotated[int, "Number of activities per page"] = 5
+    ) -> "SearchResult | str":
         """Search for activities and attractions in a specific city."""
         try:
-            # For now, return mock activity data since Amadeus POI requires coordinates
-            # In a real implementation, you'd get city coordinates first, then use Amadeus POI API
-            
-            mock_activities = {
-                "manali": [
-                    {"name": "Solang Valley Adventure Sports", "type": "adventure", "price": 50, "description": "Skiing, paragliding, zorbing"},
-                    {"name": "Hadimba Temple", "type": "culture", "price": 5, "description": "Ancient wooden temple in cedar forest"},
-                    {"name": "Rohtang Pass", "type": "nature", "price": 30, "description": "Scenic mountain pass with snow activities"},
-                    {"name": "Old Manali Village", "type": "culture", "price": 0, "description": "Traditional Himachali village experience"},
-                    {"name": "Beas River Rafting", "type": "adventure", "price": 40, "description": "White water rafting experience"}
-                ],
-                "paris": [
-                    {"name": "Eiffel Tower", "type": "attraction", "price": 30, "description": "Iconic iron lattice tower"},
-                    {"name": "Louvre Museum", "type": "museum", "price": 17, "description": "World's largest art museum"},
-                    {"name": "Seine River Cruise", "type": "tour", "price": 25, "description": "Scenic boat tour of Paris"},
-                    {"name": "Notre-Dame Cathedral", "type": "culture", "price": 0, "description": "Gothic cathedral (exterior visit)"},
-                    {"name": "Montmartre Walking Tour", "type": "culture", "price": 15, "description": "Historic artists' quarter"}
-                ]
-            }
-            
-            # Get activities for the city (case insensitive)
-            city_lower = city.lower()
-            activities = mock_activities.get(city_lower, [])
-            
-            if not activities:
-                return f"No activities found for {city}. Available cities: {', '.join(mock_activities.keys())}"
-            
-            # Filter by activity type if specified
-            if activity_type:
-                activities = [a for a in activities if activity_type.lower() in a["type"].lower()]
-            
-            # Filter by max price if specified
-            if max_price is not None:
-                activities = [a for a in activities if a["price"] <= max_price]
-            
-            if not activities:
+            offset = (page - 1) * page_size
+            activities, total = activity_catalog.search(
+                city, activity_type, max_price, sort_by=sort_by, limit=page_size, offset=offset
+            )
+            
+            if total == 0:
+                if not activity_catalog.search(city, limit=1)[1]:
+                    cities = activity_catalog.cities(limit=10)
+                    more = activity_catalog.count_cities() - len(cities)
+                    suffix = f" and {more} more" if more > 0 else ""
+                    return f"No activities found for {city}. Available cities include: {', '.join(cities)}{suffix}"
                 return f"No activities found in {city} matching the criteria."
             
-            # Format results
-            result = f"Found {len(activities)} activities in {city}:\n\n"
-            
-            for i, activity in enumerate(activities[:5], 1):
-                result += f"{i}. {activity['name']}\n"
-                result += f"   Type: {activity['type']}\n"
-                result += f"   Price: ${activity['price']}\n"
-                result += f"   Description: {activity['description']}\n\n"
-            
-            return result
+            if not activities:
+                return f"No more activities in {city}: {total} matches fit on {math.ceil(total / page_size)} pages."
+            
+            more = offset + len(activities) < total
+            return SearchResult(
+                kind="activities",
+                title=f"{city}, sorted by {sort_by}",
+                items=[ActivityOption(a.name, a.type, a.price, a.description) for a in activities],
+                total=total,
+                offset=offset,
+                note=f"More: page={page + 1}" if more else ""
+            )
             
         except Exception as e:
             logger.error(f"Error searching activities: {str(e)}")
             return f"Error searching activities: {str(e)}"
+
+    @tool
+    @traced("plan_trip_packages")
+    def plan_trip_packages(
+        origin: Annotated[str, "Origin airport code or city"],
+        destination: Annotated[str, "Destination airport code or city"],
+        departure_date: Annotated[str, "Departure date in YYYY-MM-DD format"],
+        return_date: Annotated[str, "Return date in YYYY-MM-DD format"],
+        total_budget: Annotated[float, "Total trip budget for all travelers"],
+        adults: Annotated[int, "Number of adult travelers"] = 1,
+        food_cost: Annotated[float, "Food cost per day for the whole group"] = 0,
+        interests: Annotated[str, "Comma-separated interests to favor in activities (e.g., 'museum, food')"] = None,
+        limit: Annotated[int, "Number of packages to return"] = 3
+    ) -> "SearchResult | str":
+        """Combine flight, hotel and activity options into the best-value trip packages within the budget."""
+        try:
+            days = max((datetime.strptime(normalize_date(return_date), "%Y-%m-%d")
+                        - datetime.strptime(normalize_date(departure_date), "%Y-%m-%d")).days, 1)
+        except (TypeError, ValueError):
+            return f"Error planning packages: dates must be YYYY-MM-DD, got {departure_date} and {return_date}"
+        try:
+            # Same arguments as the agent's own searches, so these are usually tool cache hits
+            flights = Tools.search_flights.invoke({
+                "origin": origin, "destination": destination, "departure_date": departure_date,
+                "return_date": return_date, "adults": adults
+            })
+            if not isinstance(flights, SearchResult):
+                return flights
+            hotels = Tools.search_hotels.invoke({
+                "city": destination, "check_in": departure_date, "check_out": return_date, "adults": adults
+            })
+            if not isinstance(hotels, SearchResult):
+                return hotels
+            activities = Tools.search_activities.invoke({"city": destination, "page_size": 20})
+            activity_items = activities.items if isinstance(activities, SearchResult) else []
+            
+            packages, pareto_count = optimize_packages(
+                flights.items, hotels.items, activity_items, total_budget, days,
+                travelers=adults,
+                food_cost_per_day=food_cost,
+                interests=interests.split(",") if interests else (),
+                limit=max(int(limit), 1)
+            )
+            if not packages:
+                base = cheapest_base_cost(flights.items, hotels.items)
+                return (f"No package fits the ${total_budget:g} budget: the cheapest flight and hotel "
+                        f"cost ${base:g} plus ${food_cost * days:g} food.")
+            
+            return SearchResult(
+                kind="packages",
+                title=f"{flights.title}, budget {total_budget:g}, {days} days",
+                items=packages,
+                total=pareto_count,
+                currency=flights.currency,
+                note="Each package is Pareto-optimal: no other is both cheaper and higher scoring."
+            )
+            
+        except Exception as e:
+            logger.error(f"Error planning packages: {str(e)}")
+            return f"Error planning packages: {str(e)}"
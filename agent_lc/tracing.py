@@ -0,0 +1,345 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Append one JSON line per finished trace to this file (disabled when empty)
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "")
+# Durations kept per span name for percentiles in the metrics registry
+TRACE_METRICS_WINDOW = int(os.getenv("TRACE_METRICS_WINDOW", "1000"))
+
+# USD per million tokens (input, output)
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "deepseek-r1-distill-llama-70b": (0.75, 0.99),
+}
+
+# Numeric span attributes that are summed into trace and registry totals
+COUNTERS = (
+    "tokens_in", "tokens_out", "cost_usd", "stage_retries",
+    "http_requests", "http_retries", "http_time",
+    "cache_hits", "cache_misses", "cache_coalesced",
+    "rule_check_failures", "llm_verifications_skipped", "itinerary_cache_hits",
+    "llm_strategist_skipped", "tool_timeouts", "prefetch_hits", "prefetch_wasted",
+)
+
+
+@dataclass
+class Span:
+    span_id: int
+    name: str
+    kind: str  # "run", "stage", "llm", "tool"
+    parent_id: Optional[int]
+    start: float
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+# The trace and span the current task or thread is working inside
+_current: ContextVar[Optional[Tuple["Trace", Span]]] = ContextVar("trace_current_span", default=None)
+
+
+def estimate_cost(model: str, tokens_in: int, tokens_out: int) -> float:
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (tokens_in * price_in + tokens_out * price_out) / 1_000_000
+
+
+class Trace:
+    """Timed spans for one pipeline run.
+
+    Spans form a tree under a root "run" span. Code running inside
+    `trace.span(...)` (including tools and HTTP calls made from it) reports
+    into that span through a context variable, so nothing has to be passed
+    down explicitly.
+    """
+
+    def __init__(self, name: str = "run", trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.spans: List[Span] = []
+        self.root = self.start_span(name, "run")
+
+    def start_span(self, name: str, kind: str, parent: Optional[Span] = None, **attributes) -> Span:
+        with self._lock:
+            span = Span(self._next_id, name, kind, parent.span_id if parent else None, time.perf_counter(), attributes=attributes)
+            self._next_id += 1
+            self.spans.append(span)
+        return span
+
+    def end_span(self, span: Span, **attributes) -> None:
+        with self._lock:
+            span.attributes.update(attributes)
+            span.end = time.perf_counter()
+
+    def add(self, span: Span, **amounts) -> None:
+        with self._lock:
+            for key, amount in amounts.items():
+                span.attributes[key] = span.attributes.get(key, 0) + amount
+
+    @contextmanager
+    def span(self, name: str, kind: str = "stage", parent: Optional[Span] = None, **attributes) -> Iterator[Span]:
+        """Open a span and make it current for the enclosed code."""
+        if parent is None:
+            current = _current.get()
+            parent = current[1] if current and current[0] is self else self.root
+        span = self.start_span(name, kind, parent, **attributes)
+        token = _current.set((self, span))
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            self.end_span(span)
+
+    def callback_handler(self) -> "TracingCallbackHandler":
+        return TracingCallbackHandler(self)
+
+    def finish(self) -> None:
+        if self.root.end is None:
+            self.end_span(self.root)
+
+    def totals(self) -> Dict[str, float]:
+        totals = {key: 0 for key in COUNTERS}
+        with self._lock:
+            for span in self.spans:
+                for key in COUNTERS:
+                    totals[key] += span.attributes.get(key, 0)
+        totals["duration"] = self.root.duration
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        origin = self.root.start
+        with self._lock:
+            spans = [
+                {
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "kind": span.kind,
+                    "start": round(span.start - origin, 4),
+                    "duration": round(span.duration, 4),
+                    **span.attributes,
+                }
+                for span in self.spans
+            ]
+        return {"trace_id": self.trace_id, "started_at": self.started_at, "totals": self.totals(), "spans": spans}
+
+    def render_waterfall(self, width: int = 40) -> str:
+        """Plain-text waterfall: one bar per span, indented by depth."""
+        origin = self.root.start
+        total = max(self.root.duration, 1e-9)
+        with self._lock:
+            spans = list(self.spans)
+        children: Dict[Optional[int], List[Span]] = {}
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+
+        totals = self.totals()
+        lines = [
+            f"Trace {self.trace_id}: {totals['duration']:.2f}s, "
+            f"tokens {totals['tokens_in']}/{totals['tokens_out']}, cost ${totals['cost_usd']:.4f}, "
+            f"http {totals['http_time']:.2f}s ({totals['http_requests']} req, {totals['http_retries']} retries), "
+            f"cache {totals['cache_hits']} hit/{totals['cache_misses']} miss"
+        ]
+
+        def render(span: Span, depth: int) -> None:
+            offset = int((span.start - origin) / total * width)
+            length = max(1, int(span.duration / total * width))
+            bar = " " * offset + "█" * min(length, width - offset)
+            label = ("  " * depth + span.name)[:30]
+            details = " ".join(
+                f"{key}={round(value, 4) if isinstance(value, float) else value}"
+                for key, value in span.attributes.items()
+            )
+            lines.append(f"{label:<30} |{bar:<{width}}| {span.duration:7.2f}s {details}".rstrip())
+            for child in sorted(children.get(span.span_id, []), key=lambda s: s.start):
+                render(child, depth + 1)
+
+        render(self.root, 0)
+        return "\n".join(lines)
+
+
+def current_span() -> Optional[Tuple[Trace, Span]]:
+    return _current.get()
+
+
+def add_to_current_span(**amounts) -> None:
+    """Add numeric amounts to the current span; a no-op outside a trace."""
+    current = _current.get()
+    if current is not None:
+        trace, span = current
+        trace.add(span, **amounts)
+
+
+def record_llm_usage(model: str, tokens_in: int, tokens_out: int, estimated: bool = False) -> None:
+    current = _current.get()
+    if current is None:
+        return
+    trace, span = current
+    trace.add(span, tokens_in=tokens_in, tokens_out=tokens_out, cost_usd=estimate_cost(model, tokens_in, tokens_out))
+    if estimated:
+        span.attributes["tokens_estimated"] = True
+
+
+@contextmanager
+def traced_call(name: str, kind: str = "llm", **attributes) -> Iterator[Optional[Span]]:
+    """Run the enclosed code in a child span of the current trace, if any."""
+    current = _current.get()
+    if current is None:
+        yield None
+        return
+    with current[0].span(name, kind, **attributes) as span:
+        yield span
+
+
+def traced(name: str, kind: str = "tool"):
+    """Decorator recording each call of a tool function as a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with traced_call(name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Record every LLM call of an agent run as a span with token usage.
+
+    Streaming responses carry no usage data, so their token counts are
+    estimated from the prompt and the generated text.
+    """
+
+    run_inline = True  # Keep the caller's context so spans nest under the current stage
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._spans: Dict[UUID, Tuple[Span, str, str]] = {}
+
+    def _start(self, run_id: UUID, prompt_text: str, **kwargs: Any) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or "llm"
+        current = _current.get()
+        parent = current[1] if current and current[0] is self.trace else self.trace.root
+        span = self.trace.start_span(f"llm:{model}", "llm", parent)
+        self._spans[run_id] = (span, model, prompt_text)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, "\n".join(prompts), **kwargs)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, "\n".join(str(m.content) for batch in messages for m in batch), **kwargs)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        entry = self._spans.get(run_id)
+        if entry is not None and token and "time_to_first_token" not in entry[0].attributes:
+            entry[0].attributes["time_to_first_token"] = round(time.perf_counter() - entry[0].start, 4)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        entry = self._spans.pop(run_id, None)
+        if entry is None:
+            return
+        span, model, prompt_text = entry
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage.get("prompt_tokens") is not None:
+            tokens_in, tokens_out, estimated = usage["prompt_tokens"], usage.get("completion_tokens", 0), False
+        else:
+            from .history_policy import count_tokens
+            output_text = "".join(g.text for generations in response.generations for g in generations)
+            tokens_in, tokens_out, estimated = count_tokens(prompt_text), count_tokens(output_text), True
+        attributes = {"tokens_estimated": True} if estimated else {}
+        self.trace.add(span, tokens_in=tokens_in, tokens_out=tokens_out, cost_usd=estimate_cost(model, tokens_in, tokens_out))
+        self.trace.end_span(span, **attributes)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        entry = self._spans.pop(run_id, None)
+        if entry is not None:
+            self.trace.end_span(entry[0], error=str(error))
+
+
+class MetricsRegistry:
+    """In-process aggregate of finished traces, keyed by span kind and name."""
+
+    def __init__(self, window: int = TRACE_METRICS_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._durations: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._counters: Dict[str, Dict[str, float]] = {}
+        self.traces = 0
+
+    def record_trace(self, trace: Trace) -> None:
+        with self._lock:
+            self.traces += 1
+            for span in trace.spans:
+                key = f"{span.kind}:{span.name}" if span.kind != "llm" else span.name
+                self._durations.setdefault(key, deque(maxlen=self.window)).append(span.duration)
+                self._counts[key] = self._counts.get(key, 0) + 1
+                counters = self._counters.setdefault(key, {})
+                for name in COUNTERS:
+                    if name in span.attributes:
+                        counters[name] = counters.get(name, 0) + span.attributes[name]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            result = {}
+            for key, durations in self._durations.items():
+                ordered = sorted(durations)
+                result[key] = {
+                    "count": self._counts[key],
+                    "p50": ordered[int(0.50 * (len(ordered) - 1))],
+                    "p95": ordered[int(0.95 * (len(ordered) - 1))],
+                    "max": ordered[-1],
+                    **self._counters[key],
+                }
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._durations.clear()
+            self._counts.clear()
+            self._counters.clear()
+            self.traces = 0
+
+
+def finish_trace(trace: Trace, jsonl_path: str = TRACE_JSONL_PATH) -> None:
+    """Close the trace, add it to the metrics registry and optionally log it as JSON."""
+    trace.finish()
+    metrics_registry.record_trace(trace)
+    if jsonl_path:
+        try:
+            with open(jsonl_path, "a") as f:
+                f.write(json.dumps(trace.to_dict()) + "\n")
+        except OSError as e:
+            logger.error(f"Error writing trace {trace.trace_id}: {str(e)}")
+
+
+# Create a global instance of MetricsRegistry
+metrics_registry = MetricsRegistry()
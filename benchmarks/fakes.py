@@ -0,0 +1,198 @@
+"""Offline stand-ins for ChatOpenAI, the Groq client and the Amadeus API.
+
+Responses come from the JSON fixtures in benchmarks/fixtures (synthetic by
+default, or recorded ones via --fixtures), with injected latency so runs
+behave like the real services without any network access.
+"""
+import asyncio
+import io
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from requests.adapters import BaseAdapter
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def load_fixtures(fixtures_dir: Path = FIXTURES_DIR) -> Dict[str, Any]:
+    fixtures_dir = Path(fixtures_dir)
+    with open(fixtures_dir / "llm.json") as f:
+        llm = json.load(f)
+    with open(fixtures_dir / "amadeus.json") as f:
+        amadeus = json.load(f)
+    return {"llm": llm, "amadeus": amadeus}
+
+
+class LatencyModel:
+    """Log-normal latency around a median, seeded for repeatable runs."""
+
+    def __init__(self, median: float, jitter: float = 0.0, seed: Optional[int] = None):
+        self.median = median
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        if self.median <= 0:
+            return 0.0
+        with self._lock:
+            return self.median * math.exp(self._random.gauss(0, self.jitter)) if self.jitter else self.median
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that replays a fixed answer, optionally after one round of tool calls.
+
+    Tool calls are returned on the first turn (no ToolMessage in the input
+    yet), the scripted response afterwards. The response is reported as
+    streamed tokens when a callback manager is attached, so streaming
+    consumers such as pipelined verification work unchanged.
+    """
+
+    response: str
+    tool_calls: List[Dict[str, Any]] = []
+    latency: Any = None
+    chunk_size: int = 40
+    model_name: str = "gpt-4o"
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _build_message(self, messages: List[BaseMessage]) -> AIMessage:
+        if self.tool_calls and not any(isinstance(message, ToolMessage) for message in messages):
+            return AIMessage(content="", additional_kwargs={"tool_calls": [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])},
+                }
+                for call in self.tool_calls
+            ]})
+        return AIMessage(content=self.response)
+
+    def _result(self, messages: List[BaseMessage], message: AIMessage) -> ChatResult:
+        prompt_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        completion_tokens = estimate_tokens(message.content or json.dumps(message.additional_kwargs))
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={
+                "model_name": self.model_name,
+                "token_usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens},
+            },
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._build_message(messages)
+        delay = self.latency.sample() if self.latency else 0.0
+        chunks = _chunks(message.content, self.chunk_size)
+        for chunk in chunks or [""]:
+            time.sleep(delay / max(len(chunks), 1))
+            if run_manager and chunk:
+                run_manager.on_llm_new_token(chunk)
+        return self._result(messages, message)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._build_message(messages)
+        delay = self.latency.sample() if self.latency else 0.0
+        chunks = _chunks(message.content, self.chunk_size)
+        for chunk in chunks or [""]:
+            await asyncio.sleep(delay / max(len(chunks), 1))
+            if run_manager and chunk:
+                await run_manager.on_llm_new_token(chunk)
+        return self._result(messages, message)
+
+
+def _chunks(text: str, size: int) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeAsyncGroq:
+    """Async Groq client whose chat completions return a scripted report."""
+
+    def __init__(self, response: str, latency: Optional[LatencyModel] = None):
+        self.response = response
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, messages, model: str = "", temperature: float = 0.0, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample() if self.latency else 0.0)
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.response))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=estimate_tokens(self.response)),
+        )
+
+
+def amadeus_fixture_response(fixtures: Dict[str, Any], path: str, query: Dict[str, List[str]]):
+    """(status, body) for an Amadeus endpoint used by the tools, answered from fixtures."""
+    if path == "/v1/security/oauth2/token":
+        return 200, fixtures["token"]
+    if path == "/v1/reference-data/locations/hotels/by-city":
+        return 200, fixtures["hotels_by_city"]
+    if path == "/v3/shopping/hotel-offers":
+        hotel_id = query.get("hotelIds", [""])[0]
+        return 200, fixtures["hotel_offers"].get(hotel_id, {"data": []})
+    if path == "/v2/shopping/flight-offers":
+        return 200, fixtures["flight_offers"]
+    return 404, {"errors": [{"status": 404, "title": "NOT FOUND", "detail": path}]}
+
+
+class AmadeusFixtureAdapter(BaseAdapter):
+    """requests adapter answering the Amadeus endpoints used by the tools from fixtures."""
+
+    def __init__(self, fixtures: Dict[str, Any], latency: Optional[LatencyModel] = None):
+        super().__init__()
+        self.fixtures = fixtures
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency.sample() if self.latency else 0.0)
+        url = urlparse(request.url)
+        status, body = amadeus_fixture_response(self.fixtures, url.path, parse_qs(url.query))
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers["Content-Type"] = "application/json"
+        response.raw = io.BytesIO(json.dumps(body).encode())
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,219 @@
+"""Local stand-in for test.api.amadeus.com, for load testing the Amadeus tools.
+
+Serves the OAuth token endpoint, hotels by city, hotel offers and flight
+offers from the benchmark fixtures, with tunable latency, error rate, 429
+throttling and payload size:
+
+    python -m benchmarks.mock_amadeus --port 8080 --latency 0.1 --error-rate 0.02 --rate-limit 50
+    AMADEUS_BASE_URL=http://127.0.0.1:8080 python main.py
+"""
+import argparse
+import copy
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .fakes import FIXTURES_DIR, LatencyModel, amadeus_fixture_response, load_fixtures
+
+ENDPOINTS = {
+    "/v1/security/oauth2/token": "token",
+    "/v1/reference-data/locations/hotels/by-city": "hotels",
+    "/v3/shopping/hotel-offers": "hotel_offers",
+    "/v2/shopping/flight-offers": "flight_offers",
+}
+
+
+@dataclass
+class MockAmadeusConfig:
+    latency: float = 0.05  # median seconds per request
+    jitter: float = 0.3  # log-normal sigma
+    endpoint_latency: Dict[str, float] = field(default_factory=dict)  # median override per endpoint name
+    error_rate: float = 0.0  # fraction of search requests answered with a 500
+    rate_limit: float = 0.0  # requests per second before answering 429 (0 = unlimited)
+    retry_after: int = 1  # Retry-After seconds sent with 429s
+    hotels: Optional[int] = None  # hotels per city (payload size); fixture count when None
+    flights: Optional[int] = None  # flight offers per search; fixture count when None
+    seed: int = 0
+
+
+def scale_fixtures(amadeus: Dict[str, Any], hotels: Optional[int], flights: Optional[int]) -> Dict[str, Any]:
+    """Copy of the Amadeus fixtures with hotel and flight lists cycled to the requested sizes."""
+    scaled = copy.deepcopy(amadeus)
+    if hotels is not None:
+        base = amadeus["hotels_by_city"]["data"]
+        scaled["hotels_by_city"]["data"] = []
+        for i in range(hotels):
+            hotel = copy.deepcopy(base[i % len(base)])
+            original_id = hotel["hotelId"]
+            hotel["hotelId"] = f"{original_id[:5]}{i:03d}"
+            scaled["hotels_by_city"]["data"].append(hotel)
+            offers = copy.deepcopy(amadeus["hotel_offers"].get(original_id, {"data": []}))
+            for item in offers["data"]:
+                item["hotel"]["hotelId"] = hotel["hotelId"]
+            scaled["hotel_offers"][hotel["hotelId"]] = offers
+    if flights is not None:
+        base = amadeus["flight_offers"]["data"]
+        scaled["flight_offers"]["data"] = [dict(copy.deepcopy(base[i % len(base)]), id=str(i + 1)) for i in range(flights)]
+    return scaled
+
+
+class _RateLimiter:
+    """Fixed one-second window counter."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._window = 0
+        self._count = 0
+
+    def allow(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            window = int(time.monotonic())
+            if window != self._window:
+                self._window, self._count = window, 0
+            self._count += 1
+            return self._count <= self.rate
+
+
+class MockAmadeusServer:
+    """Threaded HTTP server answering the Amadeus endpoints used by the tools."""
+
+    def __init__(self, config: MockAmadeusConfig = None, host: str = "127.0.0.1", port: int = 0, fixtures_dir=FIXTURES_DIR):
+        self.config = config or MockAmadeusConfig()
+        self.fixtures = scale_fixtures(load_fixtures(fixtures_dir)["amadeus"], self.config.hotels, self.config.flights)
+        self._latency = {
+            name: LatencyModel(self.config.endpoint_latency.get(name, self.config.latency), self.config.jitter, self.config.seed + i)
+            for i, name in enumerate(ENDPOINTS.values())
+        }
+        self._errors = random.Random(self.config.seed + 100)
+        self._errors_lock = threading.Lock()
+        self._rate_limiter = _RateLimiter(self.config.rate_limit)
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "throttled": 0, "errors": 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def respond(self, path: str, query: Dict[str, Any]) -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+        """(status, headers, body) for one request, after the simulated latency."""
+        self._count("requests")
+        endpoint = ENDPOINTS.get(path)
+        if endpoint is not None:
+            self._count(endpoint)
+            time.sleep(self._latency[endpoint].sample())
+
+        if not self._rate_limiter.allow():
+            self._count("throttled")
+            return 429, {"Retry-After": str(self.config.retry_after)}, {
+                "errors": [{"status": 429, "code": 38194, "title": "Too many requests"}]
+            }
+        if endpoint not in (None, "token"):
+            with self._errors_lock:
+                failed = self._errors.random() < self.config.error_rate
+            if failed:
+                self._count("errors")
+                return 500, {}, {"errors": [{"status": 500, "code": 141, "title": "SYSTEM ERROR HAS OCCURRED"}]}
+
+        status, body = amadeus_fixture_response(self.fixtures, path, query)
+        return status, {}, body
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, so client connection pooling is exercised
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                url = urlparse(self.path)
+                status, headers, body = server.respond(url.path, parse_qs(url.query))
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = _handle
+            do_POST = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "MockAmadeusServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self.stats)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Local mock of the Amadeus test API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.05, help="Median seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Log-normal sigma of the latency")
+    parser.add_argument("--endpoint-latency", action="append", default=[], metavar="NAME=SECONDS",
+                        help=f"Median latency for one endpoint ({', '.join(ENDPOINTS.values())})")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of search requests that return 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second before returning 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429 responses")
+    parser.add_argument("--hotels", type=int, help="Hotels returned per city")
+    parser.add_argument("--flights", type=int, help="Flight offers returned per search")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    config = MockAmadeusConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        endpoint_latency={name: float(value) for name, value in (item.split("=", 1) for item in args.endpoint_latency)},
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+        hotels=args.hotels,
+        flights=args.flights,
+        seed=args.seed,
+    )
+    server = MockAmadeusServer(config, args.host, args.port)
+    print(f"Mock Amadeus API listening on {server.base_url}")
+    print(f"Point the tools at it with AMADEUS_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.get_stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
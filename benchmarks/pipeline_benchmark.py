@@ -0,0 +1,193 @@
+"""Offline benchmark of the strategist -> copywriter -> verification pipeline.
+
+Runs the real agents, tools, HTTP client and caches against scripted LLMs and
+an Amadeus fixture adapter, so it needs no network or API keys:
+
+    python -m benchmarks.pipeline_benchmark --runs 50 --concurrency 8
+
+With --baseline, exits non-zero when p95 latency or throughput regress by
+more than --max-regression compared to a previous --output file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+# Dummy credentials: every request is answered by the fixture adapter
+os.environ.setdefault("AMADEUS_CLIENT_ID", "benchmark")
+os.environ.setdefault("AMADEUS_CLIENT_SECRET", "benchmark")
+
+from agent_lc.agent import Agent
+from agent_lc.amadeus_auth import amadeus_token_manager, AMADEUS_BASE_URL
+from agent_lc.http_client import http_client
+from agent_lc.pipeline import TravelPipeline, STAGES
+from agent_lc.prompts import WEB_SEARCH_PROMPT, TRAVEL_PLANNER_PROMPT
+from agent_lc.prefetch import prefetcher
+from agent_lc.tool_cache import tool_cache
+from agent_lc.tracing import metrics_registry
+
+from .fakes import (
+    FIXTURES_DIR,
+    AmadeusFixtureAdapter,
+    FakeAsyncGroq,
+    LatencyModel,
+    ScriptedChatModel,
+    load_fixtures,
+)
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(round(percent / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1)
+
+
+def build_pipeline(args):
+    """Pipeline wired to scripted LLMs and the fixture adapter; returns (pipeline, adapter)."""
+    fixtures = load_fixtures(args.fixtures)
+    llm_latency = lambda offset: LatencyModel(args.llm_latency, args.jitter, args.seed + offset)
+
+    strategist_llm = ScriptedChatModel(response=fixtures["llm"]["strategist"], latency=llm_latency(0))
+    copywriter_llm = ScriptedChatModel(
+        response=fixtures["llm"]["copywriter"],
+        tool_calls=fixtures["llm"]["copywriter_tool_calls"],
+        latency=llm_latency(1),
+    )
+    strategist_executor = Agent(WEB_SEARCH_PROMPT, "web_search", llm=strategist_llm).get_agent_executor()
+    copywriter_executor = Agent(TRAVEL_PLANNER_PROMPT, "travel_planner", llm=copywriter_llm).get_agent_executor()
+    strategist_executor.verbose = copywriter_executor.verbose = False
+
+    adapter = AmadeusFixtureAdapter(fixtures["amadeus"], LatencyModel(args.http_latency, args.jitter, args.seed + 2))
+    http_client.session.mount(AMADEUS_BASE_URL, adapter)
+    amadeus_token_manager.invalidate()
+
+    groq_client = FakeAsyncGroq(fixtures["llm"]["verification"], llm_latency(3))
+    pipeline = TravelPipeline(
+        strategist_executor,
+        copywriter_executor,
+        groq_client,
+        retry_delay=0,
+        pipelined_verification=args.pipelined_verification,
+        verification_mode=args.verification_mode,
+        strategist_mode=args.strategist_mode,
+        prefetcher=prefetcher if args.prefetch else None,
+    )
+    return pipeline, adapter
+
+
+async def run_benchmark(
+    pipeline: TravelPipeline, adapter: AmadeusFixtureAdapter, runs: int, concurrency: int, cold_cache: bool
+) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    stage_latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    failures = 0
+
+    async def run_one(index: int):
+        nonlocal failures
+        async with semaphore:
+            if cold_cache:
+                tool_cache.invalidate()
+            start = time.perf_counter()
+            results = await pipeline.run_to_completion(f"Benchmark request {index}: Paris, June 15-22, 2025, 2 people, $3000")
+            if any(event.status == "failed" for event in results.values()) or len(results) != len(STAGES):
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            for stage, event in results.items():
+                stage_latencies[stage].append(event.elapsed)
+
+    metrics_registry.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*(run_one(i) for i in range(runs)))
+    wall_time = time.perf_counter() - start
+
+    return {
+        "runs": runs,
+        "concurrency": concurrency,
+        "failures": failures,
+        "wall_time": round(wall_time, 3),
+        "throughput_per_min": round(len(latencies) / wall_time * 60, 2) if wall_time else 0.0,
+        "latency": {f"p{p}": round(percentile(latencies, p), 4) for p in (50, 95, 99)},
+        "stages": {
+            stage: {f"p{p}": round(percentile(values, p), 4) for p in (50, 95, 99)}
+            for stage, values in stage_latencies.items()
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "amadeus_requests": adapter.requests,
+        "llm_verification_calls": pipeline.groq_client.calls,
+        "tool_cache": tool_cache.get_stats(),
+        "http": http_client.get_stats(),
+    }
+
+
+def check_regression(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    problems = []
+    if report["latency"]["p95"] > baseline["latency"]["p95"] * (1 + max_regression):
+        problems.append(f"p95 latency {report['latency']['p95']:.3f}s vs baseline {baseline['latency']['p95']:.3f}s")
+    if report["throughput_per_min"] < baseline["throughput_per_min"] * (1 - max_regression):
+        problems.append(f"throughput {report['throughput_per_min']}/min vs baseline {baseline['throughput_per_min']}/min")
+    if report["failures"] > baseline.get("failures", 0):
+        problems.append(f"{report['failures']} failed runs vs {baseline.get('failures', 0)} in baseline")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark of the travel pipeline")
+    parser.add_argument("--runs", type=int, default=20, help="Number of pipeline runs")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum runs in flight")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Median seconds per LLM call")
+    parser.add_argument("--http-latency", type=float, default=0.05, help="Median seconds per Amadeus request")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Log-normal sigma applied to all latencies")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fixtures", default=str(FIXTURES_DIR), help="Directory with llm.json and amadeus.json")
+    parser.add_argument("--cold-cache", action="store_true", help="Clear the tool cache before every run")
+    parser.add_argument("--pipelined-verification", action="store_true")
+    parser.add_argument("--verification-mode", choices=("rules", "llm"), default="rules",
+                        help="'llm' always calls the LLM verifier instead of trusting passing rule checks")
+    parser.add_argument("--strategist-mode", choices=("local", "llm"), default="local",
+                        help="'llm' always calls the strategist LLM instead of extracting clear-cut requirements locally")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="Start the searches for the request's destination and dates during the strategist stage")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative regression, e.g. 0.2 for 20%%")
+    args = parser.parse_args(argv)
+
+    pipeline, adapter = build_pipeline(args)
+    report = asyncio.run(run_benchmark(pipeline, adapter, args.runs, args.concurrency, args.cold_cache))
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = check_regression(report, json.load(f), args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION: {problem}", file=sys.stderr)
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Load test of search_hotels and search_flights against the local Amadeus mock.
+
+Starts a MockAmadeusServer in-process (or uses --base-url of one already
+running) and fires concurrent tool calls through the real HTTP client,
+token manager and tool cache:
+
+    python -m benchmarks.tool_load_test --calls 200 --concurrency 16 --distinct 20 --rate-limit 100
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, List
+
+from .mock_amadeus import MockAmadeusConfig, MockAmadeusServer
+
+
+def percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(round(percent / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the Amadeus tools against a local mock")
+    parser.add_argument("--base-url", help="Use an already running mock instead of starting one")
+    parser.add_argument("--calls", type=int, default=100, help="Total tool calls (hotels and flights alternate)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--distinct", type=int, default=10, help="Distinct searches; lower values mean more cache hits")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--hotels", type=int)
+    parser.add_argument("--flights", type=int)
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server = MockAmadeusServer(MockAmadeusConfig(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            rate_limit=args.rate_limit,
+            hotels=args.hotels,
+            flights=args.flights,
+        )).start()
+        base_url = server.base_url
+
+    # The tools read these at import time
+    os.environ["AMADEUS_BASE_URL"] = base_url
+    os.environ.setdefault("AMADEUS_CLIENT_ID", "load-test")
+    os.environ.setdefault("AMADEUS_CLIENT_SECRET", "load-test")
+    from agent_lc.http_client import http_client
+    from agent_lc.tool_cache import tool_cache
+    from agent_lc.tools import Tools
+
+    def call(index: int):
+        day = date(2025, 6, 1) + timedelta(days=index % args.distinct)
+        if index % 2 == 0:
+            name, tool, tool_args = "search_hotels", Tools.search_hotels, {
+                "city": "PAR", "check_in": day.isoformat(), "check_out": (day + timedelta(days=5)).isoformat(), "adults": 2
+            }
+        else:
+            name, tool, tool_args = "search_flights", Tools.search_flights, {
+                "origin": "JFK", "destination": "CDG", "departure_date": day.isoformat(), "adults": 2
+            }
+        start = time.perf_counter()
+        result = tool.invoke(tool_args)
+        return name, time.perf_counter() - start, str(result).startswith("Error")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(call, range(args.calls)))
+    wall_time = time.perf_counter() - start
+
+    tools: Dict[str, Dict[str, float]] = {}
+    for name in ("search_hotels", "search_flights"):
+        latencies = [elapsed for tool_name, elapsed, _ in results if tool_name == name]
+        tools[name] = {
+            "calls": len(latencies),
+            "errors": sum(1 for tool_name, _, failed in results if tool_name == name and failed),
+            **{f"p{p}": round(percentile(latencies, p), 4) for p in (50, 95, 99)},
+        }
+
+    report = {
+        "base_url": base_url,
+        "calls": args.calls,
+        "concurrency": args.concurrency,
+        "wall_time": round(wall_time, 3),
+        "calls_per_second": round(args.calls / wall_time, 2),
+        "tools": tools,
+        "http": http_client.get_stats(),
+        "tool_cache": tool_cache.get_stats()["tools"],
+    }
+    if server is not None:
+        report["mock_server"] = server.get_stats()
+        server.stop()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,6 @@
 import streamlit as st
-from agent_lc.agent import Agent
+from agent_lc.agent_factory import get_agent_executor, get_groq_client
 from agent_lc.prompts import WEB_SEARCH_PROMPT, TRAVEL_PLANNER_PROMPT
-from groq import Groq
 import os
 from dotenv import load_dotenv
 import json
@@ -9,6 +8,19 @@ from datetime import datetime
 import time
 import uuid
 from agent_lc.chat_history import chat_history_manager
+from agent_lc.streaming import TokenStreamHandler, stream_groq_completion
+from agent_lc.tracing import Trace, add_to_current_span, finish_trace, record_llm_usage, traced_call
+from agent_lc.rule_verification import VERIFICATION_MODE, rule_verifier
+from agent_lc.itinerary_cache import itinerary_cache
+from agent_lc.requirements_extractor import STRATEGIST_MODE, requirements_extractor
+from agent_lc.prefetch import PREFETCH_SEARCHES, prefetcher
+from agent_lc.history_policy import count_tokens
+from agent_lc.job_queue import (
+    BACKGROUND_JOBS, JOB_EMBEDDED_WORKERS, JOB_LLM_CONCURRENCY, JOB_POLL_INTERVAL, JOB_VERIFICATION_CONCURRENCY,
+    JobWorkerPool, get_job_queue, start_worker_thread,
+)
+from agent_lc.pipeline import STAGES, TravelPipeline
+from contextlib import nullcontext
 
 # Load environment variables
 load_dotenv()
@@ -43,26 +55,120 @@ if "agent_status" not in st.session_state:
     st.session_state.agent_status = {"strategist": "pending", "copywriter": "pending", "verification": "pending"}
 if "current_prompt" not in st.session_state:
     st.session_state.current_prompt = ""
+if "stream_responses" not in st.session_state:
+    st.session_state.stream_responses = True
+if "trace" not in st.session_state:
+    st.session_state.trace = None
+if "cached_verification" not in st.session_state:
+    st.session_state.cached_verification = None
+if "prefetch" not in st.session_state:
+    st.session_state.prefetch = None  # searches started for the current request during the strategist stage
+if "background_jobs" not in st.session_state:
+    st.session_state.background_jobs = BACKGROUND_JOBS
+if "job_id" not in st.session_state:
+    # Reattach to the job in the URL after a page reload
+    st.session_state.job_id = st.experimental_get_query_params().get("job", [None])[0]
+if "job_timing" not in st.session_state:
+    st.session_state.job_timing = ""
+
+STAGE_HEADERS = {
+    "strategist": "🤔 **Strategist Agent Analysis:**",
+    "copywriter": "✍️ **Copywriter Agent Itinerary:**",
+    "verification": "🔍 **DeepSeek Verification Report:**",
+}
 
-def initialize_agents():
-    """Initialize all agents"""
+def initialize_agents(streaming=False):
+    """Get the shared agents and clients (built once per process, reused across reruns)"""
     try:
-        # Initialize Strategist Agent with chat history
-        strategist_agent = Agent(prompt_text=WEB_SEARCH_PROMPT, agent_type="web_search")
-        strategist_executor = strategist_agent.get_agent_with_history()
+        # Strategist Agent with chat history
+        strategist_executor = get_agent_executor(WEB_SEARCH_PROMPT, "web_search", with_history=True, streaming=streaming)
         
-        # Initialize Copywriter Agent
-        copywriter_agent = Agent(prompt_text=TRAVEL_PLANNER_PROMPT, agent_type="travel_planner")
-        copywriter_executor = copywriter_agent.get_agent_executor()
+        # Copywriter Agent
+        copywriter_executor = get_agent_executor(TRAVEL_PLANNER_PROMPT, "travel_planner", streaming=streaming)
         
-        # Initialize Groq client for DeepSeek
-        groq_client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+        # Groq client for DeepSeek
+        groq_client = get_groq_client()
         
         return strategist_executor, copywriter_executor, groq_client
     except Exception as e:
         st.error(f"Error initializing agents: {str(e)}")
         return None, None, None
 
+def create_stream_handler(header):
+    """Create a callback handler that renders tokens and tool activity into the current chat message.
+    
+    Returns the handler and the placeholder holding the streamed text.
+    """
+    tool_placeholder = st.empty()
+    text_placeholder = st.empty()
+    tool_events = []
+    
+    def render_tools():
+        tool_placeholder.markdown("\n".join(f"{icon} `{name}`" for name, icon in tool_events))
+    
+    def on_tool_start(name, tool_input):
+        tool_events.append((name, "🔧"))
+        render_tools()
+    
+    def on_tool_end(name, output):
+        for i, (event_name, icon) in enumerate(tool_events):
+            if event_name == name and icon == "🔧":
+                tool_events[i] = (name, "✅")
+                break
+        render_tools()
+    
+    def on_token(token, text):
+        text_placeholder.markdown(f"{header}{text}▌")
+    
+    handler = TokenStreamHandler(on_token=on_token, on_tool_start=on_tool_start, on_tool_end=on_tool_end)
+    return handler, text_placeholder
+
+def trace_stage(stage):
+    """Record the enclosed agent stage in the current request's trace"""
+    trace = st.session_state.trace
+    return trace.span(stage, "stage") if trace is not None else nullcontext()
+
+def invoke_agent(executor, inputs, header, spinner_text, config=None):
+    """Invoke an agent executor, streaming its output into the chat when streaming is enabled"""
+    config = dict(config or {})
+    if st.session_state.trace is not None:
+        config["callbacks"] = [st.session_state.trace.callback_handler()]
+    if not st.session_state.stream_responses:
+        with st.spinner(spinner_text):
+            return executor.invoke(inputs, config=config).get('output')
+    
+    with st.chat_message("assistant"):
+        stream_handler, text_placeholder = create_stream_handler(header)
+        config["callbacks"] = config.get("callbacks", []) + [stream_handler]
+        output = executor.invoke(inputs, config=config).get('output')
+        text_placeholder.markdown(f"{header}{output}")
+        if stream_handler.time_to_first_token is not None:
+            st.caption(f"⚡ First token after {stream_handler.time_to_first_token:.1f}s")
+    return output
+
+def finish_prefetch():
+    """Claim the searches prefetched for the current request, whether or not its stages succeeded."""
+    prefetch, st.session_state.prefetch = st.session_state.prefetch, None
+    if prefetch is not None and prefetch.calls:
+        used, wasted = prefetcher.finish(prefetch)
+        add_to_current_span(prefetch_hits=used, prefetch_wasted=wasted)
+
+def local_strategist_analysis(user_input):
+    """Requirements analysis extracted in code, or None when the strategist agent should run.
+
+    The exchange is added to the strategist's chat history so follow-up
+    requests that do reach the agent still see it.
+    """
+    if STRATEGIST_MODE != "local":
+        return None
+    analysis = requirements_extractor.analyze(user_input)
+    if analysis is not None:
+        add_to_current_span(llm_strategist_skipped=1)
+        history = chat_history_manager.get_history_by_session_id(st.session_state["session_id_strategist"])
+        history.add_user_message(user_input)
+        history.add_ai_message(analysis)
+    return analysis
+
 def get_copywriter_agent_prompt(user_requirements, strategist_analysis):
     """Run the copywriter agent to create itinerary"""
     try:
@@ -85,12 +191,22 @@ def get_copywriter_agent_prompt(user_requirements, strategist_analysis):
     except Exception as e:
         return f"Error in copywriter agent: {str(e)}"
 
-def run_verification_agent(user_requirements, strategist_analysis, copywriter_itinerary):
-    """Run the verification agent using DeepSeek"""
+def run_verification_agent(user_requirements, strategist_analysis, copywriter_itinerary, on_token=None):
+    """Run the verification agent using DeepSeek, streaming tokens to on_token if given.
+
+    The rule-based checks run first; DeepSeek is only called when they fail or cannot settle it.
+    """
     try:
-        _, _, groq_client = initialize_agents()
-        if groq_client is None:
-            return "Error: Could not initialize verification agent"
+        rule_report = rule_verifier.verify(f"{user_requirements}\n{strategist_analysis}", copywriter_itinerary)
+        add_to_current_span(rule_check_failures=len(rule_report.failed))
+        if VERIFICATION_MODE == "rules" and not rule_report.needs_llm:
+            add_to_current_span(llm_verifications_skipped=1)
+            output = rule_report.render()
+            if on_token is not None:
+                on_token(output, output)
+            return output
+        
+        groq_client = get_groq_client()
         
         verification_prompt = f"""
         You are a travel planning quality assurance specialist. Compare the user requirements with the generated itinerary to ensure consistency and completeness.
@@ -104,12 +220,16 @@ def run_verification_agent(user_requirements, strategist_analysis, copywriter_it
         COPYWRITER AGENT ITINERARY:
         {copywriter_itinerary}
         
+        AUTOMATED CHECKS (computed in code from the itinerary; trust their numbers):
+        {rule_report.findings()}
+        
         Please verify:
         1. Does the itinerary match all user requirements? (destination, dates, budget, interests)
         2. Are all requested activities included?
         3. Does the budget stay within the specified range?
         4. Is the itinerary logical and well-structured?
         5. Are there any missing critical information?
+        6. For each FAIL above, is it a real problem and how should it be fixed?
         
         Provide a verification report with:
         - Overall consistency score (1-10)
@@ -118,15 +238,33 @@ def run_verification_agent(user_requirements, strategist_analysis, copywriter_it
         - Final approval status
         """
         
-        with st.spinner("🔍 DeepSeek Agent is verifying your itinerary..."):
-            verification_completion = groq_client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are a travel planning quality assurance specialist. Your job is to verify that generated itineraries meet all user requirements and maintain consistency."},
-                    {"role": "user", "content": verification_prompt}
-                ],
-                model="deepseek-r1-distill-llama-70b",
-                temperature=0.0
-            )
+        messages = [
+            {"role": "system", "content": "You are a travel planning quality assurance specialist. Your job is to verify that generated itineraries meet all user requirements and maintain consistency."},
+            {"role": "user", "content": verification_prompt}
+        ]
+        
+        model = "deepseek-r1-distill-llama-70b"
+        with traced_call(f"llm:{model}", "llm"):
+            if on_token is not None:
+                output = stream_groq_completion(
+                    groq_client, on_token,
+                    messages=messages,
+                    model=model,
+                    temperature=0.0
+                )
+                # Streamed completions report no usage, so estimate it
+                prompt_text = "\n".join(message["content"] for message in messages)
+                record_llm_usage(model, count_tokens(prompt_text), count_tokens(output), estimated=True)
+                return output
+            
+            with st.spinner("🔍 DeepSeek Agent is verifying your itinerary..."):
+                verification_completion = groq_client.chat.completions.create(
+                    messages=messages,
+                    model=model,
+                    temperature=0.0
+                )
+            if verification_completion.usage is not None:
+                record_llm_usage(model, verification_completion.usage.prompt_tokens, verification_completion.usage.completion_tokens)
         
         return verification_completion.choices[0].message.content
     except Exception as e:
@@ -142,26 +280,40 @@ def process_travel_request(user_input):
         
         # Step 1: Strategist Agent - Analyze requirements
         st.session_state.current_agent = "strategist"
-        with st.spinner("🤔 Strategist Agent is analyzing your requirements..."):
-            strategist_response = strategist_executor.invoke(
-                {"input": user_input},
-                config={"configurable": {"session_id": st.session_state["session_id_strategist"]}}
-            )
-            strategist_output = strategist_response.get('output')
-        
-        # Step 2: Copywriter Agent - Create itinerary
-        st.session_state.current_agent = "copywriter"
-        with st.spinner("✍️ Copywriter Agent is creating your itinerary..."):
-            copywriter_prompt = get_copywriter_agent_prompt(user_input, strategist_output)
-            copywriter_response = copywriter_executor.invoke({
-                "input": copywriter_prompt
-            })
-            copywriter_output = copywriter_response.get('output')
+        prefetch = prefetcher.start(user_input) if PREFETCH_SEARCHES else None
+        try:
+            strategist_output = local_strategist_analysis(user_input)
+            if strategist_output is None:
+                with st.spinner("🤔 Strategist Agent is analyzing your requirements..."):
+                    strategist_response = strategist_executor.invoke(
+                        {"input": user_input},
+                        config={"configurable": {"session_id": st.session_state["session_id_strategist"]}}
+                    )
+                    strategist_output = strategist_response.get('output')
+            
+            # Reuse a verified itinerary for the same (or a very similar) request
+            cached = itinerary_cache.lookup(user_input, strategist_output)
+            if cached is not None:
+                return strategist_output, cached.itinerary, cached.verification
+            
+            # Step 2: Copywriter Agent - Create itinerary
+            st.session_state.current_agent = "copywriter"
+            with st.spinner("✍️ Copywriter Agent is creating your itinerary..."):
+                copywriter_prompt = get_copywriter_agent_prompt(user_input, strategist_output)
+                copywriter_response = copywriter_executor.invoke({
+                    "input": copywriter_prompt
+                })
+                copywriter_output = copywriter_response.get('output')
+        finally:
+            # Claimed even when a stage failed, so prefetched entries are never left unclaimed
+            if prefetch is not None and prefetch.calls:
+                prefetcher.finish(prefetch)
         
         # Step 3: Verification Agent - Verify itinerary
         st.session_state.current_agent = "verification"
         with st.spinner("🔍 DeepSeek Agent is verifying your itinerary..."):
             verification_output = run_verification_agent(user_input, strategist_output, copywriter_output)
+        itinerary_cache.store(user_input, strategist_output, copywriter_output, verification_output)
         
         return strategist_output, copywriter_output, verification_output
         
@@ -169,11 +321,62 @@ def process_travel_request(user_input):
         st.error(f"Error in process_travel_request: {str(e)}")
         return f"Error processing request: {str(e)}", "", ""
 
+@st.cache_resource
+def start_embedded_workers():
+    """Job workers inside the Streamlit server, shared by all sessions."""
+    pipeline = TravelPipeline.from_env(
+        llm_concurrency=JOB_LLM_CONCURRENCY, verification_concurrency=JOB_VERIFICATION_CONCURRENCY
+    )
+    return start_worker_thread(JobWorkerPool(get_job_queue(), pipeline, JOB_EMBEDDED_WORKERS))
+
+def background_workers_available():
+    """Embedded workers start on demand; external ones must have polled the queue recently."""
+    return JOB_EMBEDDED_WORKERS > 0 or get_job_queue().live_workers() > 0
+
+def submit_travel_job(user_input):
+    """Queue the request for the worker pool and put the job id in the URL so a reload can reattach."""
+    job_id = get_job_queue().submit(user_input)
+    st.session_state.job_id = job_id
+    st.experimental_set_query_params(job=job_id)
+    return job_id
+
+def sync_job(job_id):
+    """Copy a background job's progress into the session: new stage outputs become chat messages."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        st.session_state.job_id = None
+        st.experimental_set_query_params()
+        return None
+    if st.session_state.current_prompt != job.query:
+        # Fresh session after a reload: rebuild the conversation from the job
+        st.session_state.current_prompt = job.query
+        st.session_state.agent_outputs = {"strategist": "", "copywriter": "", "verification": ""}
+        st.session_state.agent_status = {"strategist": "pending", "copywriter": "pending", "verification": "pending"}
+        st.session_state.processing_complete = False
+        st.session_state.messages.append({"role": "user", "content": job.query})
+    for stage in STAGES:
+        if stage in job.outputs and st.session_state.agent_status[stage] != "completed":
+            cache_note = "♻️ *Reused a verified itinerary from a similar request.*\n\n" if stage == "copywriter" and job.cached.get(stage) else ""
+            st.session_state.agent_outputs[stage] = job.outputs[stage]
+            st.session_state.messages.append({"role": "assistant", "content": f"{STAGE_HEADERS[stage]}\n\n{cache_note}{job.outputs[stage]}"})
+            st.session_state.agent_status[stage] = "completed"
+    if job.finished and not st.session_state.processing_complete:
+        if job.status != "completed":
+            st.session_state.messages.append({"role": "assistant", "content": f"Error processing request: {job.error or job.status}"})
+        st.session_state.job_timing = job.timing
+        st.session_state.processing_complete = True
+    st.session_state.current_agent = "none" if job.finished else (job.stage or "none")
+    return job
+
 def main():
     # Header
     st.title("✈️ AI Travel Planning System")
     st.markdown("**Multi-Agent Travel Itinerary Generator**")
     
+    if (st.session_state.background_jobs or st.session_state.job_id) and JOB_EMBEDDED_WORKERS > 0:
+        start_embedded_workers()
+    job = sync_job(st.session_state.job_id) if st.session_state.job_id else None
+    
     # Sidebar for progress tracking
     with st.sidebar:
         st.header("📋 System Status")
@@ -202,12 +405,29 @@ def main():
                 st.info("✍️ Copywriter Agent: Ready")
                 st.info("🔍 DeepSeek Agent: Ready")
         
+        st.checkbox("⚡ Stream responses", key="stream_responses")
+        if background_workers_available():
+            st.checkbox("🧵 Run in background worker", key="background_jobs",
+                        help="Queue the request for the worker pool; progress survives page reloads")
+        else:
+            st.session_state.background_jobs = False
+        
+        # Timing of the last completed request
+        trace = st.session_state.trace
+        if trace is not None and trace.root.end is not None:
+            with st.expander("⏱️ Last request timing"):
+                st.code(trace.render_waterfall(width=30))
+        elif st.session_state.job_timing:
+            with st.expander("⏱️ Last request timing"):
+                st.code(st.session_state.job_timing)
+        
         # Reset button
         if st.button("🔄 Start New Planning Session"):
             st.session_state.user_requirements = ""
             st.session_state.strategist_response = ""
             st.session_state.copywriter_response = ""
             st.session_state.verification_response = ""
+            chat_history_manager.discard(st.session_state.session_id_strategist)
             st.session_state.session_id_strategist = str(uuid.uuid4())
             st.session_state.messages = []
             st.session_state.processing_complete = False
@@ -215,6 +435,14 @@ def main():
             st.session_state.agent_outputs = {"strategist": "", "copywriter": "", "verification": ""}
             st.session_state.agent_status = {"strategist": "pending", "copywriter": "pending", "verification": "pending"}
             st.session_state.current_prompt = ""
+            st.session_state.trace = None
+            st.session_state.cached_verification = None
+            finish_prefetch()
+            if st.session_state.job_id:
+                get_job_queue().cancel(st.session_state.job_id)
+                st.session_state.job_id = None
+                st.experimental_set_query_params()
+            st.session_state.job_timing = ""
             st.rerun()
     
     # Main chat interface
@@ -233,14 +461,36 @@ def main():
         st.session_state.agent_status = {"strategist": "pending", "copywriter": "pending", "verification": "pending"}
         st.session_state.processing_complete = False
         st.session_state.current_agent = "none"
+        st.session_state.cached_verification = None
+        finish_prefetch()
+        st.session_state.trace = Trace("streamlit")
+        st.session_state.job_timing = ""
+        if st.session_state.background_jobs:
+            st.session_state.trace = None
+            submit_travel_job(prompt)
+        elif st.session_state.job_id:
+            st.session_state.job_id = None
+            st.experimental_set_query_params()
         
         # Add user message to chat
         st.session_state.messages.append({"role": "user", "content": prompt})
         st.chat_message("user").write(prompt)
         st.rerun()
     
+    # Background job: poll the queue until the workers finish it
+    if job is not None and not st.session_state.processing_complete:
+        if job.status == "queued":
+            ahead = get_job_queue().position(job.job_id)
+            st.info(f"⏳ Waiting for a worker ({ahead} requests ahead)")
+            if not background_workers_available():
+                st.warning("No job workers are running. Start them with `python -m agent_lc.job_queue`.")
+        else:
+            st.info(f"⏳ {job.stage.capitalize() if job.stage else 'Strategist'} Agent is working...")
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
+    
     # Process agents based on current state
-    if st.session_state.current_prompt and not st.session_state.processing_complete:
+    if st.session_state.current_prompt and not st.session_state.processing_complete and job is None:
         # Initialize agents if not already done
         if st.session_state.agent_status["strategist"] == "pending":
             # Step 1: Strategist Agent
@@ -248,23 +498,39 @@ def main():
             st.session_state.agent_status["strategist"] = "running"
             
             # Initialize agents
-            strategist_executor, copywriter_executor, groq_client = initialize_agents()
+            strategist_executor, copywriter_executor, groq_client = initialize_agents(streaming=st.session_state.stream_responses)
             if strategist_executor is None:
                 st.error("Error: Could not initialize agents")
                 return
             
-            with st.spinner("🤔 Strategist Agent is analyzing your requirements..."):
-                strategist_response = strategist_executor.invoke(
-                    {"input": st.session_state.current_prompt},
-                    config={"configurable": {"session_id": st.session_state["session_id_strategist"]}}
-                )
-                strategist_output = strategist_response.get('output')
+            with trace_stage("strategist"):
+                if PREFETCH_SEARCHES:
+                    # Warm the tool cache with the searches the copywriter is likely to make
+                    st.session_state.prefetch = prefetcher.start(st.session_state.current_prompt)
+                strategist_output = None
+                try:
+                    # Clear-cut requests are analyzed in code, skipping the strategist LLM call
+                    strategist_output = local_strategist_analysis(st.session_state.current_prompt)
+                    local_analysis = strategist_output is not None
+                    if not local_analysis:
+                        strategist_output = invoke_agent(
+                            strategist_executor,
+                            {"input": st.session_state.current_prompt},
+                            header="🤔 **Strategist Agent Analysis:**\n\n",
+                            spinner_text="🤔 Strategist Agent is analyzing your requirements...",
+                            config={"configurable": {"session_id": st.session_state["session_id_strategist"]}}
+                        )
+                finally:
+                    # The copywriter stage claims the prefetch; without one it is claimed now
+                    if not strategist_output or strategist_output.startswith("Error"):
+                        finish_prefetch()
             
             # Display strategist output
             if strategist_output and not strategist_output.startswith("Error"):
                 st.session_state.agent_outputs["strategist"] = strategist_output
                 st.session_state.messages.append({"role": "assistant", "content": f"🤔 **Strategist Agent Analysis:**\n\n{strategist_output}"})
-                st.chat_message("assistant").write(f"🤔 **Strategist Agent Analysis:**\n\n{strategist_output}")
+                if local_analysis or not st.session_state.stream_responses:
+                    st.chat_message("assistant").write(f"🤔 **Strategist Agent Analysis:**\n\n{strategist_output}")
                 st.session_state.agent_status["strategist"] = "completed"
                 st.rerun()
         
@@ -274,23 +540,38 @@ def main():
             st.session_state.agent_status["copywriter"] = "running"
             
             # Initialize agents
-            strategist_executor, copywriter_executor, groq_client = initialize_agents()
+            strategist_executor, copywriter_executor, groq_client = initialize_agents(streaming=st.session_state.stream_responses)
             if copywriter_executor is None:
                 st.error("Error: Could not initialize copywriter agent")
                 return
             
-            with st.spinner("✍️ Copywriter Agent is creating your itinerary..."):
-                copywriter_prompt = get_copywriter_agent_prompt(st.session_state.current_prompt, st.session_state.agent_outputs["strategist"])
-                copywriter_response = copywriter_executor.invoke({
-                    "input": copywriter_prompt
-                })
-                copywriter_output = copywriter_response.get('output')
+            copywriter_prompt = get_copywriter_agent_prompt(st.session_state.current_prompt, st.session_state.agent_outputs["strategist"])
+            cache_note = ""
+            with trace_stage("copywriter"):
+                try:
+                    # A verified itinerary for the same (or a very similar) request skips the copywriter and verifier
+                    cached = itinerary_cache.lookup(st.session_state.current_prompt, st.session_state.agent_outputs["strategist"])
+                    if cached is not None:
+                        add_to_current_span(itinerary_cache_hits=1)
+                        copywriter_output = cached.itinerary
+                        st.session_state.cached_verification = cached.verification
+                        cache_note = "♻️ *Reused a verified itinerary from a similar request.*\n\n"
+                    else:
+                        copywriter_output = invoke_agent(
+                            copywriter_executor,
+                            {"input": copywriter_prompt},
+                            header="✍️ **Copywriter Agent Itinerary:**\n\n",
+                            spinner_text="✍️ Copywriter Agent is creating your itinerary..."
+                        )
+                finally:
+                    finish_prefetch()
             
             # Display copywriter output
             if copywriter_output and not copywriter_output.startswith("Error"):
                 st.session_state.agent_outputs["copywriter"] = copywriter_output
-                st.session_state.messages.append({"role": "assistant", "content": f"✍️ **Copywriter Agent Itinerary:**\n\n{copywriter_output}"})
-                st.chat_message("assistant").write(f"✍️ **Copywriter Agent Itinerary:**\n\n{copywriter_output}")
+                st.session_state.messages.append({"role": "assistant", "content": f"✍️ **Copywriter Agent Itinerary:**\n\n{cache_note}{copywriter_output}"})
+                if not st.session_state.stream_responses:
+                    st.chat_message("assistant").write(f"✍️ **Copywriter Agent Itinerary:**\n\n{copywriter_output}")
                 st.session_state.agent_status["copywriter"] = "completed"
                 st.rerun()
         
@@ -299,21 +580,44 @@ def main():
             st.session_state.current_agent = "verification"
             st.session_state.agent_status["verification"] = "running"
             
-            with st.spinner("🔍 DeepSeek Agent is verifying your itinerary..."):
-                verification_output = run_verification_agent(
-                    st.session_state.current_prompt, 
-                    st.session_state.agent_outputs["strategist"], 
-                    st.session_state.agent_outputs["copywriter"]
-                )
+            with trace_stage("verification"):
+                if st.session_state.cached_verification is not None:
+                    verification_output = st.session_state.cached_verification
+                elif st.session_state.stream_responses:
+                    with st.chat_message("assistant"):
+                        verification_placeholder = st.empty()
+                        verification_output = run_verification_agent(
+                            st.session_state.current_prompt, 
+                            st.session_state.agent_outputs["strategist"], 
+                            st.session_state.agent_outputs["copywriter"],
+                            on_token=lambda token, text: verification_placeholder.markdown(f"🔍 **DeepSeek Verification Report:**\n\n{text}▌")
+                        )
+                else:
+                    with st.spinner("🔍 DeepSeek Agent is verifying your itinerary..."):
+                        verification_output = run_verification_agent(
+                            st.session_state.current_prompt, 
+                            st.session_state.agent_outputs["strategist"], 
+                            st.session_state.agent_outputs["copywriter"]
+                        )
             
             # Display verification output
             if verification_output and not verification_output.startswith("Error"):
                 st.session_state.agent_outputs["verification"] = verification_output
                 st.session_state.messages.append({"role": "assistant", "content": f"🔍 **DeepSeek Verification Report:**\n\n{verification_output}"})
-                st.chat_message("assistant").write(f"🔍 **DeepSeek Verification Report:**\n\n{verification_output}")
+                if not st.session_state.stream_responses:
+                    st.chat_message("assistant").write(f"🔍 **DeepSeek Verification Report:**\n\n{verification_output}")
                 st.session_state.agent_status["verification"] = "completed"
+                if st.session_state.cached_verification is None:
+                    itinerary_cache.store(
+                        st.session_state.current_prompt,
+                        st.session_state.agent_outputs["strategist"],
+                        st.session_state.agent_outputs["copywriter"],
+                        verification_output
+                    )
             
             # Mark processing as complete
+            if st.session_state.trace is not None:
+                finish_trace(st.session_state.trace)
             st.session_state.processing_complete = True
             st.session_state.current_agent = "none"
             
@@ -0,0 +1,17 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from agent_lc.activity_catalog import ACTIVITY_CATALOG_SOURCE, build_catalog
+
+
+def test_concurrent_builds_use_separate_temp_files(tmp_path):
+    path = str(tmp_path / "catalog.sqlite3")
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        counts = list(pool.map(lambda _: build_catalog(ACTIVITY_CATALOG_SOURCE, path), range(4)))
+
+    assert len(set(counts)) == 1 and counts[0] > 0
+    assert os.listdir(tmp_path) == ["catalog.sqlite3"]
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == counts[0]
+    conn.close()
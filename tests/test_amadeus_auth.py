@@ -0,0 +1,88 @@
+import copy
+import io
+import threading
+import time
+
+import requests
+
+from agent_lc.amadeus_auth import AMADEUS_BASE_URL, AMADEUS_TOKEN_URL, AmadeusTokenManager
+from agent_lc.http_client import http_client
+from benchmarks.fakes import AmadeusFixtureAdapter
+from benchmarks.pipeline_benchmark import FIXTURES_DIR, load_fixtures
+
+
+class LocalTokenManager(AmadeusTokenManager):
+    """Hands out numbered tokens without calling the token endpoint."""
+
+    def __init__(self):
+        super().__init__()
+        self.invalidate_after_check = False
+
+    def _is_valid(self) -> bool:
+        valid = super()._is_valid()
+        if self.invalidate_after_check:
+            # Another thread drops the token right after the validity check
+            self.invalidate_after_check = False
+            invalidator = threading.Thread(target=self.invalidate)
+            invalidator.start()
+            invalidator.join(timeout=0.2)
+        return valid
+
+    def _refresh(self) -> str:
+        self.refresh_count += 1
+        self._access_token = f"token-{self.refresh_count}"
+        self._expires_at = time.monotonic() + 3600
+        return self._access_token
+
+
+def test_token_is_reused_until_invalidated():
+    manager = LocalTokenManager()
+    assert manager.get_token() == manager.get_token() == "token-1"
+    manager.invalidate()
+    assert manager.get_token() == "token-2"
+
+
+def test_concurrent_invalidate_cannot_clear_the_returned_token():
+    manager = LocalTokenManager()
+    manager.get_token()
+    manager.invalidate_after_check = True
+    assert manager.get_token() == "token-1"
+
+
+class RotatingTokenAdapter(AmadeusFixtureAdapter):
+    """Issues a new token per token request and answers 401 to revoked ones."""
+
+    def __init__(self, fixtures):
+        super().__init__(fixtures)
+        self.issued = 0
+        self.revoked = set()
+
+    def send(self, request, **kwargs):
+        if request.url.startswith(AMADEUS_TOKEN_URL):
+            self.issued += 1
+            self.fixtures["token"] = {**self.fixtures["token"], "access_token": f"token-{self.issued}"}
+        elif request.headers.get("Authorization", "").removeprefix("Bearer ") in self.revoked:
+            response = requests.Response()
+            response.status_code = 401
+            response.raw = io.BytesIO(b'{"errors": [{"status": 401}]}')
+            return response
+        return super().send(request, **kwargs)
+
+
+def test_revoked_token_is_refreshed_and_the_request_retried_once(monkeypatch):
+    monkeypatch.setenv("AMADEUS_CLIENT_ID", "test")
+    monkeypatch.setenv("AMADEUS_CLIENT_SECRET", "test")
+    adapter = RotatingTokenAdapter(copy.deepcopy(load_fixtures(str(FIXTURES_DIR))["amadeus"]))
+    http_client.session.mount(AMADEUS_BASE_URL, adapter)
+    manager = AmadeusTokenManager()
+    url = f"{AMADEUS_BASE_URL}/v2/shopping/flight-offers"
+
+    assert manager.get(url).status_code == 200
+    adapter.revoked.add("token-1")
+    assert manager.get(url).status_code == 200
+    assert (adapter.issued, manager.get_token()) == (2, "token-2")
+
+    adapter.revoked.add("token-2")
+    adapter.revoked.add("token-3")
+    assert manager.get(url).status_code == 401
+    assert adapter.issued == 3
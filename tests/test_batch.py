@@ -0,0 +1,27 @@
+import asyncio
+import json
+
+from agent_lc.batch import run_batch
+from agent_lc.pipeline import StageEvent
+
+
+class FlakyPipeline:
+    """Raises for queries containing "boom"; completes every stage otherwise."""
+
+    async def run_to_completion(self, user_query, trace=None):
+        if "boom" in user_query:
+            raise RuntimeError("pipeline bug")
+        return {"strategist": StageEvent("strategist", "completed", output="analysis", elapsed=0.01)}
+
+
+def test_failing_items_are_recorded_and_workers_keep_going(tmp_path):
+    input_path, output_path = tmp_path / "queries.jsonl", tmp_path / "results.jsonl"
+    queries = ["boom"] * 6 + ["Paris"] * 4
+    input_path.write_text("".join(json.dumps({"id": i, "query": query}) + "\n" for i, query in enumerate(queries)))
+
+    report = asyncio.run(asyncio.wait_for(run_batch(FlakyPipeline(), str(input_path), str(output_path), workers=2), 5))
+
+    assert (report.completed, report.failed) == (4, 6)
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert sorted(record["status"] for record in records) == ["completed"] * 4 + ["failed"] * 6
+    assert {record["error"] for record in records if record["status"] == "failed"} == {"pipeline bug"}
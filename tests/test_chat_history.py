@@ -0,0 +1,42 @@
+from agent_lc.chat_history import MESSAGE_OVERHEAD_BYTES, ChatHistoryManager, SQLiteHistoryStore
+
+
+def message_bytes(text):
+    return len(text) + MESSAGE_OVERHEAD_BYTES
+
+
+def test_memory_total_follows_adds_clears_and_evictions():
+    manager = ChatHistoryManager(max_sessions=2, memory_budget_bytes=0)
+    first = manager.get_history_by_session_id("a")
+    first.add_user_message("hello")
+    manager.get_history_by_session_id("b").add_ai_message("hi there")
+    assert manager.get_stats()["memory_bytes"] == message_bytes("hello") + message_bytes("hi there")
+
+    manager.get_history_by_session_id("c")  # evicts "a"
+    first.add_user_message("written after eviction")
+    assert manager.get_stats()["memory_bytes"] == message_bytes("hi there")
+
+    manager.get_history_by_session_id("b").clear()
+    manager.discard("c")
+    assert manager.get_stats()["memory_bytes"] == 0
+
+
+def test_memory_budget_evicts_oldest_sessions():
+    manager = ChatHistoryManager(memory_budget_bytes=3 * message_bytes("x" * 100))
+    for session_id in "abcd":
+        manager.get_history_by_session_id(session_id).add_user_message("x" * 100)
+    manager.get_history_by_session_id("d")
+    stats = manager.get_stats()
+    assert (stats["sessions"], stats["evicted_memory"]) == (3, 1)
+    assert stats["memory_bytes"] == 3 * message_bytes("x" * 100)
+
+
+def test_persisted_sessions_count_once_reloaded(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / "history.sqlite3"))
+    ChatHistoryManager(store=store).get_history_by_session_id("a").add_user_message("hello")
+
+    manager = ChatHistoryManager(store=store)
+    history = manager.get_history_by_session_id("a")
+    assert manager.get_stats()["memory_bytes"] == 0
+    assert len(history.messages) == 1
+    assert manager.get_stats()["memory_bytes"] == message_bytes("hello")
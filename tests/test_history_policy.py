@@ -0,0 +1,60 @@
+import threading
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent_lc.chat_history import InMemoryHistory
+from agent_lc.history_policy import HistoryWindowPolicy
+
+
+class BlockingSummarizer:
+    """Summarizes instantly, except for transcripts mentioning "slow", which wait for `release`."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        if "slow" in prompt:
+            self.started.set()
+            assert self.release.wait(timeout=5)
+        return SimpleNamespace(content=f"summary {self.calls}")
+
+
+def history_of(topic, turns=4):
+    history = InMemoryHistory()
+    for turn in range(turns):
+        history.add_message(HumanMessage(content=f"{topic} question {turn}"))
+        history.add_message(AIMessage(content=f"{topic} answer {turn}"))
+    return history
+
+
+def test_summarizing_one_session_does_not_block_another():
+    summarizer = BlockingSummarizer()
+    policy = HistoryWindowPolicy(max_messages=2, summarizer=summarizer)
+    slow = history_of("slow")
+    slow_turn = threading.Thread(target=policy.apply, args=(slow,))
+    slow_turn.start()
+    try:
+        assert summarizer.started.wait(timeout=5)
+        fast = history_of("fast")
+        messages = policy.apply(fast)
+        assert fast.summarized_count == 6 and len(messages) == 3
+    finally:
+        summarizer.release.set()
+        slow_turn.join()
+    assert slow.summarized_count == 6
+
+
+def test_summary_is_stored_once_and_extended_incrementally():
+    summarizer = BlockingSummarizer()
+    policy = HistoryWindowPolicy(max_messages=2, summarizer=summarizer)
+    history = history_of("paris")
+    policy.apply(history)
+    policy.apply(history)
+    assert summarizer.calls == 1
+    history.add_message(HumanMessage(content="one more"))
+    policy.apply(history)
+    assert (summarizer.calls, history.summarized_count, history.summary) == (2, 7, "summary 2")
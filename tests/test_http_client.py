@@ -0,0 +1,55 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from agent_lc.http_client import HttpClient, request_deadline
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """503 on /unavailable, a 3 second stall on /slow."""
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(3)
+        self.send_response(503 if self.path == "/unavailable" else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_retries_stop_at_the_deadline(server_url):
+    client = HttpClient(max_retries=5, backoff_factor=1)  # about 15s of backoff without a deadline
+    start = time.monotonic()
+    with request_deadline(1.5):
+        response = client.get(f"{server_url}/unavailable")
+    assert response.status_code == 503
+    assert time.monotonic() - start < 2.5
+    assert client.get_stats()["retries"] < 5
+
+
+def test_read_timeout_is_cut_to_the_time_left(server_url):
+    client = HttpClient(read_timeout=30)
+    start = time.monotonic()
+    with pytest.raises(requests.RequestException), request_deadline(0.5):
+        client.get(f"{server_url}/slow")
+    assert time.monotonic() - start < 2
+
+
+def test_no_request_is_sent_after_the_deadline(server_url):
+    client = HttpClient()
+    with pytest.raises(requests.Timeout), request_deadline(0, start=time.monotonic() - 1):
+        client.get(f"{server_url}/ok")
+    assert client.get_stats()["requests"] == 0
@@ -0,0 +1,63 @@
+from agent_lc.itinerary_cache import ItineraryCache, extract_requirement_key, is_approved
+from agent_lc.rule_verification import rule_verifier
+
+ADVENTURE_QUERY = "Trip to Manali from Delhi, September 2-8, 2025, 2 people."
+ADVENTURE_ITINERARY = """Day 1 (September 2, 2025): Arrive in Manali, paragliding at Solang Valley.
+Day 2 (September 3, 2025): Rafting on the Beas.
+Day 6 (September 7, 2025): Rohtang Pass.
+Day 7 (September 8, 2025): Depart."""
+
+
+def cache_with_adventure_trip():
+    cache = ItineraryCache(":memory:")
+    report = rule_verifier.verify(ADVENTURE_QUERY, ADVENTURE_ITINERARY).render()
+    assert cache.store(ADVENTURE_QUERY, "", ADVENTURE_ITINERARY, report)
+    return cache
+
+
+def test_same_request_is_an_exact_hit():
+    cached = cache_with_adventure_trip().lookup(ADVENTURE_QUERY, "")
+    assert cached is not None and cached.similarity == 1.0
+
+
+def test_special_requirements_and_preferences_change_the_key():
+    query = ADVENTURE_QUERY + " Wheelchair user, vegetarian, relaxed pace."
+    key = extract_requirement_key(query)
+    assert key.special_requirements == ["accessibility", "dietary"]
+    assert key.preferences == ["relaxed"]
+    assert key.cache_key() != extract_requirement_key(ADVENTURE_QUERY).cache_key()
+    assert cache_with_adventure_trip().lookup(query, "") is None
+
+
+def test_preferences_block_fuzzy_matches():
+    assert cache_with_adventure_trip().lookup(ADVENTURE_QUERY + " A romantic honeymoon.", "") is None
+
+
+def test_approval_reads_the_final_verdict():
+    assert is_approved("No failures found; the failsafe buffer is fine.\n\nFinal approval status: APPROVED")
+    assert is_approved("**Final Approval Status:**\n\n✅ Approved")
+    assert not is_approved("Everything looks approved.\n\nFinal approval status: NOT APPROVED")
+    assert not is_approved("Final approval status: NEEDS REVIEW")
+    assert not is_approved("Budget check failed. Otherwise approved.")
+
+
+def test_cities_sharing_a_city_code_have_separate_entries():
+    kullu_query = ADVENTURE_QUERY.replace("Manali", "Kullu")
+    kullu_itinerary = ADVENTURE_ITINERARY.replace("Manali", "Kullu")
+    cache = ItineraryCache(":memory:", min_similarity=1.0)
+    assert cache.store(kullu_query, "", kullu_itinerary, rule_verifier.verify(kullu_query, kullu_itinerary).render())
+    assert extract_requirement_key(ADVENTURE_QUERY).destination == "Manali, IN"
+    assert cache.lookup(ADVENTURE_QUERY, "") is None
+
+    assert cache.store(ADVENTURE_QUERY, "", ADVENTURE_ITINERARY,
+                       rule_verifier.verify(ADVENTURE_QUERY, ADVENTURE_ITINERARY).render())
+    assert cache.invalidate("Manali") == 1
+    assert cache.lookup(kullu_query, "").itinerary == kullu_itinerary
+    assert cache.invalidate("KUU") == 1
+
+
+def test_fuzzy_matches_need_the_same_budget_bucket_and_date_window():
+    cache = cache_with_adventure_trip()
+    assert cache.lookup(ADVENTURE_QUERY, "Origin: Mumbai").similarity < 1.0
+    assert cache.lookup(ADVENTURE_QUERY + " Budget $2000.", "Origin: Mumbai") is None
+    assert cache.lookup(ADVENTURE_QUERY.replace("September 2-8", "September 22-28"), "Origin: Mumbai") is None
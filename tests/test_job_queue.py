@@ -0,0 +1,93 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from agent_lc.job_queue import JobQueue, JobWorkerPool
+from agent_lc.pipeline import STAGES, StageEvent
+
+
+class FakePipeline:
+    """Yields a started and completed event per stage."""
+
+    def __init__(self, before_stage=None):
+        self.before_stage = before_stage
+
+    async def run(self, user_query, trace=None):
+        for stage in STAGES:
+            if self.before_stage:
+                self.before_stage(stage)
+            yield StageEvent(stage, "started")
+            await asyncio.sleep(0)
+            yield StageEvent(stage, "completed", output=f"{stage} for {user_query}", elapsed=0.01)
+
+
+def test_claim_is_exclusive_and_in_order(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    first, second = queue.submit("Paris"), queue.submit("Rome")
+    assert queue.position(second) == 1
+    assert queue.claim("a").job_id == first
+    assert queue.claim("b").job_id == second
+    assert queue.claim("c") is None
+
+
+def test_requeued_job_rejects_writes_from_its_old_worker(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), stale_after=60)
+    job_id = queue.submit("Paris")
+    stale = queue.claim("old")
+    queue._conn.execute("UPDATE jobs SET heartbeat = 0 WHERE job_id = ?", (job_id,))
+    assert queue.requeue_stale() == 1
+    current = queue.claim("new")
+
+    assert not queue.heartbeat(stale)
+    assert not queue.record_event(stale, StageEvent("strategist", "completed", output="stale"))
+    assert not queue.finish(stale, error="stale worker gave up")
+    assert queue.record_event(current, StageEvent("strategist", "completed", output="fresh"))
+    assert queue.finish(current)
+
+    job = queue.get(job_id)
+    assert (job.status, job.worker, job.outputs, job.error) == ("completed", "new", {"strategist": "fresh"}, "")
+
+
+def test_worker_pool_records_every_stage(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit("Paris")
+
+    async def run():
+        stop = asyncio.Event()
+        pool = JobWorkerPool(queue, FakePipeline(), workers=2, poll_interval=0.05)
+        worker = asyncio.create_task(pool.run(stop))
+        while not queue.get(job_id).finished:
+            await asyncio.sleep(0.05)
+        stop.set()
+        await worker
+
+    asyncio.run(run())
+    job = queue.get(job_id)
+    assert job.status == "completed"
+    assert job.outputs == {stage: f"{stage} for Paris" for stage in STAGES}
+    assert queue.live_workers() == 2
+
+
+def test_worker_stops_a_job_it_no_longer_owns(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit("Paris")
+
+    def steal(stage):
+        if stage == "copywriter":
+            queue._conn.execute("UPDATE jobs SET claim = 'someone-else' WHERE job_id = ?", (job_id,))
+
+    job = queue.claim("a")
+    asyncio.run(JobWorkerPool(queue, FakePipeline(before_stage=steal)).run_job(job))
+    stored = queue.get(job_id)
+    assert stored.status == "running"
+    assert list(stored.outputs) == ["strategist"]
+
+
+def test_importing_the_module_creates_no_queue_file(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run(
+        [sys.executable, "-c", "import agent_lc.job_queue"],
+        cwd=tmp_path, env={**os.environ, "PYTHONPATH": root}, check=True, capture_output=True
+    )
+    assert not any(name.startswith("jobs.sqlite3") for name in os.listdir(tmp_path))
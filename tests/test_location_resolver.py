@@ -0,0 +1,32 @@
+import gc
+import weakref
+
+from agent_lc.location_resolver import Location, LocationResolver
+
+
+def resolver(country, cache_size=4096):
+    return LocationResolver([Location("Paris", country, "PAR", ["CDG"])], cache_size=cache_size)
+
+
+def test_resolvers_do_not_share_cached_results():
+    assert resolver("FR").resolve("Paris").location.country == "FR"
+    assert resolver("US").resolve("Paris").location.country == "US"
+
+
+def test_resolver_is_freed_with_its_cache():
+    paris = resolver("FR")
+    paris.resolve("Paris")
+    ref = weakref.ref(paris)
+    del paris
+    gc.disable()
+    try:
+        assert ref() is None
+    finally:
+        gc.enable()
+
+
+def test_cache_keeps_the_most_recent_queries():
+    paris = resolver("FR", cache_size=2)
+    for query in ("Paris", "CDG", "paris", "Paris"):
+        paris.resolve(query)
+    assert list(paris._resolved) == ["paris", "Paris"]
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from langchain.agents import create_openai_tools_agent
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain.tools import tool
+
+from agent_lc.parallel_executor import ParallelToolAgentExecutor
+from agent_lc.streaming import TokenStreamHandler
+from benchmarks.fakes import ScriptedChatModel
+
+RELEASE = threading.Event()
+
+
+@tool
+def quick_search(city: str) -> str:
+    """Quick search."""
+    return f"results for {city}"
+
+
+@tool
+def stuck_search(city: str) -> str:
+    """Search that hangs until released."""
+    RELEASE.wait(5)
+    return f"late results for {city}"
+
+
+def executor(*calls, **kwargs):
+    llm = ScriptedChatModel(response="done", tool_calls=[{"name": name, "arguments": {"city": "Paris"}} for name in calls])
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "Plan."), ("human", "{input}"), MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ])
+    tools = [quick_search, stuck_search]
+    return ParallelToolAgentExecutor(
+        agent=create_openai_tools_agent(llm, tools, prompt), tools=tools, return_intermediate_steps=True, **kwargs
+    )
+
+
+def test_tool_callbacks_run_on_the_calling_thread():
+    threads = []
+    handler = TokenStreamHandler(
+        on_tool_start=lambda name, tool_input: threads.append(("start", threading.get_ident())),
+        on_tool_end=lambda name, output: threads.append(("end", threading.get_ident())),
+    )
+    result = executor("quick_search", "quick_search", "quick_search").invoke(
+        {"input": "Paris"}, config={"callbacks": [handler]}
+    )
+    assert len(result["intermediate_steps"]) == 3
+    assert sorted(event for event, _ in threads) == ["end"] * 3 + ["start"] * 3
+    assert {ident for _, ident in threads} == {threading.get_ident()}
+
+
+def test_timed_out_call_is_abandoned_with_an_error_observation():
+    RELEASE.clear()
+    started = time.monotonic()
+    try:
+        result = executor("stuck_search", "quick_search", tool_timeout=0.2).invoke({"input": "Paris"})
+    finally:
+        RELEASE.set()
+    assert time.monotonic() - started < 2
+    observations = [observation for _, observation in result["intermediate_steps"]]
+    assert observations[0].startswith("Error: stuck_search did not respond within 0.2 seconds")
+    assert observations[1] == "results for Paris"
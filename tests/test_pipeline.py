@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+
+from agent_lc.pipeline import TravelPipeline
+from tests.test_rule_verification import ITINERARY, REQUEST
+
+
+class FakeExecutor:
+    def __init__(self, output):
+        self.output = output
+
+    async def ainvoke(self, inputs, config=None):
+        return {"output": self.output, "intermediate_steps": []}
+
+
+class FakeGroq:
+    """Records the user prompt of every verification call."""
+
+    def __init__(self):
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, messages, model="", temperature=0.0):
+        self.prompts.append(messages[-1]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Approval status: APPROVED"))],
+                               usage=None)
+
+
+def pipelined(groq, **kwargs):
+    return TravelPipeline(FakeExecutor("Manali trip"), FakeExecutor(ITINERARY), groq, retry_delay=0,
+                          pipelined_verification=True, strategist_mode="llm", **kwargs)
+
+
+def test_pipelined_verification_honours_rules_mode():
+    groq = FakeGroq()
+    results = asyncio.run(pipelined(groq, verification_mode="rules").run_to_completion(REQUEST))
+    assert results["verification"].output.endswith("APPROVED")
+    assert groq.prompts == []
+
+
+def test_pipelined_verification_escalates_with_rule_findings():
+    groq = FakeGroq()
+    results = asyncio.run(pipelined(groq, verification_mode="rules").run_to_completion(REQUEST + " We love museums."))
+    assert results["verification"].status == "completed"
+    assert "- FAIL interests:" in groq.prompts[-1]
+
+
+def test_llm_slots_are_per_loop_and_per_budget():
+    pipeline = pipelined(FakeGroq(), llm_concurrency=1, verification_concurrency=2)
+
+    async def slots():
+        return pipeline._llm_slots("copywriter"), pipeline._llm_slots("verification")
+
+    agents, verification = asyncio.run(slots())
+    assert agents is not verification
+    assert (agents._value, verification._value) == (1, 2)
+    assert asyncio.run(slots())[0] is not agents
+    asyncio.run(pipeline.run_to_completion(REQUEST))
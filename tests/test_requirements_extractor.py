@@ -0,0 +1,14 @@
+from agent_lc.requirements_extractor import requirements_extractor
+
+
+def test_complete_request_is_analyzed_locally():
+    analysis = requirements_extractor.analyze("Manali from Delhi, September 2-8, 2025, 2 people, budget $2000.")
+    assert analysis.startswith("TRAVEL REQUIREMENTS ANALYSIS")
+
+
+def test_missing_core_field_falls_back_to_llm_strategist():
+    request = "Manali from Delhi, September 2-8, 2025, with my wife, budget $2000."
+    extracted = requirements_extractor.extract(request)
+    assert extracted.missing == ["travelers"]
+    assert extracted.confidence >= requirements_extractor.min_confidence
+    assert requirements_extractor.analyze(request) is None
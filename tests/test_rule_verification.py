@@ -0,0 +1,56 @@
+from agent_lc.requirements_extractor import requirements_extractor
+from agent_lc.rule_verification import extract_requirements, rule_verifier
+
+ITINERARY = """Day 1 (September 2, 2025): Arrive in Manali, paragliding at Solang Valley.
+Day 2 (September 3, 2025): Hadimba Temple and Old Manali village culture walk.
+Day 3 (September 4, 2025): Rohtang Pass mountain views.
+Day 7 (September 8, 2025): Depart.
+
+Budget:
+- Flights: $600
+- Hotel: $700
+- Total: $1,300"""
+REQUEST = "Manali from Delhi, September 2-8, 2025, 2 people, budget $2000."
+
+
+def test_default_query_interests_are_recognized():
+    facts = extract_requirements(
+        "I want to travel to Manali. I'm interested in adventure activities, mountain views, and local culture."
+    )
+    assert facts.interests == ["adventure", "cultural", "nature"]
+
+
+def test_covered_interests_are_settled_by_rules():
+    report = rule_verifier.verify(REQUEST + " Adventure, mountain views and local culture.", ITINERARY)
+    assert not report.needs_llm
+    assert report.render().endswith("APPROVED")
+
+
+def test_uncovered_interests_escalate():
+    report = rule_verifier.verify(REQUEST + " We love museums.", ITINERARY)
+    assert [check.name for check in report.failed] == ["interests"]
+    assert report.needs_llm
+
+
+def test_unrecognized_interests_escalate_instead_of_skipping():
+    report = rule_verifier.verify(REQUEST + " We are interested in jazz and wine.", ITINERARY)
+    assert [check.name for check in report.to_review] == ["interests"]
+    assert report.needs_llm
+    assert "NEEDS REVIEW" in report.render()
+
+
+def test_qualitative_preferences_escalate():
+    report = rule_verifier.verify(REQUEST + " A relaxed honeymoon please.", ITINERARY)
+    assert report.to_review[0].detail == "travel style needs review: relaxed, romantic"
+    assert report.needs_llm
+
+
+def test_no_stated_interests_stay_rules_only():
+    analysis = requirements_extractor.analyze(REQUEST)
+    assert not rule_verifier.verify(f"{REQUEST}\n{analysis}", ITINERARY).needs_llm
+
+
+def test_extractor_and_verifier_share_the_preference_taxonomy():
+    requirements = requirements_extractor.extract(REQUEST + " Relaxed pace, adventure and mountain views.")
+    assert requirements.preferences == ["relaxed"]
+    assert requirements.interests == ["adventure", "nature"]
@@ -0,0 +1,106 @@
+import copy
+import threading
+
+import pytest
+
+from agent_lc.amadeus_auth import AMADEUS_BASE_URL, amadeus_token_manager
+from agent_lc.http_client import http_client
+from agent_lc.tool_cache import InMemoryCacheBackend, ToolCache, tool_cache
+from agent_lc.tool_results import SearchResult
+from agent_lc.tools import Tools
+from benchmarks.fakes import AmadeusFixtureAdapter
+from benchmarks.pipeline_benchmark import FIXTURES_DIR, load_fixtures
+
+HOTEL_PRICES = {"HTPAR000": 120, "HTPAR001": 125, "HTPAR002": 140, "HTPAR003": 149, "HTPAR004": 150}
+FLIGHT_PRICES = [20, 24.99, 25, 30, 149.5]
+
+
+@pytest.fixture
+def amadeus(monkeypatch):
+    """Fixture Amadeus API with hotel and flight prices around the old $25 buckets."""
+    monkeypatch.setenv("AMADEUS_CLIENT_ID", "test")
+    monkeypatch.setenv("AMADEUS_CLIENT_SECRET", "test")
+    fixtures = copy.deepcopy(load_fixtures(str(FIXTURES_DIR))["amadeus"])
+    for hotel_id, body in fixtures["hotel_offers"].items():
+        offers = body["data"][0]["offers"][:1]
+        if hotel_id in HOTEL_PRICES:
+            offers[0]["price"]["total"] = str(HOTEL_PRICES[hotel_id])
+        else:
+            offers.clear()
+        body["data"][0]["offers"] = offers
+    flights = fixtures["flight_offers"]["data"][:len(FLIGHT_PRICES)]
+    for flight, price in zip(flights, FLIGHT_PRICES):
+        flight["price"]["total"] = str(price)
+    fixtures["flight_offers"]["data"] = flights
+
+    adapter = AmadeusFixtureAdapter(fixtures)
+    http_client.session.mount(AMADEUS_BASE_URL, adapter)
+    amadeus_token_manager.invalidate()
+    tool_cache.invalidate()
+    yield adapter
+    tool_cache.invalidate()
+    amadeus_token_manager.invalidate()
+
+
+def search_hotels(max_price):
+    return Tools.search_hotels.invoke({
+        "city": "PAR", "check_in": "2025-06-15", "check_out": "2025-06-22", "adults": 2, "max_price": max_price
+    })
+
+
+def search_flights(max_price):
+    return Tools.search_flights.invoke({
+        "origin": "JFK", "destination": "CDG", "departure_date": "2025-06-15", "adults": 2, "max_price": max_price
+    })
+
+
+def prices(result):
+    assert isinstance(result, SearchResult), result
+    return [item.price for item in result.items]
+
+
+def test_hotel_limit_is_exact_not_bucketed(amadeus):
+    assert prices(search_hotels(149)) == [120, 125, 140, 149]
+    assert prices(search_hotels(124.99)) == [120]
+    assert prices(search_hotels(None)) == [120, 125, 140, 149, 150]
+
+
+def test_price_limits_share_one_cached_search(amadeus):
+    search_hotels(149)
+    requests = amadeus.requests
+    result = search_hotels(130)
+    assert amadeus.requests == requests
+    assert prices(result) == [120, 125]
+    assert result.total == 2
+
+
+def test_flight_limit_below_bucket_size_still_filters(amadeus):
+    assert prices(search_flights(20)) == [20]
+    assert prices(search_flights(24.99)) == [20, 24.99]
+    assert search_flights(10) == "No flights found within the specified price range."
+
+
+def test_activity_limit_below_bucket_size_keeps_cheap_activities():
+    tool_cache.invalidate("search_activities")
+    result = Tools.search_activities.invoke({"city": "Manali", "max_price": 20, "page_size": 20})
+    names = [item.name for item in result.items]
+    assert "Hadimba Temple" in names
+    assert all(item.price <= 20 for item in result.items)
+
+
+def test_prefetched_keys_can_be_claimed_while_searches_add_more():
+    cache = ToolCache(InMemoryCacheBackend())
+    keys, claimed = set(), [0, 0]
+
+    def prefetch():
+        with cache.prefetching(keys):
+            for i in range(2000):
+                cache.get_or_compute("search_hotels", {"city": f"C{i}"}, lambda: "ok")
+
+    searches = threading.Thread(target=prefetch)
+    searches.start()
+    while searches.is_alive():
+        claimed = [a + b for a, b in zip(claimed, cache.claim_prefetched(keys))]
+    searches.join()
+    claimed = [a + b for a, b in zip(claimed, cache.claim_prefetched(keys))]
+    assert claimed == [0, 2000]